@@ -0,0 +1,15 @@
+// Only classes found in these files end up in the build. Classes toggled from JavaScript must
+// appear as whole strings somewhere in them.
+module.exports = {
+  content: ['../templates/**/*.html'],
+  theme: {
+    extend: {
+      colors: {
+        primary: '#3B82F6',
+        secondary: '#10B981',
+        accent: '#F59E0B',
+      },
+    },
+  },
+  plugins: [],
+};
@@ -6,57 +6,22 @@ set -e  # Exit on any error
 
 echo "Starting Django production entrypoint..."
 
-# Health check for database using DATABASE_URL
-if [ -n "$DB_URL" ]; then
-  echo "Checking database connection..."
-  
-  # Try to connect to the database using Django's database check
-  python manage.py shell << EOF
-import sys
-from django.db import connection
-from django.db.utils import OperationalError  
-
-
-try:
-    with connection.cursor() as cursor:
-        cursor.execute('SELECT 1')
-        print('Database connection successful!')
-except OperationalError as e:
-    print(f'Database connection failed: {e}')
-    sys.exit(1)
-EOF
-  
-  if [ $? -ne 0 ]; then
-    echo "Waiting for database to be ready..."
-    while true; do
-      python manage.py shell << EOF
-import sys
-from django.db import connection
-from django.db.utils import OperationalError 
-
-try:
-    with connection.cursor() as cursor:
-        cursor.execute('SELECT 1')
-        print('Database is ready!')
-        sys.exit(0)
-except OperationalError:
-    sys.exit(1)
-EOF
-      if [ $? -eq 0 ]; then
-        break
-      fi
-      echo "Database not ready, retrying in 2 seconds..."
-      sleep 2
-    done
-  fi
+# One Django start before serving: wait for the database (exponential backoff) and apply
+# migrations under an advisory lock, so replicas starting together don't race. Replicas that
+# should never migrate (autoscaled web workers, a separate migrate job) set RUN_MIGRATIONS=0.
+# Migrations are generated in development and committed, never at container start.
+if [ "${RUN_MIGRATIONS:-1}" = "1" ]; then
+  python manage.py migrate_with_lock --timeout "${DB_WAIT_TIMEOUT:-60}"
+else
+  python manage.py wait_for_db --timeout "${DB_WAIT_TIMEOUT:-60}"
 fi
 
-# Run database migrations
-echo "Applying database migrations..."
-python manage.py makemigrations --noinput
-python manage.py migrate --noinput
-
+# Gunicorn pre-forks WEB_CONCURRENCY uvicorn workers (one per core by default) from a warmed
+# up master, see gunicorn.conf.py. SERVER=uvicorn runs a single uvicorn process instead.
+if [ "${SERVER:-gunicorn}" = "uvicorn" ]; then
+  echo "Starting uvicorn server with ASGI..."
+  exec uvicorn travelers.asgi:application --host 0.0.0.0 --port 8000
+fi
 
-# Start Gunicorn with Uvicorn workers for ASGI
-echo "Starting uvicorn server with ASGI..."
-exec uvicorn travelers.asgi:application --host 0.0.0.0 --port 8000
+echo "Starting gunicorn with uvicorn workers..."
+exec gunicorn travelers.asgi:application -c gunicorn.conf.py
@@ -0,0 +1,44 @@
+# Gunicorn settings for production: a pre-fork master running uvicorn workers over the ASGI app
+#   gunicorn travelers.asgi:application -c gunicorn.conf.py
+# Every value can be overridden through the environment.
+
+import multiprocessing
+import os
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+
+# One worker per core by default, WEB_CONCURRENCY is also what most platforms set
+workers = int(os.getenv('WEB_CONCURRENCY', multiprocessing.cpu_count()))
+worker_class = 'uvicorn.workers.UvicornWorker'
+
+# Import Django and warm it up once in the master, workers start from the forked, warm copy
+preload_app = os.getenv('GUNICORN_PRELOAD', '1') == '1'
+
+# Recycle workers after this many requests (0 disables), the jitter keeps them from restarting together
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', 1000))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', 100))
+
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 30))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', 5))
+
+accesslog = os.getenv('GUNICORN_ACCESS_LOG', '-')
+errorlog = '-'
+
+
+def _warm_up(log):
+    from travels.warmup import warm_up
+    report = warm_up()
+    log.info("Warm-up done: %s", ', '.join(f"{name} {count} in {ms}ms" for name, (count, ms) in report.items()))
+
+
+# With preload_app the master warms up before the first fork, it has bound the socket but no
+# worker accepts yet. Without it every worker warms itself up before taking requests.
+def when_ready(server):
+    if server.cfg.preload_app:
+        _warm_up(server.log)
+
+
+def post_worker_init(worker):
+    if not worker.cfg.preload_app:
+        _warm_up(worker.log)
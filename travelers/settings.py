@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 
 import os
 from pathlib import Path
+import secrets
 import sys
 import dj_database_url
 from dotenv import load_dotenv
@@ -46,6 +47,15 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'travels.middleware.StaticFilesMiddleware',
+    'travels.middleware.HealthCheckMiddleware',
+    'travels.middleware.TracingMiddleware',
+    'travels.middleware.RequestMetricsMiddleware',
+    'travels.middleware.QueryInspectionMiddleware',
+    'travels.middleware.ProfilingMiddleware',
+    'travels.middleware.MemoryDeltaMiddleware',
+    'travels.middleware.CompressionMiddleware',
+    'django.middleware.http.ConditionalGetMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -60,7 +70,7 @@ ROOT_URLCONF = 'travelers.urls'
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
-        'DIRS': [BASE_DIR ,'templates'],
+        'DIRS': [BASE_DIR / 'templates'],
         'APP_DIRS': True,
         'OPTIONS': {
             'context_processors': [
@@ -97,12 +107,40 @@ if 'test' in sys.argv:
         'TEST': {},
     }
 
-print("DATABASES:", defaults)
-
 DATABASES = {
     'default': defaults
 }
 
+# Two cache tiers. 'shared' is seen by every worker: a directory on one host by default
+# (development, CI, a single container), or any Django backend through CACHE_BACKEND and
+# CACHE_LOCATION, e.g. django.core.cache.backends.redis.RedisCache and redis://cache:6379/1
+# for several containers. 'default' keeps the hottest CACHE_LOCAL_MAX_ENTRIES entries in each
+# process for up to CACHE_LOCAL_TIMEOUT seconds in front of it.
+CACHES = {
+    'default': {
+        'BACKEND': 'travels.cache.TieredCache',
+        'OPTIONS': {
+            'SHARED_ALIAS': 'shared',
+            'LOCAL_MAX_ENTRIES': config('CACHE_LOCAL_MAX_ENTRIES', default=1000, cast=int),
+            'LOCAL_TIMEOUT': config('CACHE_LOCAL_TIMEOUT', default=5, cast=float),
+        },
+    },
+    'shared': {
+        'BACKEND': config('CACHE_BACKEND', default='travels.cache.FileCache'),
+        'LOCATION': config('CACHE_LOCATION', default=str(BASE_DIR / '.cache')),
+        'OPTIONS': {'MAX_ENTRIES': config('CACHE_MAX_ENTRIES', default=10000, cast=int)},
+    },
+}
+
+if 'test' in sys.argv:
+    CACHES['shared'] = {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}
+
+# Sessions are read from the cache and only fall back to the database on a miss, writes go to
+# both. They skip the per-process tier, a logout served by one worker must end the session in
+# all of them at once. Expired rows are deleted by `manage.py purge_sessions`, run periodically.
+SESSION_ENGINE = config('SESSION_ENGINE', default='django.contrib.sessions.backends.cached_db')
+SESSION_CACHE_ALIAS = 'shared'
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -139,6 +177,120 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+# `manage.py build_assets` compiles the CSS and icon font into travels/static/travels,
+# collectstatic hashes and precompresses everything into STATIC_ROOT, which
+# StaticFilesMiddleware serves with far-future cache headers
+STATIC_ROOT = config('STATIC_ROOT', default=str(BASE_DIR / 'staticfiles'))
+
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'travels.static_files.CompressedManifestStaticFilesStorage'},
+}
+
+# Fail pages linking an asset missing from the collectstatic manifest, off in development
+STATIC_MANIFEST_STRICT = config('STATIC_MANIFEST_STRICT', default=not DEBUG, cast=bool)
+
+if 'test' in sys.argv:
+    STATIC_MANIFEST_STRICT = False
+
+# Lifetime of the cached trip card and trip detail fragments. They are keyed on updated_at, so
+# they never go stale and the timeout only bounds memory; 0 disables the fragment cache.
+FRAGMENT_CACHE_TIMEOUT = config('FRAGMENT_CACHE_TIMEOUT', default=86400, cast=int)
+
+# Full-page cache of the home page for anonymous visitors: fresh for PAGE_CACHE_TIMEOUT
+# seconds, then served stale for up to PAGE_CACHE_STALE more while one request re-renders it.
+# 0 disables it.
+PAGE_CACHE_TIMEOUT = config('PAGE_CACHE_TIMEOUT', default=30, cast=int)
+PAGE_CACHE_STALE = config('PAGE_CACHE_STALE', default=300, cast=int)
+
+# Tests change trips between requests to the same page, page cache tests turn it back on
+if 'test' in sys.argv:
+    PAGE_CACHE_TIMEOUT = 0
+
+# The trip change feed only hands out changes older than this many seconds, so a late commit
+# can't slip behind a cursor. It is the upper bound on how long a transaction writing trips
+# may run after stamping updated_at: import_trips rolls back a batch that takes longer.
+CHANGE_FEED_SETTLE = config('CHANGE_FEED_SETTLE', default=5, cast=int)
+
+# Deleted trip tombstones are kept this many days by `manage.py purge_tombstones`, a change
+# feed cursor older than that answers 410 and the partner syncs again from scratch
+CHANGE_FEED_RETENTION_DAYS = config('CHANGE_FEED_RETENTION_DAYS', default=30, cast=int)
+
+# Seconds between the checks each worker makes for seat changes of a trip with open booking
+# pages, one query per trip whatever the number of pages. Bookings made by the same worker
+# are pushed at once.
+SEAT_EVENTS_POLL_INTERVAL = config('SEAT_EVENTS_POLL_INTERVAL', default=1.0, cast=float)
+
+# Payment gateway used by the booking views, 'local' swaps Razorpay for the offline
+# stand-in in travels/payments.py (benchmarks, CI)
+PAYMENT_GATEWAY = config('PAYMENT_GATEWAY', default='razorpay')
+
+# Signs and verifies the local gateway's payments, the server and benchmark_http need the same
+# value. Required with PAYMENT_GATEWAY=local, e.g. `openssl rand -hex 32`.
+PAYMENT_LOCAL_SECRET = config('PAYMENT_LOCAL_SECRET', default='')
+
+if 'test' in sys.argv:
+    PAYMENT_LOCAL_SECRET = secrets.token_hex(32)
+
+# Request metrics served on /metrics. Workers share their numbers through files in METRICS_DIR,
+# clear it when the server starts. With METRICS_TOKEN set scrapes need "Authorization: Bearer <token>".
+METRICS_DIR = config('METRICS_DIR', default='')
+METRICS_TOKEN = config('METRICS_TOKEN', default='')
+
+# Slow query and N+1 logging (logger "travels.queries") for this share of requests, 0 turns it off.
+# Queries slower than SLOW_QUERY_MS are logged with their EXPLAIN plan and the app line that ran them.
+QUERY_INSPECTION_SAMPLE_RATE = config('QUERY_INSPECTION_SAMPLE_RATE', default=0.0, cast=float)
+SLOW_QUERY_MS = config('SLOW_QUERY_MS', default=200, cast=float)
+N_PLUS_ONE_THRESHOLD = config('N_PLUS_ONE_THRESHOLD', default=5, cast=int)
+
+# Request profiling, see travels/profiling.py. Requests with a valid X-Profile-Token header are always
+# profiled, PROFILING_SAMPLE_RATE of the others are and kept when slower than PROFILING_MIN_MS.
+# PROFILER is 'sampling' (collapsed stacks for flamegraphs) or 'cprofile' (pstats files).
+PROFILER = config('PROFILER', default='sampling')
+PROFILING_DIR = config('PROFILING_DIR', default=str(BASE_DIR / 'profiles'))
+PROFILING_SAMPLE_RATE = config('PROFILING_SAMPLE_RATE', default=0.0, cast=float)
+PROFILING_MIN_MS = config('PROFILING_MIN_MS', default=500, cast=float)
+PROFILING_INTERVAL_MS = config('PROFILING_INTERVAL_MS', default=1, cast=float)
+PROFILING_KEEP = config('PROFILING_KEEP', default=200, cast=int)
+PROFILING_TOKEN_MAX_AGE = config('PROFILING_TOKEN_MAX_AGE', default=3600, cast=int)
+
+# Tracing, see travels/tracing.py. TRACING_EXPORTER is '' (trace ids in logs only), 'file' (JSON lines
+# in TRACING_FILE) or 'otlp' (OTLP/HTTP JSON to TRACING_OTLP_ENDPOINT, e.g. `manage.py trace_collector`)
+TRACING_EXPORTER = config('TRACING_EXPORTER', default='')
+TRACING_FILE = config('TRACING_FILE', default=str(BASE_DIR / 'traces.jsonl'))
+TRACING_OTLP_ENDPOINT = config('TRACING_OTLP_ENDPOINT', default='http://127.0.0.1:4318/v1/traces')
+TRACING_SAMPLE_RATE = config('TRACING_SAMPLE_RATE', default=1.0, cast=float)
+TRACING_SERVICE_NAME = config('TRACING_SERVICE_NAME', default='travelease')
+
+# Memory census, see travels/memory.py. MEMORY_TRACING starts tracemalloc (slows allocations down,
+# turn it on for the workers you are investigating). MEMORY_CENSUS_INTERVAL > 0 logs a census to
+# "travels.memory" every that many seconds; staff can also fetch one from /diagnostics/memory/.
+MEMORY_TRACING = config('MEMORY_TRACING', default=False, cast=bool)
+MEMORY_TRACE_FRAMES = config('MEMORY_TRACE_FRAMES', default=1, cast=int)
+MEMORY_CENSUS_INTERVAL = config('MEMORY_CENSUS_INTERVAL', default=0, cast=float)
+
+# App logs carry the trace and span id of the request that wrote them
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'filters': {
+        'trace_context': {'()': 'travels.tracing.TraceContextFilter'},
+    },
+    'formatters': {
+        'traced': {'format': '%(asctime)s %(levelname)s %(name)s [trace=%(trace_id)s span=%(span_id)s] %(message)s'},
+    },
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler', 'filters': ['trace_context'], 'formatter': 'traced'},
+    },
+    'loggers': {
+        'travels': {'handlers': ['console'], 'level': config('TRAVELS_LOG_LEVEL', default='INFO'), 'propagate': False},
+    },
+}
+
+# Tests check log lines with assertLogs, keep them off the test runner's output
+if 'test' in sys.argv:
+    LOGGING['handlers']['console'] = {'class': 'logging.NullHandler'}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -1,8 +1,77 @@
 from django.contrib import admin
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
 from .models import TravelModes , TravelOptions , PassengerDetails , BookingTrip
 # Register your models here.
 
-admin.site.register(TravelModes)
-admin.site.register(TravelOptions)
-admin.site.register(PassengerDetails)
-admin.site.register(BookingTrip)
+# Tables bigger than this show the planner's row estimate instead of a COUNT(*)
+APPROXIMATE_COUNT_THRESHOLD = 100000
+
+
+# Paginator for big changelists, an unfiltered COUNT(*) on a six-figure table is a
+# full scan on PostgreSQL, so fall back to the pg_class estimate when it's that large
+class ApproximateCountPaginator(Paginator):
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        connection = connections[queryset.db]
+        if connection.vendor == 'postgresql' and not queryset.query.where:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                    [queryset.model._meta.db_table],
+                )
+                row = cursor.fetchone()
+            if row and row[0] > APPROXIMATE_COUNT_THRESHOLD:
+                return row[0]
+        return super().count
+
+
+# Shared settings for the large tables, no full count next to filtered results
+class LargeTableAdmin(admin.ModelAdmin):
+    paginator = ApproximateCountPaginator
+    show_full_result_count = False
+    list_per_page = 50
+
+
+@admin.register(TravelModes)
+class TravelModesAdmin(admin.ModelAdmin):
+    list_display = ('travel_mode',)
+    search_fields = ('travel_mode',)
+
+
+@admin.register(TravelOptions)
+class TravelOptionsAdmin(LargeTableAdmin):
+    list_display = ('source', 'destination', 'traveltype', 'travel_date', 'return_date', 'price', 'available_seats')
+    list_select_related = ('traveltype',)
+    list_filter = ('traveltype',)
+    # Backs the trip autocomplete. Exact city names: istartswith compiles to UPPER(col) LIKE,
+    # which no index serves, exact matches seek the natural key and destination indexes
+    search_fields = ('source__exact', 'destination__exact')
+    date_hierarchy = 'travel_date'
+    autocomplete_fields = ('traveltype',)
+
+
+@admin.register(PassengerDetails)
+class PassengerDetailsAdmin(LargeTableAdmin):
+    list_display = ('name', 'age', 'adhar_number', 'email')
+    # Exact matches only so both lookups hit their indexes
+    search_fields = ('adhar_number__exact', 'name__exact')
+
+
+@admin.register(BookingTrip)
+class BookingTripAdmin(LargeTableAdmin):
+    list_display = (
+        'booking_reference', 'user', 'trip', 'number_of_seats', 'total_price',
+        'booking_status', 'payment_status', 'booked_at',
+    )
+    list_select_related = ('user', 'trip')
+    list_filter = ('booking_status', 'payment_status')
+    search_fields = ('booking_reference__exact', 'razorpay_order_id__exact', 'user__username__exact')
+    date_hierarchy = 'booked_at'
+    # Never render a <select> with every user, trip or passenger
+    autocomplete_fields = ('user', 'trip', 'passengers')
+    readonly_fields = ('booked_at', 'booking_reference')
@@ -0,0 +1,227 @@
+import base64
+import hashlib
+import json
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+from django.db.models import Count, Max, Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from travels.models import TravelOptions, TripTombstone
+from travels.search import SEARCH_PARAMS, SearchError, filter_trips
+
+try:
+    import orjson
+except ImportError:  # the stdlib encoder gives the same output, only slower
+    orjson = None
+
+
+API_VERSION = 'v1'
+
+# Field name in the API -> lookup, the order of the default response
+TRIP_FIELDS = {
+    'id': 'id',
+    'source': 'source',
+    'destination': 'destination',
+    'travel_mode': 'traveltype__travel_mode',
+    'travel_mode_id': 'traveltype_id',
+    'travel_date': 'travel_date',
+    'return_date': 'return_date',
+    'duration': 'duration',
+    'price': 'price',
+    'number_of_persons': 'number_of_persons',
+    'available_seats': 'available_seats',
+    'updated_at': 'updated_at',
+}
+
+# Values the encoders don't take as is: money as an exact string, durations in seconds
+CONVERTERS = {
+    'price': str,
+    'duration': lambda value: int(value.total_seconds()),
+}
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+
+# Newest trips first, the id breaks ties so every row has one place in the order
+ORDERING = ('-travel_date', '-id')
+
+
+def dumps(data):
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, separators=(',', ':'), default=datetime.isoformat).encode()
+
+
+# Opaque cursor: the sort key of the last row of the previous page
+def encode_cursor(*values):
+    raw = '|'.join(value.isoformat() if isinstance(value, datetime) else str(value) for value in values)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+# `parsers` turn each part back into a value, e.g. (parse_datetime, int)
+def decode_cursor(cursor, parsers=(parse_datetime, int)):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        parts = raw.split('|')
+        if len(parts) != len(parsers):
+            raise ValueError(raw)
+        values = tuple(parse(part) for parse, part in zip(parsers, parts))
+    except ValueError:
+        values = (None,)
+    if None in values:
+        raise SearchError("Invalid cursor")
+    return values
+
+
+@dataclass
+class TripQuery:
+    trips: object
+    fields: list
+    cursor: tuple
+    limit: int
+    params: list
+
+    # Everything the response depends on besides the rows themselves
+    def key(self):
+        return hashlib.md5(repr((API_VERSION, self.params, self.fields, self.cursor, self.limit)).encode()).hexdigest()
+
+
+def parse_trip_query(params):
+    trips = filter_trips(TravelOptions.objects.all(), params)
+
+    fields = parse_fields(params.get('fields'))
+    limit = parse_limit(params.get('limit'))
+    cursor = decode_cursor(params['cursor']) if params.get('cursor') else None
+    values = [(name, params[name]) for name in SEARCH_PARAMS if name in params]
+    return TripQuery(trips=trips, fields=fields, cursor=cursor, limit=limit, params=values)
+
+
+# Validator for conditional GETs: changes when a matching trip is added, edited or deleted,
+# read with one aggregate instead of fetching the page
+def trip_query_etag(query):
+    state = query.trips.aggregate(count=Count('pk'), updated=Max('updated_at'))
+    updated = state['updated'].timestamp() if state['updated'] else 0
+    return f"trips-{query.key()}-{state['count']}-{updated:.6f}"
+
+
+# Rows of one page plus one more (telling whether a next page exists): the selected fields, then
+# the travel_date and id the next cursor is made of
+def page_rows(query):
+    trips = query.trips.order_by(*ORDERING)
+    if query.cursor:
+        travel_date, trip_id = query.cursor
+        # The redundant travel_date bound lets the OR below start from an index range seek
+        trips = trips.filter(travel_date__lte=travel_date).filter(
+            Q(travel_date__lt=travel_date) | Q(travel_date=travel_date, id__lt=trip_id)
+        )
+
+    lookups = [TRIP_FIELDS[name] for name in query.fields]
+    return trips.values_list(*lookups, 'travel_date', 'id')[:query.limit + 1]
+
+
+# One page of trips as dicts of the selected fields, and the cursor of the next page (None on
+# the last one). Rows come straight from values_list(), no model instances are built.
+def trip_page(query):
+    rows = list(page_rows(query))
+    next_cursor = encode_cursor(*rows[query.limit - 1][-2:]) if len(rows) > query.limit else None
+
+    return serialize_rows(rows[:query.limit], query.fields), next_cursor
+
+
+# values_list() rows (extra trailing columns ignored) as dicts of `fields`
+def serialize_rows(rows, fields):
+    converters = [(i, CONVERTERS[name]) for i, name in enumerate(fields) if name in CONVERTERS]
+    results = []
+    for row in rows:
+        row = list(row[:len(fields)])
+        for i, convert in converters:
+            if row[i] is not None:
+                row[i] = convert(row[i])
+        results.append(dict(zip(fields, row)))
+    return results
+
+
+def parse_fields(value):
+    if not value:
+        return list(TRIP_FIELDS)
+    fields = [name.strip() for name in value.split(',') if name.strip()]
+    unknown = [name for name in fields if name not in TRIP_FIELDS]
+    if unknown or not fields:
+        raise SearchError(f"Unknown fields: {', '.join(unknown)}. Choose from {', '.join(TRIP_FIELDS)}")
+    return fields
+
+
+def parse_limit(value):
+    limit = value or str(DEFAULT_LIMIT)
+    # isdecimal(), not isdigit(): digits like '²' pass isdigit() but int() rejects them
+    if not limit.isdecimal() or not 1 <= int(limit) <= MAX_LIMIT:
+        raise SearchError(f"limit must be a number from 1 to {MAX_LIMIT}")
+    return int(limit)
+
+
+# Kinds of change feed entries, in their order between entries changed at the same time
+CHANGED, DELETED = 0, 1
+
+
+# Rows of `kind` that come after the cursor in (changed at, kind, id) order. The redundant
+# lower bound lets the OR start from an index range seek.
+def after(cursor, kind, time_field):
+    if cursor is None:
+        return Q()
+    changed_at, cursor_kind, pk = cursor
+    later = Q(**{f"{time_field}__gt": changed_at})
+    if kind > cursor_kind:
+        return Q(**{f"{time_field}__gte": changed_at})
+    if kind < cursor_kind:
+        return later
+    return Q(**{f"{time_field}__gte": changed_at}) & (later | Q(**{time_field: changed_at, 'id__gt': pk}))
+
+
+# Trips edited after the cursor and before `horizon`, oldest first: the selected fields, then
+# updated_at and id
+def changed_rows(cursor, limit, fields, horizon):
+    lookups = [TRIP_FIELDS[name] for name in fields]
+    return (TravelOptions.objects.filter(after(cursor, CHANGED, 'updated_at'), updated_at__lte=horizon)
+            .order_by('updated_at', 'id').values_list(*lookups, 'updated_at', 'id')[:limit + 1])
+
+
+# Tombstones of trips deleted after the cursor and before `horizon`, oldest first
+def deleted_rows(cursor, limit, horizon):
+    return (TripTombstone.objects.filter(after(cursor, DELETED, 'deleted_at'), deleted_at__lte=horizon)
+            .order_by('deleted_at', 'id').values_list('trip_id', 'deleted_at', 'id')[:limit + 1])
+
+
+# Whether deletions after the cursor may already have been purged with their tombstones
+def cursor_expired(cursor, retention_days):
+    return timezone.now() - cursor[0] > timedelta(days=retention_days)
+
+
+# Change feed page: trips edited and trips deleted (tombstones) after the cursor, oldest first,
+# as (changes, next cursor, whether more are waiting). Only changes older than `settle` seconds
+# are returned: updated_at is stamped before commit, a row still in flight could otherwise land
+# behind a cursor already handed out. Writers keep their transactions shorter than that window.
+def change_page(cursor, limit, fields, settle):
+    horizon = timezone.now() - timedelta(seconds=settle)
+    changed = changed_rows(cursor, limit, fields, horizon)
+    deleted = deleted_rows(cursor, limit, horizon)
+
+    entries = [((row[-2], CHANGED, row[-1]), row) for row in changed]
+    entries += [((changed_at, DELETED, pk), trip_id) for trip_id, changed_at, pk in deleted]
+    entries.sort(key=lambda entry: entry[0])
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+
+    changes = []
+    for (changed_at, kind, _), row in entries:
+        if kind == CHANGED:
+            change = serialize_rows([row], fields)[0]
+            change.update(id=row[-1], deleted=False, changed_at=changed_at)
+        else:
+            change = {'id': row, 'deleted': True, 'changed_at': changed_at}
+        changes.append(change)
+
+    # Without changes the client keeps its cursor and polls again later
+    next_cursor = encode_cursor(*entries[-1][0]) if entries else (encode_cursor(*cursor) if cursor else None)
+    return changes, next_cursor, has_more
@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class TravelsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'travels'
+
+    def ready(self):
+        import travels.signals  # noqa: F401
+        from travels.memory import start_tracing
+        start_tracing()
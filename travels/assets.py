@@ -0,0 +1,129 @@
+import json
+import re
+import subprocess
+from pathlib import Path
+
+from django.conf import settings
+
+
+ASSETS_DIR = settings.BASE_DIR / 'assets'
+OUTPUT_DIR = settings.BASE_DIR / 'travels' / 'static' / 'travels'
+FONT_AWESOME_DIR = ASSETS_DIR / 'node_modules' / '@fortawesome' / 'fontawesome-free'
+
+ICON_CLASS = re.compile(r"\bfa-([a-z0-9]+(?:-[a-z0-9]+)*)\b")
+ICON_SOURCES = ('templates/**/*.html',)
+
+# Font Awesome style -> (font file, font family, weight, classes selecting it)
+ICON_FONTS = {
+    'solid': ('fa-solid-900', 'Font Awesome 6 Free', 900, ('.fa', '.fas', '.fa-solid')),
+    'brands': ('fa-brands-400', 'Font Awesome 6 Brands', 400, ('.fab', '.fa-brands')),
+}
+
+# Font Awesome modifier classes the templates may use, only the used ones are shipped
+ICON_MODIFIERS = {
+    'spin': ".fa-spin{animation:fa-spin 2s linear infinite}"
+            "@keyframes fa-spin{0%{transform:rotate(0deg)}to{transform:rotate(360deg)}}",
+    'fw': ".fa-fw{text-align:center;width:1.25em}",
+}
+
+
+class AssetBuildError(Exception):
+    pass
+
+
+# Compiles the Tailwind CSS with only the classes the templates use
+def build_css():
+    try:
+        subprocess.run(['npm', 'run', '--silent', 'build:css'], cwd=ASSETS_DIR, check=True)
+    except (OSError, subprocess.CalledProcessError) as e:
+        raise AssetBuildError(f"Tailwind build failed ({e}), run `npm install` in {ASSETS_DIR} first")
+    return OUTPUT_DIR / 'app.css'
+
+
+# Every fa-* class written in the templates, modifiers included
+def used_icon_classes(base_dir=settings.BASE_DIR):
+    names = set()
+    for pattern in ICON_SOURCES:
+        for path in Path(base_dir).glob(pattern):
+            names.update(ICON_CLASS.findall(path.read_text(encoding='utf-8', errors='ignore')))
+    return names
+
+
+# Font Awesome's metadata reduced to {class name: (style, codepoint)}, old names included,
+# so v5 names like "map-marker-alt" keep working
+def icon_index(metadata):
+    index = {}
+    for name, icon in metadata.items():
+        styles = [style for style in icon.get('free', icon.get('styles', [])) if style in ICON_FONTS]
+        if not styles:
+            continue
+        entry = (styles[0], int(icon['unicode'], 16))
+        for alias in [name, *icon.get('aliases', {}).get('names', [])]:
+            index.setdefault(alias, entry)
+    return index
+
+
+# Icons to ship as {class name: (style, codepoint)}, the used modifiers and the classes matching
+# neither (pro-only icons, typos), which render as blanks
+def resolve_icons(classes, index):
+    icons = {name: index[name] for name in sorted(classes) if name in index}
+    modifiers = sorted(name for name in classes if name in ICON_MODIFIERS)
+    unknown = sorted(name for name in classes if name not in index and name not in ICON_MODIFIERS)
+    return icons, modifiers, unknown
+
+
+def icon_css(icons, modifiers=()):
+    styles = sorted({style for style, _ in icons.values()})
+    rules = []
+    for style in styles:
+        font, family, weight, selectors = ICON_FONTS[style]
+        rules.append(
+            f'@font-face{{font-family:"{family}";font-style:normal;font-weight:{weight};font-display:block;'
+            f'src:url(webfonts/{font}.woff2) format("woff2")}}'
+        )
+        rules.append(f'{",".join(selectors)}{{font-family:"{family}";font-weight:{weight}}}')
+    every = ','.join(selector for style in styles for selector in ICON_FONTS[style][3])
+    if every:
+        rules.append(
+            f"{every}{{-moz-osx-font-smoothing:grayscale;-webkit-font-smoothing:antialiased;display:inline-block;"
+            f"font-style:normal;font-variant:normal;line-height:1;text-rendering:auto}}"
+        )
+    rules.extend(ICON_MODIFIERS[name] for name in modifiers)
+    rules.extend(f'.fa-{name}:before{{content:"\\{codepoint:x}"}}' for name, (_, codepoint) in icons.items())
+    return '\n'.join(rules) + '\n'
+
+
+# Cuts each webfont down to the used glyphs, as woff2
+def subset_fonts(icons, output_dir):
+    try:
+        from fontTools import subset
+    except ImportError:
+        raise AssetBuildError("Subsetting the icon fonts needs fonttools and brotli, see assets/requirements.txt")
+    sizes = {}
+    (output_dir / 'webfonts').mkdir(parents=True, exist_ok=True)
+    for style in sorted({style for style, _ in icons.values()}):
+        font_name = ICON_FONTS[style][0]
+        source = FONT_AWESOME_DIR / 'webfonts' / f'{font_name}.woff2'
+        target = output_dir / 'webfonts' / f'{font_name}.woff2'
+        options = subset.Options()
+        options.flavor = 'woff2'
+        options.layout_features = []
+        options.name_IDs = []
+        font = subset.load_font(str(source), options)
+        subsetter = subset.Subsetter(options)
+        subsetter.populate(unicodes=[codepoint for s, codepoint in icons.values() if s == style])
+        subsetter.subset(font)
+        subset.save_font(font, str(target), options)
+        sizes[target.name] = (source.stat().st_size, target.stat().st_size)
+    return sizes
+
+
+def build_icons(output_dir=OUTPUT_DIR):
+    metadata_path = FONT_AWESOME_DIR / 'metadata' / 'icons.json'
+    if not metadata_path.exists():
+        raise AssetBuildError(f"{metadata_path} is missing, run `npm install` in {ASSETS_DIR} first")
+    index = icon_index(json.loads(metadata_path.read_text()))
+    icons, modifiers, unknown = resolve_icons(used_icon_classes(), index)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    (output_dir / 'icons.css').write_text(icon_css(icons, modifiers))
+    return icons, unknown, subset_fonts(icons, output_dir)
@@ -0,0 +1,271 @@
+import os
+import pickle
+import threading
+import time
+import weakref
+import zlib
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.files import locks
+
+
+MISSING = object()
+
+
+# Shared cache in a directory, for one host (development, CI, the workers of one container).
+# Django's FileBasedCache with an atomic add() and an incr() that keeps the expiry, both
+# serialized through a small, fixed set of lock files, and culling only every `cull_every`
+# writes instead of listing the directory on each one.
+class FileCache(FileBasedCache):
+    lock_stripes = 64
+    cull_every = 100
+
+    def __init__(self, dir, params):
+        super().__init__(dir, params)
+        self._writes = 0
+
+    @contextmanager
+    def _locked(self, key, version):
+        stripe = int(os.path.basename(self._key_to_file(key, version))[:8], 16) % self.lock_stripes
+        directory = os.path.join(self._dir, 'locks')
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, f'{stripe:02d}.lock'), 'ab') as fh:
+            locks.lock(fh, locks.LOCK_EX)
+            try:
+                yield
+            finally:
+                locks.unlock(fh)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        with self._locked(key, version):
+            return super().add(key, value, timeout, version)
+
+    def incr(self, key, delta=1, version=None):
+        with self._locked(key, version):
+            try:
+                with open(self._key_to_file(key, version), 'rb') as f:
+                    expiry = pickle.load(f)
+                    value = pickle.loads(zlib.decompress(f.read()))
+            except FileNotFoundError:
+                expiry, value = 0, None
+            if expiry is not None and expiry < time.time():
+                raise ValueError(f"Key '{key}' not found")
+            value += delta
+            self.set(key, value, None if expiry is None else expiry - time.time(), version)
+            return value
+
+    def _cull(self):
+        self._writes += 1
+        if self._writes % self.cull_every == 1:
+            super()._cull()
+
+
+# Bounded, per-process LRU of pickled values with their own short expiry
+class LocalLRU:
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return MISSING
+            expires_at, pickled = entry
+            if expires_at < time.monotonic():
+                del self.entries[key]
+                return MISSING
+            self.entries.move_to_end(key)
+        return pickle.loads(pickled)
+
+    def set(self, key, value, ttl):
+        pickled = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        with self.lock:
+            self.entries[key] = (time.monotonic() + ttl, pickled)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+# Two-tier cache backend: an in-process LRU (LOCAL_MAX_ENTRIES entries, each kept at most
+# LOCAL_TIMEOUT seconds) in front of the cache named by SHARED_ALIAS. Reads that hit the
+# local tier never leave the process; writes and deletes go to both tiers. Another worker's
+# write is seen here once the local copy expires, so keep LOCAL_TIMEOUT short and never put
+# data that must be consistent at once (sessions) behind this backend.
+class TieredCache(BaseCache):
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self.shared_alias = options.get('SHARED_ALIAS', 'shared')
+        self.local_timeout = options.get('LOCAL_TIMEOUT', 5)
+        self.local = LocalLRU(options.get('LOCAL_MAX_ENTRIES', 1000))
+
+    @property
+    def shared(self):
+        return caches[self.shared_alias]
+
+    def _local_ttl(self, timeout):
+        timeout = self.get_backend_timeout(timeout)
+        if timeout is None:
+            return self.local_timeout
+        return min(self.local_timeout, max(timeout - time.time(), 0))
+
+    def get(self, key, default=None, version=None):
+        local_key = self.make_and_validate_key(key, version)
+        value = self.local.get(local_key)
+        if value is not MISSING:
+            return value
+        value = self.shared.get(key, MISSING, version=version)
+        if value is MISSING:
+            return default
+        self.local.set(local_key, value, self.local_timeout)
+        return value
+
+    def get_many(self, keys, version=None):
+        found, missing = {}, []
+        for key in keys:
+            value = self.local.get(self.make_and_validate_key(key, version))
+            if value is MISSING:
+                missing.append(key)
+            else:
+                found[key] = value
+        if missing:
+            shared = self.shared.get_many(missing, version=version)
+            for key, value in shared.items():
+                self.local.set(self.make_and_validate_key(key, version), value, self.local_timeout)
+            found.update(shared)
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.shared.set(key, value, timeout, version=version)
+        self.local.set(self.make_and_validate_key(key, version), value, self._local_ttl(timeout))
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        failed = self.shared.set_many(data, timeout, version=version)
+        for key, value in data.items():
+            if key not in failed:
+                self.local.set(self.make_and_validate_key(key, version), value, self._local_ttl(timeout))
+        return failed
+
+    # Atomic in the shared tier only, locks and counters never answer from the local one
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        added = self.shared.add(key, value, timeout, version=version)
+        if added:
+            self.local.set(self.make_and_validate_key(key, version), value, self._local_ttl(timeout))
+        return added
+
+    def incr(self, key, delta=1, version=None):
+        self.local.delete(self.make_and_validate_key(key, version))
+        return self.shared.incr(key, delta, version=version)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.shared.touch(key, timeout, version=version)
+
+    def has_key(self, key, version=None):
+        return self.get(key, MISSING, version=version) is not MISSING
+
+    def delete(self, key, version=None):
+        self.local.delete(self.make_and_validate_key(key, version))
+        return self.shared.delete(key, version=version)
+
+    def delete_many(self, keys, version=None):
+        for key in keys:
+            self.local.delete(self.make_and_validate_key(key, version))
+        self.shared.delete_many(keys, version=version)
+
+    def clear(self):
+        self.local.clear()
+        self.shared.clear()
+
+
+_key_locks = weakref.WeakValueDictionary()
+_key_locks_guard = threading.Lock()
+
+
+def _key_lock(key):
+    with _key_locks_guard:
+        lock = _key_locks.get(key)
+        if lock is None:
+            lock = _key_locks[key] = threading.Lock()
+        return lock
+
+
+# Single-flight cache read: on a miss only one caller computes the value, threads of this
+# process wait on a lock, other processes on the shared "<key>:lock" entry, polling for the
+# result for up to `wait` seconds before computing it themselves.
+def get_or_compute(key, compute, timeout=DEFAULT_TIMEOUT, cache_alias='default', lock_timeout=30, wait=5.0):
+    cache = caches[cache_alias]
+    value = cache.get(key, MISSING)
+    if value is not MISSING:
+        return value
+    with _key_lock(key):
+        value = cache.get(key, MISSING)
+        if value is not MISSING:
+            return value
+        lock = f"{key}:lock"
+        if cache.add(lock, os.getpid(), lock_timeout):
+            try:
+                value = compute()
+                cache.set(key, value, timeout)
+                return value
+            finally:
+                cache.delete(lock)
+        deadline = time.monotonic() + wait
+        while time.monotonic() < deadline:
+            time.sleep(0.05)
+            value = cache.get(key, MISSING)
+            if value is not MISSING:
+                return value
+        return compute()
+
+
+# Versioned key namespace: every key embeds the namespace's current version, so invalidate()
+# drops all of them at once by moving to a new version; old entries just age out
+class Namespace:
+
+    def __init__(self, name, cache_alias='default'):
+        self.name = name
+        self.cache_alias = cache_alias
+
+    @property
+    def version_key(self):
+        return f"namespace:{self.name}"
+
+    def version(self):
+        cache = caches[self.cache_alias]
+        version = cache.get(self.version_key)
+        if version is None:
+            # Start from the clock, never from a number keys of an evicted version may still use
+            cache.add(self.version_key, time.time_ns() // 1000, None)
+            version = cache.get(self.version_key)
+        return version
+
+    def key(self, name):
+        return f"{self.name}:{self.version()}:{name}"
+
+    def invalidate(self):
+        cache = caches[self.cache_alias]
+        try:
+            cache.incr(self.version_key)
+        except ValueError:
+            cache.add(self.version_key, time.time_ns() // 1000, None)
+
+
+# Everything derived from trips and travel modes: the travel mode list, cached pages. Admin
+# edits and imports invalidate it; seat counts are left to the page cache's short timeout.
+trips = Namespace('trips')
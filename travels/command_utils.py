@@ -0,0 +1,26 @@
+import math
+from itertools import islice
+
+
+# Load data written by seed_load_data and replayed by benchmark_http, every generated user
+# shares the password so benchmarks can log in as any of them
+LOAD_USER_PREFIX = 'load_user_'
+LOAD_USER_PASSWORD = 'load-test-password'
+LOAD_BOOKING_PREFIX = 'LD'
+
+# Percentiles reported by benchmark_http and trace_report
+PERCENTILES = (50, 95, 99)
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+# Nearest-rank percentile of already sorted samples, None when there are none
+def percentile(ordered, pct):
+    if not ordered:
+        return None
+    rank = max(math.ceil(pct / 100 * len(ordered)) - 1, 0)
+    return ordered[rank]
@@ -0,0 +1,154 @@
+import csv
+import io
+import json
+from datetime import datetime, time, timedelta
+
+from asgiref.sync import sync_to_async
+from django.db.models import Prefetch
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from travels.models import BookingTrip, PassengerDetails
+
+
+# Column order of the finance export
+EXPORT_FIELDS = [
+    'booking_reference', 'booked_at', 'booking_status', 'payment_status',
+    'username', 'trip_id', 'source', 'destination', 'travel_mode', 'travel_date',
+    'number_of_seats', 'seat_numbers', 'total_price', 'razorpay_order_id',
+    'razorpay_payment_id', 'passengers',
+]
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'jsonl': 'application/x-ndjson',
+}
+
+# Rows fetched from the database (and written to the client) per round trip
+DEFAULT_CHUNK_SIZE = 2000
+
+
+# Parse the start_date / end_date / status filters shared by the view and the command,
+# raises ValueError for malformed dates
+def parse_export_filters(start_date=None, end_date=None, status=None):
+    filters = {'status': status or None}
+    for name, value in (('start_date', start_date), ('end_date', end_date)):
+        parsed = None
+        if value:
+            parsed = parse_date(value)
+            if not parsed:
+                raise ValueError(f"Invalid {name} format. Use YYYY-MM-DD.")
+        filters[name] = parsed
+    return filters
+
+
+def bookings_for_export(start_date=None, end_date=None, status=None):
+    bookings = BookingTrip.objects.select_related('user', 'trip__traveltype').only(
+        'booking_reference', 'booked_at', 'booking_status', 'payment_status',
+        'number_of_seats', 'seat_numbers', 'total_price', 'razorpay_order_id', 'razorpay_payment_id',
+        'user__username', 'trip__source', 'trip__destination', 'trip__travel_date',
+        'trip__traveltype__travel_mode',
+    ).prefetch_related(
+        Prefetch('passengers', queryset=PassengerDetails.objects.only('name', 'age', 'email'))
+    ).order_by('pk')
+
+    # Whole-day bounds on booked_at so the range stays index friendly
+    if start_date:
+        bookings = bookings.filter(booked_at__gte=timezone.make_aware(datetime.combine(start_date, time.min)))
+    if end_date:
+        bookings = bookings.filter(booked_at__lt=timezone.make_aware(datetime.combine(end_date + timedelta(days=1), time.min)))
+    if status:
+        bookings = bookings.filter(booking_status=status)
+    return bookings
+
+
+# Yield one flat dict per booking, .iterator() keeps only chunk_size bookings
+# (and their prefetched passengers) in memory at a time
+def export_rows(bookings, chunk_size=DEFAULT_CHUNK_SIZE):
+    for booking in bookings.iterator(chunk_size=chunk_size):
+        trip = booking.trip
+        yield {
+            'booking_reference': booking.booking_reference,
+            'booked_at': booking.booked_at.isoformat(),
+            'booking_status': booking.booking_status,
+            'payment_status': booking.payment_status,
+            'username': booking.user.username,
+            'trip_id': booking.trip_id,
+            'source': trip.source,
+            'destination': trip.destination,
+            'travel_mode': trip.traveltype.travel_mode,
+            'travel_date': trip.travel_date.isoformat(),
+            'number_of_seats': booking.number_of_seats,
+            'seat_numbers': booking.seat_numbers or [],
+            'total_price': str(booking.total_price),
+            'razorpay_order_id': booking.razorpay_order_id or '',
+            'razorpay_payment_id': booking.razorpay_payment_id or '',
+            'passengers': [
+                {'name': p.name, 'age': p.age, 'email': p.email}
+                for p in booking.passengers.all()
+            ],
+        }
+
+
+def _grouped(lines, size):
+    buffer = []
+    for line in lines:
+        buffer.append(line)
+        if len(buffer) >= size:
+            yield ''.join(buffer)
+            buffer = []
+    if buffer:
+        yield ''.join(buffer)
+
+
+# Spreadsheets run a cell starting with one of these as a formula
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+# Quote text a user typed (names, usernames) so Excel and Sheets show it instead of evaluating it
+def spreadsheet_safe(value):
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def _csv_lines(rows):
+    out = io.StringIO()
+    writer = csv.writer(out)
+
+    def line(values):
+        writer.writerow(values)
+        value = out.getvalue()
+        out.seek(0)
+        out.truncate()
+        return value
+
+    # Header goes out before the first query runs
+    yield line(EXPORT_FIELDS)
+    for row in rows:
+        row['seat_numbers'] = ' '.join(str(seat) for seat in row['seat_numbers'])
+        row['passengers'] = '; '.join(f"{p['name']} ({p['age']})" for p in row['passengers'])
+        yield line(spreadsheet_safe(row[field]) for field in EXPORT_FIELDS)
+
+
+def _jsonl_lines(rows):
+    for row in rows:
+        yield json.dumps(row, separators=(',', ':')) + '\n'
+
+
+# Encode rows as csv / jsonl text, grouped into one string per chunk_size rows
+def render_export(rows, fmt, chunk_size=DEFAULT_CHUNK_SIZE):
+    lines = _csv_lines(rows) if fmt == 'csv' else _jsonl_lines(rows)
+    first = next(lines, None)
+    if first is not None:
+        yield first
+    yield from _grouped(lines, chunk_size)
+
+
+# ASGI servers buffer sync iterators completely before sending, so under uvicorn the
+# chunks are pulled one at a time from a worker thread instead
+async def aiter_chunks(chunks):
+    sentinel = object()
+    pull = sync_to_async(next, thread_sensitive=True)
+    while (chunk := await pull(chunks, sentinel)) is not sentinel:
+        yield chunk
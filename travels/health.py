@@ -0,0 +1,37 @@
+import random
+import time
+
+from django.core.management.base import CommandError
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connections
+from django.db.migrations.executor import MigrationExecutor
+
+
+# Retry "SELECT 1" with exponential backoff and jitter until the database answers or `timeout`
+# seconds have passed, returns the number of attempts
+def wait_for_database(alias=DEFAULT_DB_ALIAS, timeout=60.0, initial_delay=0.1, max_delay=5.0, log=None):
+    connection = connections[alias]
+    deadline = time.monotonic() + timeout
+    delay = initial_delay
+    attempt = 0
+    while True:
+        attempt += 1
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            return attempt
+        except OperationalError as e:
+            connection.close()
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise CommandError(f"Database '{alias}' not reachable after {attempt} attempts: {e}")
+            sleep = min(delay * random.uniform(0.5, 1.5), max_delay, remaining)
+            if log:
+                log(f"Database not ready ({e}), retrying in {sleep:.2f}s")
+            time.sleep(sleep)
+            delay = min(delay * 2, max_delay)
+
+
+# Migrations not yet applied on `connection`, empty once the schema is current
+def pending_migrations(connection):
+    executor = MigrationExecutor(connection)
+    return executor.migration_plan(executor.loader.graph.leaf_nodes())
@@ -0,0 +1,248 @@
+import itertools
+import json
+import random
+import subprocess
+import threading
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime, timezone as dt_timezone
+
+import requests
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+
+from travels.command_utils import LOAD_USER_PASSWORD, LOAD_USER_PREFIX, PERCENTILES, percentile
+from travels.models import TravelOptions
+from travels.payments import gateway_secret, sign_payment
+from travels.seat_events import SEATS_PER_TRIP
+
+
+# Thread-safe sink for (url name, latency, status) samples
+class Recorder:
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = defaultdict(list)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+        self.recording = False
+
+    def add(self, name, seconds, status):
+        if not self.recording:
+            return
+        with self.lock:
+            self.samples[name].append(seconds)
+            self.statuses[name][str(status)] += 1
+
+    def summary(self, elapsed):
+        endpoints = {}
+        for name in sorted(self.samples):
+            latencies = sorted(self.samples[name])
+            statuses = dict(self.statuses[name])
+            errors = sum(count for status, count in statuses.items() if not status.isdigit() or int(status) >= 400)
+            endpoints[name] = {
+                'count': len(latencies),
+                'errors': errors,
+                'throughput_rps': round(len(latencies) / elapsed, 2),
+                'mean_ms': round(sum(latencies) / len(latencies) * 1000, 2),
+                'max_ms': round(latencies[-1] * 1000, 2),
+                **{f"p{pct}_ms": round(percentile(latencies, pct) * 1000, 2) for pct in PERCENTILES},
+                'statuses': statuses,
+            }
+        requests_total = sum(e['count'] for e in endpoints.values())
+        return {
+            'total': {
+                'requests': requests_total,
+                'errors': sum(e['errors'] for e in endpoints.values()),
+                'throughput_rps': round(requests_total / elapsed, 2),
+                'elapsed_s': round(elapsed, 2),
+            },
+            'endpoints': endpoints,
+        }
+
+
+# One simulated visitor, logged in as a seeded load user with its own HTTP session
+class VirtualUser:
+
+    def __init__(self, base_url, username, trip_ids, recorder, rng, adhar_numbers):
+        self.base_url = base_url.rstrip('/')
+        self.username = username
+        self.trip_ids = trip_ids
+        self.recorder = recorder
+        self.rng = rng
+        self.adhar_numbers = adhar_numbers
+        self.session = requests.Session()
+        self.secret = gateway_secret()
+
+    def request(self, name, method, path, **kwargs):
+        started = time.perf_counter()
+        try:
+            response = self.session.request(method, self.base_url + path, timeout=30, allow_redirects=False, **kwargs)
+            status = response.status_code
+        except requests.RequestException:
+            response, status = None, 'error'
+        self.recorder.add(name, time.perf_counter() - started, status)
+        return response
+
+    def login(self):
+        self.session.get(self.base_url + reverse('signin'), timeout=30)
+        response = self.session.post(self.base_url + reverse('signin'), timeout=30, allow_redirects=False, data={
+            'username': self.username,
+            'password': LOAD_USER_PASSWORD,
+            'csrfmiddlewaretoken': self.session.cookies.get('csrftoken', ''),
+        })
+        if response.status_code != 302:
+            raise CommandError(f"Could not log in as {self.username} ({response.status_code})")
+
+    def browse(self):
+        params = {}
+        if self.rng.random() < 0.5:
+            params['price_range'] = self.rng.choice([2000, 5000, 10000, 25000])
+        self.request('home', 'GET', reverse('home'), params=params)
+        self.request('details', 'GET', reverse('details', args=[self.rng.choice(self.trip_ids)]))
+        if self.rng.random() < 0.2:
+            self.request('mybookings', 'GET', reverse('mybookings'))
+
+    def book(self):
+        trip_id = self.rng.choice(self.trip_ids)
+        travelers = self.rng.choice([1, 1, 2, 2, 3, 4])
+        self.request('bookingpage', 'GET', reverse('bookingpage', args=[trip_id]), params={'travelers': travelers})
+
+        payload = {
+            'passengers': [
+                {'name': f"Bench {n}", 'age': 30, 'adhar_number': f"{next(self.adhar_numbers):012d}", 'email': 'bench@example.com'}
+                for n in range(travelers)
+            ],
+            'selected_seats': self.rng.sample(range(SEATS_PER_TRIP), travelers),
+        }
+
+        if self.rng.random() < 0.3:
+            self.request('confirm_offline_booking', 'POST', reverse('confirm_offline_booking', args=[trip_id]), json=payload)
+            return
+
+        order = self.request('create_booking', 'POST', reverse('create_booking'), json={'trip_id': trip_id, 'travelers': travelers})
+        if order is None or order.status_code != 200 or not order.json().get('success'):
+            return
+        payment_id = f"pay_bench_{uuid.uuid4().hex[:14]}"
+        payload.update(
+            order_id=order.json()['order_id'],
+            payment_id=payment_id,
+            signature=sign_payment(order.json()['order_id'], payment_id, self.secret),
+        )
+        self.request('confirm_booking', 'POST', reverse('confirm_booking', args=[trip_id]), json=payload)
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, cwd=settings.BASE_DIR, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        "Drive a mixed browse/book workload against a running server and report throughput and "
+        "p50/p95/p99 latency per URL name. Run the server with PAYMENT_GATEWAY=local and a database "
+        "seeded by seed_load_data."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', default='http://127.0.0.1:8000')
+        parser.add_argument('--concurrency', type=int, default=8, help="Virtual users running in parallel")
+        parser.add_argument('--duration', type=float, default=30, help="Measured seconds")
+        parser.add_argument('--warmup', type=float, default=5, help="Seconds of unmeasured traffic first")
+        parser.add_argument('--book-ratio', type=float, default=0.2, help="Share of iterations that book a trip")
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--output', '-o', help="Write the results as JSON")
+        parser.add_argument('--compare', help="Earlier results JSON to diff against")
+
+    def handle(self, *args, **options):
+        if options['concurrency'] <= 0 or options['duration'] <= 0:
+            raise CommandError("--concurrency and --duration must be positive")
+        try:
+            gateway_secret()
+        except ImproperlyConfigured as e:
+            raise CommandError(f"{e}, the same value the server runs with")
+
+        usernames = list(User.objects.filter(username__startswith=LOAD_USER_PREFIX)
+                         .order_by('pk').values_list('username', flat=True)[:options['concurrency']])
+        trip_ids = list(TravelOptions.objects.filter(available_seats__gt=4)
+                        .order_by('pk').values_list('pk', flat=True)[:5000])
+        if not usernames or not trip_ids:
+            raise CommandError("No load data found, run seed_load_data first")
+
+        recorder = Recorder()
+        # 12 digit Aadhaar numbers unique within the run, the confirm views reject duplicates
+        adhar_numbers = itertools.count(random.Random().randrange(100000, 999999) * 10 ** 6)
+        stop = threading.Event()
+        errors = []
+
+        def run(worker):
+            rng = random.Random(f"{options['seed']}:{worker}")
+            user = VirtualUser(options['base_url'], usernames[worker % len(usernames)], trip_ids, recorder, rng, adhar_numbers)
+            try:
+                user.login()
+                while not stop.is_set():
+                    user.book() if rng.random() < options['book_ratio'] else user.browse()
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=run, args=(worker,), daemon=True) for worker in range(options['concurrency'])]
+        for thread in threads:
+            thread.start()
+        time.sleep(options['warmup'])
+        recorder.recording = True
+        started = time.perf_counter()
+        time.sleep(options['duration'])
+        recorder.recording = False
+        elapsed = time.perf_counter() - started
+        stop.set()
+        for thread in threads:
+            thread.join()
+        if errors:
+            raise CommandError(f"Benchmark aborted: {errors[0]}")
+
+        results = {
+            'meta': {
+                'started_at': datetime.now(dt_timezone.utc).isoformat(),
+                'git_commit': git_commit(),
+                **{key: options[key] for key in ('base_url', 'concurrency', 'duration', 'warmup', 'book_ratio', 'seed')},
+            },
+            **recorder.summary(elapsed),
+        }
+
+        self.report(results)
+        if options['compare']:
+            with open(options['compare']) as fh:
+                self.compare(json.load(fh), results)
+        if options['output']:
+            with open(options['output'], 'w') as fh:
+                json.dump(results, fh, indent=2)
+
+    def report(self, results):
+        self.stdout.write(f"{'url name':<26}{'count':>8}{'err':>6}{'rps':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+        for name, stats in results['endpoints'].items():
+            self.stdout.write(
+                f"{name:<26}{stats['count']:>8}{stats['errors']:>6}{stats['throughput_rps']:>9}"
+                f"{stats['p50_ms']:>9}{stats['p95_ms']:>9}{stats['p99_ms']:>9}"
+            )
+        total = results['total']
+        self.stdout.write(self.style.SUCCESS(
+            f"{total['requests']} requests, {total['errors']} errors, {total['throughput_rps']} req/s"
+        ))
+
+    def compare(self, baseline, results):
+        self.stdout.write(f"\nAgainst {baseline['meta'].get('git_commit') or 'baseline'}:")
+        for name, stats in results['endpoints'].items():
+            before = baseline['endpoints'].get(name)
+            if not before:
+                continue
+            p95 = (stats['p95_ms'] - before['p95_ms']) / before['p95_ms'] * 100 if before['p95_ms'] else 0
+            rps = (stats['throughput_rps'] - before['throughput_rps']) / before['throughput_rps'] * 100 if before['throughput_rps'] else 0
+            line = f"{name:<26}p95 {p95:+6.1f}%   rps {rps:+6.1f}%"
+            self.stdout.write(self.style.WARNING(line) if p95 > 10 else line)
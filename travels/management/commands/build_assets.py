@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from travels.assets import AssetBuildError, build_css, build_icons
+
+
+class Command(BaseCommand):
+    help = (
+        "Compile the purged Tailwind CSS and subset the Font Awesome icons the templates use into "
+        "travels/static/travels, run collectstatic afterwards to hash and precompress them"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--skip-css', action='store_true', help="Only rebuild the icons")
+        parser.add_argument('--skip-icons', action='store_true', help="Only rebuild the CSS")
+
+    def handle(self, *args, **options):
+        try:
+            if not options['skip_css']:
+                path = build_css()
+                self.stdout.write(f"CSS        {path.stat().st_size / 1024:.1f} KB  {path.name}")
+            if not options['skip_icons']:
+                icons, unknown, sizes = build_icons()
+                self.stdout.write(f"Icons      {len(icons)} used")
+                for name, (before, after) in sizes.items():
+                    self.stdout.write(f"Font       {before / 1024:.1f} KB -> {after / 1024:.1f} KB  {name}")
+                for name in unknown:
+                    self.stdout.write(self.style.WARNING(f"No free icon named fa-{name}, it renders blank"))
+        except AssetBuildError as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS("Assets built, run collectstatic to publish them"))
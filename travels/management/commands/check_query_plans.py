@@ -0,0 +1,66 @@
+import json
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from travels.query_plans import CRITICAL_QUERIES, compare, explain, sample_parameters
+
+
+class Command(BaseCommand):
+    help = (
+        "EXPLAIN the critical queries against the current (seeded) database and fail on sequential "
+        "scans or estimated cost jumps against the stored baseline plans"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--baseline', default=str(settings.BASE_DIR / 'query_plans.json'), help="Baseline plans JSON")
+        parser.add_argument('--update-baseline', action='store_true', help="Store the current plans as the baseline")
+        parser.add_argument('--analyze', action='store_true', help="EXPLAIN ANALYZE (PostgreSQL, runs the queries)")
+        parser.add_argument('--cost-threshold', type=float, default=1.5,
+                            help="Fail when the estimated cost exceeds the baseline by this factor")
+        parser.add_argument('--query', action='append', choices=sorted(CRITICAL_QUERIES), help="Only these queries")
+
+    def handle(self, *args, **options):
+        if options['cost_threshold'] < 1:
+            raise CommandError("--cost-threshold must be at least 1")
+        vendor = connection.vendor
+        path = Path(options['baseline'])
+        stored = json.loads(path.read_text()) if path.exists() else {}
+        baselines = stored.get(vendor, {})
+
+        params = sample_parameters()
+        names = options['query'] or list(CRITICAL_QUERIES)
+        plans, failed = {}, []
+        for name in names:
+            query = CRITICAL_QUERIES[name]
+            try:
+                plan = explain(query.build(params), vendor, analyze=options['analyze'])
+            except ValueError as e:
+                raise CommandError(str(e))
+            plans[name] = plan
+
+            failures, notes = compare(query, plan, baselines.get(name), options['cost_threshold'])
+            cost = f"cost {plan.cost:.2f}" if plan.cost is not None else "cost n/a"
+            actual = f", {plan.actual_ms:.2f} ms" if plan.actual_ms is not None else ""
+            line = f"{name:<28}{cost}{actual}  [{', '.join(plan.shape())}]"
+            if failures:
+                failed.append(name)
+                self.stdout.write(self.style.ERROR(f"FAIL {line}"))
+            else:
+                self.stdout.write(f"ok   {line}")
+            for message in failures + notes:
+                self.stdout.write(f"       {message}")
+            if options['verbosity'] >= 2:
+                self.stdout.write(f"       {query.description}\n{plan.text}")
+
+        if options['update_baseline']:
+            stored[vendor] = {**baselines, **{name: plan.as_dict() for name, plan in plans.items()}}
+            path.write_text(json.dumps(stored, indent=2, sort_keys=True) + '\n')
+            self.stdout.write(self.style.SUCCESS(f"Baseline for {vendor} written to {path}"))
+            return
+
+        if failed:
+            raise CommandError(f"Query plan regression in {', '.join(failed)}")
+        self.stdout.write(self.style.SUCCESS(f"{len(names)} query plans ok"))
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from travels.exports import (
+    DEFAULT_CHUNK_SIZE, EXPORT_FORMATS, bookings_for_export, export_rows, parse_export_filters, render_export,
+)
+
+
+class Command(BaseCommand):
+    help = "Stream bookings with trip and passenger data to a CSV or JSON Lines file"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=list(EXPORT_FORMATS), default='csv')
+        parser.add_argument('--output', '-o', help="File to write, defaults to stdout")
+        parser.add_argument('--start-date', help="First booking date to include (YYYY-MM-DD)")
+        parser.add_argument('--end-date', help="Last booking date to include (YYYY-MM-DD)")
+        parser.add_argument('--status', help="Only bookings with this booking_status, e.g. Confirmed")
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help="Bookings fetched per query")
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] <= 0:
+            raise CommandError("--chunk-size must be positive")
+        try:
+            filters = parse_export_filters(options['start_date'], options['end_date'], options['status'])
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        rows = export_rows(bookings_for_export(**filters), chunk_size=options['chunk_size'])
+        chunks = render_export(rows, options['format'], chunk_size=options['chunk_size'])
+
+        if options['output']:
+            with open(options['output'], 'w', newline='', encoding='utf-8') as fh:
+                fh.writelines(chunks)
+        else:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
@@ -0,0 +1,225 @@
+import csv
+import json
+import time
+from datetime import datetime, time as dt_time
+from decimal import Decimal, InvalidOperation
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from travels.cache import trips
+from travels.command_utils import batched
+from travels.models import TravelModes, TravelOptions
+
+
+# Columns written on an upsert, the natural key columns never change
+UPDATE_FIELDS = ['traveltype', 'return_date', 'price', 'duration', 'number_of_persons', 'available_seats', 'updated_at']
+
+
+class RowError(ValueError):
+    pass
+
+
+class SettleWindowExceeded(Exception):
+    pass
+
+
+# Read rows lazily from a CSV or JSON Lines file, yielding (line number, dict)
+def read_rows(path, fmt):
+    with open(path, newline='', encoding='utf-8') as fh:
+        if fmt == 'csv':
+            reader = csv.DictReader(fh)
+            for row in reader:
+                yield reader.line_num, row
+        else:
+            for line_no, line in enumerate(fh, start=1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield line_no, json.loads(line)
+                except json.JSONDecodeError as e:
+                    yield line_no, RowError(f"invalid JSON: {e}")
+
+
+def parse_text(value, field):
+    if value is None:
+        return ''
+    if not isinstance(value, str):
+        raise RowError(f"{field} must be a string")
+    return value.strip()
+
+
+def parse_when(value, field):
+    value = parse_text(value, field)
+    if not value:
+        raise RowError(f"{field} is required")
+    parsed = parse_datetime(value)
+    if parsed is None:
+        day = parse_date(value)
+        if day is None:
+            raise RowError(f"{field} must be an ISO date or datetime")
+        parsed = datetime.combine(day, dt_time.min)
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def parse_int(value, field, default=None):
+    if value in (None, ''):
+        if default is None:
+            raise RowError(f"{field} is required")
+        return default
+    try:
+        number = int(value)
+    except (TypeError, ValueError):
+        raise RowError(f"{field} must be an integer")
+    if number < 0:
+        raise RowError(f"{field} must not be negative")
+    return number
+
+
+# Turn a raw row into an unsaved TravelOptions with its duration already computed,
+# bulk_create()/bulk_update() never call save() so this is the only place it happens
+def build_trip(row, modes):
+    if isinstance(row, RowError):
+        raise row
+    if not isinstance(row, dict):
+        raise RowError("row must be an object")
+
+    mode_name = parse_text(row.get('travel_mode'), 'travel_mode')
+    if not mode_name:
+        raise RowError("travel_mode is required")
+    if mode_name not in modes:
+        modes[mode_name] = TravelModes.objects.get_or_create(travel_mode=mode_name)[0].pk
+
+    source = parse_text(row.get('source'), 'source')
+    destination = parse_text(row.get('destination'), 'destination')
+    if not source or not destination:
+        raise RowError("source and destination are required")
+
+    travel_date = parse_when(row.get('travel_date'), 'travel_date')
+    return_date = parse_when(row.get('return_date'), 'return_date')
+    if return_date < travel_date:
+        raise RowError("return_date must be after travel_date")
+
+    price = row.get('price')
+    if isinstance(price, bool) or not isinstance(price, (str, int, float)):
+        raise RowError("price must be a number")
+    try:
+        price = Decimal(str(price).strip())
+    except InvalidOperation:
+        raise RowError("price must be a number")
+    if not price.is_finite() or price < 0:
+        raise RowError("price must be a non-negative number")
+
+    return TravelOptions(
+        traveltype_id=modes[mode_name],
+        source=source,
+        destination=destination,
+        travel_date=travel_date,
+        return_date=return_date,
+        price=price,
+        duration=TravelOptions.compute_duration(travel_date, return_date),
+        number_of_persons=parse_int(row.get('number_of_persons'), 'number_of_persons', default=1),
+        available_seats=parse_int(row.get('available_seats'), 'available_seats'),
+    )
+
+
+def natural_key(trip):
+    return (trip.source, trip.destination, trip.travel_date)
+
+
+# Insert new trips and update existing ones matched on (source, destination, travel_date).
+# updated_at is stamped inside the transaction, and a batch still writing `settle` seconds
+# after that is rolled back: the change feed's CHANGE_FEED_SETTLE window must outlast every
+# commit, or a late one lands behind cursors already handed out. 0 turns the check off.
+def upsert_batch(trips, settle=0):
+    # Last row wins when the same key shows up twice in one batch
+    by_key = {natural_key(trip): trip for trip in trips}
+
+    with transaction.atomic():
+        existing = TravelOptions.objects.filter(
+            source__in={key[0] for key in by_key},
+            destination__in={key[1] for key in by_key},
+            travel_date__in={key[2] for key in by_key},
+        ).values_list('pk', 'source', 'destination', 'travel_date')
+
+        to_update = []
+        for pk, *key in existing:
+            trip = by_key.pop(tuple(key), None)
+            if trip is not None:
+                trip.pk = pk
+                to_update.append(trip)
+
+        stamped = time.monotonic()
+        now = timezone.now()
+        for trip in to_update:
+            trip.updated_at = now
+        if to_update:
+            TravelOptions.objects.bulk_update(to_update, UPDATE_FIELDS)
+        if by_key:
+            TravelOptions.objects.bulk_create(by_key.values())
+        if settle and time.monotonic() - stamped >= settle:
+            raise SettleWindowExceeded(f"a batch took longer than CHANGE_FEED_SETTLE ({settle}s) to write")
+
+    return len(by_key), len(to_update)
+
+
+class Command(BaseCommand):
+    help = "Stream trips from a CSV or JSON Lines file into TravelOptions, upserting on (source, destination, travel_date)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="CSV or .jsonl file to import")
+        parser.add_argument('--format', choices=['csv', 'jsonl'], help="Defaults to the file extension")
+        parser.add_argument('--batch-size', type=int, default=2000, help="Rows written per transaction")
+        parser.add_argument('--strict', action='store_true', help="Abort on the first invalid row")
+
+    def handle(self, *args, **options):
+        path = Path(options['path'])
+        if not path.is_file():
+            raise CommandError(f"{path} does not exist")
+        if options['batch_size'] <= 0:
+            raise CommandError("--batch-size must be positive")
+
+        fmt = options['format'] or ('csv' if path.suffix.lower() == '.csv' else 'jsonl')
+        modes = dict(TravelModes.objects.values_list('travel_mode', 'pk'))
+        stats = {'rows': 0, 'invalid': 0, 'created': 0, 'updated': 0}
+
+        def valid_trips():
+            for line_no, row in read_rows(path, fmt):
+                stats['rows'] += 1
+                try:
+                    yield build_trip(row, modes)
+                except RowError as e:
+                    if options['strict']:
+                        raise CommandError(f"line {line_no}: {e}")
+                    stats['invalid'] += 1
+                    self.stderr.write(f"line {line_no}: {e}")
+
+        started = time.perf_counter()
+        for batch in batched(valid_trips(), options['batch_size']):
+            try:
+                created, updated = upsert_batch(batch, settings.CHANGE_FEED_SETTLE)
+            except SettleWindowExceeded as e:
+                trips.invalidate()
+                raise CommandError(f"{e}, it was rolled back. Earlier batches are saved, "
+                                   f"rerun with a smaller --batch-size")
+            stats['created'] += created
+            stats['updated'] += updated
+            if options['verbosity'] >= 2:
+                elapsed = time.perf_counter() - started
+                self.stdout.write(f"{stats['rows']} rows read ({stats['rows'] / elapsed:.0f} rows/s)")
+
+        # bulk writes send no signals, drop the cached listings here
+        trips.invalidate()
+
+        elapsed = max(time.perf_counter() - started, 1e-9)
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {stats['rows']} rows in {elapsed:.1f}s ({stats['rows'] / elapsed:.0f} rows/s): "
+            f"{stats['created']} created, {stats['updated']} updated, {stats['invalid']} invalid"
+        ))
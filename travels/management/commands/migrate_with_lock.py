@@ -0,0 +1,60 @@
+import time
+import zlib
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from travels.health import pending_migrations, wait_for_database
+
+
+# Same key in every replica, so only one of them migrates at a time
+MIGRATION_LOCK_KEY = zlib.crc32(b'travelease.migrate')
+
+
+class Command(BaseCommand):
+    help = (
+        "Wait for the database, then apply migrations while holding a PostgreSQL advisory lock so "
+        "replicas starting together don't race. Does nothing when there is nothing to apply."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+        parser.add_argument('--timeout', type=float, default=60, help="Seconds to wait for the database")
+        parser.add_argument('--lock-timeout', type=float, default=300, help="Seconds to wait for another replica's migrations")
+
+    def handle(self, *args, **options):
+        alias = options['database']
+        wait_for_database(alias, options['timeout'], log=self.stdout.write if options['verbosity'] >= 2 else None)
+        connection = connections[alias]
+
+        if not pending_migrations(connection):
+            self.stdout.write("No migrations to apply")
+            return
+
+        if connection.vendor != 'postgresql':
+            call_command('migrate', database=alias, interactive=False, verbosity=options['verbosity'])
+            return
+
+        self.acquire(connection, options['lock_timeout'])
+        try:
+            # Another replica may have applied them while this one waited for the lock
+            if pending_migrations(connection):
+                call_command('migrate', database=alias, interactive=False, verbosity=options['verbosity'])
+            else:
+                self.stdout.write("Migrations already applied by another replica")
+        finally:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT pg_advisory_unlock(%s)', [MIGRATION_LOCK_KEY])
+
+    def acquire(self, connection, lock_timeout):
+        deadline = time.monotonic() + lock_timeout
+        while True:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT pg_try_advisory_lock(%s)', [MIGRATION_LOCK_KEY])
+                if cursor.fetchone()[0]:
+                    return
+            if time.monotonic() > deadline:
+                raise CommandError("Timed out waiting for the migration lock held by another replica")
+            self.stdout.write("Another replica is migrating, waiting for the lock")
+            time.sleep(1)
@@ -0,0 +1,39 @@
+import time
+from importlib import import_module
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete expired sessions from the database in small batches, so the table is never locked "
+        "for long. Run it periodically (cron, or the session-cleanup service in docker-compose.yml)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help="Rows deleted per statement")
+        parser.add_argument('--sleep', type=float, default=0.0, help="Seconds to pause between batches")
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size must be at least 1")
+        store = import_module(settings.SESSION_ENGINE).SessionStore
+        if not hasattr(store, 'get_model_class'):
+            raise CommandError(f"{settings.SESSION_ENGINE} does not keep sessions in the database")
+        model = store.get_model_class()
+
+        now = timezone.now()
+        deleted = 0
+        while True:
+            keys = list(model.objects.filter(expire_date__lt=now)
+                        .values_list('session_key', flat=True)[:options['batch_size']])
+            if not keys:
+                break
+            deleted += model.objects.filter(session_key__in=keys).delete()[0]
+            if len(keys) < options['batch_size']:
+                break
+            if options['sleep']:
+                time.sleep(options['sleep'])
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} expired session(s)"))
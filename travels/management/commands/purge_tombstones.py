@@ -0,0 +1,41 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from travels.models import TripTombstone
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete deleted-trip tombstones older than CHANGE_FEED_RETENTION_DAYS in small batches. "
+        "Run it periodically (cron, or the session-cleanup service in docker-compose.yml)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=settings.CHANGE_FEED_RETENTION_DAYS,
+                            help="Tombstones kept, change feed cursors older than this answer 410")
+        parser.add_argument('--batch-size', type=int, default=1000, help="Rows deleted per statement")
+        parser.add_argument('--sleep', type=float, default=0.0, help="Seconds to pause between batches")
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size must be at least 1")
+        if options['days'] < 1:
+            raise CommandError("--days must be at least 1")
+
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        deleted = 0
+        while True:
+            ids = list(TripTombstone.objects.filter(deleted_at__lt=cutoff)
+                       .values_list('pk', flat=True)[:options['batch_size']])
+            if not ids:
+                break
+            deleted += TripTombstone.objects.filter(pk__in=ids).delete()[0]
+            if len(ids) < options['batch_size']:
+                break
+            if options['sleep']:
+                time.sleep(options['sleep'])
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} tombstone(s) older than {options['days']} days"))
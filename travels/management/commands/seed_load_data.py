@@ -0,0 +1,260 @@
+import random
+import time
+from array import array
+from datetime import datetime, timedelta
+from decimal import Decimal
+from itertools import accumulate
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from travels.command_utils import LOAD_BOOKING_PREFIX, LOAD_USER_PASSWORD, LOAD_USER_PREFIX, batched
+from travels.models import BookingTrip, PassengerDetails, TravelModes, TravelOptions
+from travels.seat_events import SEATS_PER_TRIP
+
+
+CITIES = [
+    'Mumbai', 'Delhi', 'Bengaluru', 'Hyderabad', 'Chennai', 'Kolkata', 'Pune', 'Ahmedabad',
+    'Jaipur', 'Goa', 'Kochi', 'Lucknow', 'Varanasi', 'Amritsar', 'Udaipur', 'Shimla',
+    'Manali', 'Leh', 'Rishikesh', 'Darjeeling', 'Agra', 'Mysuru', 'Ooty', 'Puducherry',
+]
+
+# travel mode -> price multiplier
+TRAVEL_MODES = {'Bus': Decimal('1.0'), 'Train': Decimal('1.4'), 'Car': Decimal('2.2'), 'Flight': Decimal('4.5')}
+
+# Seats per booking and booking outcome, weighted like real traffic
+SEAT_WEIGHTS = [(1, 45), (2, 30), (3, 15), (4, 10)]
+STATUS_WEIGHTS = [
+    (('Confirmed', 'success'), 80),
+    (('Pending', 'pending'), 12),
+    (('Cancelled', 'pending'), 8),
+]
+
+
+def cumulative(weighted):
+    return [item for item, _ in weighted], list(accumulate(weight for _, weight in weighted))
+
+
+# Every ordered city pair is a route, a Zipf-like weight makes a few routes very popular
+def build_routes(rng):
+    routes = [(a, b) for a in CITIES for b in CITIES if a != b]
+    rng.shuffle(routes)
+    weights = [1 / rank ** 1.1 for rank in range(1, len(routes) + 1)]
+    return routes, list(accumulate(weights))
+
+
+# Yields (trip index, user index, seats, status, first seat) for every booking, replaying the
+# same seed gives the same plan so it can be walked once to size trips and again to insert
+def plan_bookings(seed, count, route_trips, route_weights, users):
+    rng = random.Random(f"{seed}:bookings")
+    seat_choices, seat_weights = cumulative(SEAT_WEIGHTS)
+    status_choices, status_weights = cumulative(STATUS_WEIGHTS)
+    routes = range(len(route_trips))
+    used = array('H', bytes(2 * sum(len(trips) for trips in route_trips)))
+
+    for _ in range(count):
+        seats = rng.choices(seat_choices, cum_weights=seat_weights)[0]
+        status = rng.choices(status_choices, cum_weights=status_weights)[0]
+        # A few users book far more often than the rest
+        user = int(users * rng.random() ** 3)
+
+        # Popular routes sell out first, fall back to another draw when a trip is full
+        for _attempt in range(10):
+            trips = route_trips[rng.choices(routes, cum_weights=route_weights)[0]]
+            if not trips:
+                continue
+            trip = trips[int(len(trips) * rng.random() ** 2)]
+            if used[trip] + seats <= SEATS_PER_TRIP:
+                break
+        else:
+            continue
+
+        # Seats are numbered from 0 like the booking page's seat map
+        first_seat = used[trip]
+        if status[0] != 'Cancelled':
+            used[trip] += seats
+        yield trip, user, seats, status, first_seat
+
+
+class Command(BaseCommand):
+    help = "Deterministically generate trips, users, passengers and bookings for load testing"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--trips', type=int, default=10000)
+        parser.add_argument('--users', type=int, default=5000)
+        parser.add_argument('--bookings', type=int, default=50000)
+        parser.add_argument('--seed', type=int, default=42, help="Same seed and base date give the same data")
+        parser.add_argument('--base-date', help="First travel date (YYYY-MM-DD), defaults to today")
+        parser.add_argument('--batch-size', type=int, default=5000, help="Rows per bulk insert")
+        parser.add_argument('--flush', action='store_true', help="Delete all trips, bookings, passengers and load users first")
+
+    def handle(self, *args, **options):
+        for name in ('trips', 'users', 'batch_size'):
+            if options[name] <= 0:
+                raise CommandError(f"--{name.replace('_', '-')} must be positive")
+        if options['bookings'] < 0:
+            raise CommandError("--bookings must not be negative")
+
+        base_date = timezone.now().date()
+        if options['base_date']:
+            base_date = parse_date(options['base_date'])
+            if not base_date:
+                raise CommandError("Invalid --base-date format. Use YYYY-MM-DD.")
+        self.base = timezone.make_aware(datetime.combine(base_date, datetime.min.time()))
+        self.seed = options['seed']
+        self.verbosity = options['verbosity']
+        self.batch_size = options['batch_size']
+
+        if options['flush']:
+            self.flush()
+        elif (User.objects.filter(username__startswith=LOAD_USER_PREFIX).exists()
+              or BookingTrip.objects.filter(booking_reference__startswith=LOAD_BOOKING_PREFIX).exists()):
+            raise CommandError("Load data already exists, rerun with --flush to regenerate it")
+
+        started = time.perf_counter()
+        routes, route_weights = build_routes(random.Random(f"{self.seed}:routes"))
+
+        # Route of every trip, kept as compact arrays so millions of trips stay cheap
+        rng = random.Random(f"{self.seed}:trip-routes")
+        route_trips = [array('I') for _ in routes]
+        trip_routes = array('H')
+        for index in range(options['trips']):
+            route = rng.choices(range(len(routes)), cum_weights=route_weights)[0]
+            trip_routes.append(route)
+            route_trips[route].append(index)
+
+        plan = (self.seed, options['bookings'], route_trips, route_weights, options['users'])
+        booked = array('H', bytes(2 * options['trips']))
+        for trip, _, seats, status, first_seat in plan_bookings(*plan):
+            if status[0] != 'Cancelled':
+                booked[trip] = first_seat + seats
+
+        # All or nothing: a failed run leaves no trips or users behind that a rerun would duplicate
+        with transaction.atomic():
+            trip_ids, trip_prices = self.create_trips(routes, trip_routes, booked)
+            user_ids = self.create_users(options['users'])
+            bookings, passengers = self.create_bookings(plan_bookings(*plan), trip_ids, trip_prices, user_ids)
+
+        elapsed = max(time.perf_counter() - started, 1e-9)
+        total = len(trip_ids) + len(user_ids) + bookings + passengers
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {len(trip_ids)} trips, {len(user_ids)} users, {bookings} bookings and "
+            f"{passengers} passengers in {elapsed:.1f}s ({total / elapsed:.0f} rows/s)"
+        ))
+
+    # Plain DELETE/TRUNCATE statements, the ORM's cascade collector loads every row first
+    def flush(self):
+        models = [BookingTrip.passengers.through, BookingTrip, PassengerDetails, TravelOptions]
+        statements = connection.ops.sql_flush(no_style(), [model._meta.db_table for model in models])
+        with transaction.atomic(), connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
+            cursor.execute(
+                f"DELETE FROM {connection.ops.quote_name(User._meta.db_table)} WHERE username LIKE %s",
+                [f"{LOAD_USER_PREFIX}%"],
+            )
+
+    def progress(self, label, done):
+        if self.verbosity >= 2:
+            self.stdout.write(f"{label}: {done}")
+
+    def create_trips(self, routes, trip_routes, booked):
+        rng = random.Random(f"{self.seed}:trips")
+        modes = {name: TravelModes.objects.get_or_create(travel_mode=name)[0].pk for name in TRAVEL_MODES}
+        mode_names = list(TRAVEL_MODES)
+        route_prices = [Decimal(rng.randrange(800, 6000, 50)) for _ in routes]
+
+        def trips():
+            for index, route in enumerate(trip_routes):
+                source, destination = routes[route]
+                mode = mode_names[rng.randrange(len(mode_names))]
+                # Most departures cluster in the next few weeks, with a long tail
+                offset = timedelta(days=min(int(rng.expovariate(1 / 30)), 365), hours=rng.randrange(5, 23))
+                travel_date = self.base + offset
+                return_date = travel_date + timedelta(days=rng.choice([1, 2, 3, 3, 4, 5, 5, 7, 10]))
+                price = (route_prices[route] * TRAVEL_MODES[mode] * Decimal(rng.uniform(0.8, 1.25))).quantize(Decimal('0.01'))
+                yield TravelOptions(
+                    traveltype_id=modes[mode],
+                    source=source,
+                    destination=destination,
+                    travel_date=travel_date,
+                    return_date=return_date,
+                    price=price,
+                    duration=TravelOptions.compute_duration(travel_date, return_date),
+                    number_of_persons=1,
+                    available_seats=SEATS_PER_TRIP - booked[index],
+                )
+
+        # Prices are kept in paise so bookings can be priced without refetching trips
+        ids, prices = array('q'), array('q')
+        for batch in batched(trips(), self.batch_size):
+            with transaction.atomic():
+                ids.extend(trip.pk for trip in TravelOptions.objects.bulk_create(batch))
+            prices.extend(int(trip.price * 100) for trip in batch)
+            self.progress("trips", len(ids))
+        return ids, prices
+
+    def create_users(self, count):
+        # Hashing once keeps a million users from costing a million PBKDF2 rounds
+        password = make_password(LOAD_USER_PASSWORD)
+        users = (
+            User(username=f"{LOAD_USER_PREFIX}{index}", email=f"{LOAD_USER_PREFIX}{index}@example.com", password=password)
+            for index in range(count)
+        )
+        ids = array('q')
+        for batch in batched(users, self.batch_size):
+            with transaction.atomic():
+                ids.extend(user.pk for user in User.objects.bulk_create(batch))
+            self.progress("users", len(ids))
+        return ids
+
+    def create_bookings(self, plan, trip_ids, trip_prices, user_ids):
+        rng = random.Random(f"{self.seed}:passengers")
+        Through = BookingTrip.passengers.through
+        bookings_done = passengers_done = 0
+
+        for batch in batched(plan, self.batch_size):
+            bookings, passengers = [], []
+            for trip, user, seats, (booking_status, payment_status), first_seat in batch:
+                number = bookings_done + len(bookings)
+                paid = payment_status == 'success'
+                bookings.append(BookingTrip(
+                    user_id=user_ids[user],
+                    trip_id=trip_ids[trip],
+                    number_of_seats=seats,
+                    seat_numbers=list(range(first_seat, first_seat + seats)),
+                    total_price=Decimal(trip_prices[trip] * seats) / 100,
+                    booking_status=booking_status,
+                    payment_status=payment_status,
+                    razorpay_order_id=f"order_load{number}" if paid else None,
+                    razorpay_payment_id=f"pay_load{number}" if paid else None,
+                    booking_reference=f"{LOAD_BOOKING_PREFIX}{number:010d}",
+                ))
+                passengers.append([
+                    PassengerDetails(
+                        name=f"Passenger {number}-{seat + 1}",
+                        age=rng.randint(1, 85),
+                        adhar_number=f"{rng.randrange(10 ** 11, 10 ** 12)}",
+                        email=f"passenger{number}_{seat}@example.com",
+                    )
+                    for seat in range(seats)
+                ])
+
+            with transaction.atomic():
+                BookingTrip.objects.bulk_create(bookings)
+                created = PassengerDetails.objects.bulk_create([p for group in passengers for p in group])
+                Through.objects.bulk_create([
+                    Through(bookingtrip_id=booking.pk, passengerdetails_id=passenger.pk)
+                    for booking, group in zip(bookings, passengers)
+                    for passenger in group
+                ])
+
+            bookings_done += len(bookings)
+            passengers_done += len(created)
+            self.progress("bookings", bookings_done)
+        return bookings_done, passengers_done
@@ -0,0 +1,226 @@
+import itertools
+import json
+import multiprocessing
+import random
+import secrets
+import threading
+import time
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.db.models import Sum
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone
+
+from travels import views
+from travels.command_utils import percentile
+from travels.models import BookingTrip, PassengerDetails, TravelModes, TravelOptions
+from travels.payments import LocalGateway, sign_payment
+from travels.seat_events import SEATS_PER_TRIP
+
+
+STRESS_USER_PREFIX = 'stress_user_'
+
+
+def _ms(ordered, pct):
+    value = percentile(ordered, pct)
+    return round(value * 1000, 2) if value is not None else None
+
+
+# Fire `attempts` bookings at one trip from `threads` threads of this process, returns plain
+# lists so the same function works in-process and as a multiprocessing Pool task
+def run_worker(worker, trip_id, attempts, threads, seats, max_per_booking, mode, seed):
+    # Each process talks to the offline gateway so online confirms need no network
+    # The gateway lives in this worker only, a throwaway secret signs its payments
+    secret = secrets.token_hex(32)
+    previous_client, views.razorpay_client = views.razorpay_client, LocalGateway(secret)
+
+    lock = threading.Lock()
+    remaining = itertools.count()
+    results = {'statuses': [], 'latencies': [], 'lock_waits': [], 'committed_at': []}
+
+    # Log every client in before the race starts, failures inside it then surface as 500s
+    clients = []
+    for thread in range(threads):
+        client = Client(raise_request_exception=False)
+        client.force_login(User.objects.get(username=f"{STRESS_USER_PREFIX}{worker}_{thread}"))
+        clients.append(client)
+
+    def attempt_loop(thread):
+        rng = random.Random(f"{seed}:{worker}:{thread}")
+        client = clients[thread]
+        lock_waits = []
+
+        # Time spent in the seat UPDATE is dominated by waiting for the trip row lock
+        def measure_lock_wait(execute, sql, params, many, context):
+            if not sql.lstrip().upper().startswith('UPDATE') or 'traveloptions' not in sql:
+                return execute(sql, params, many, context)
+            started = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                lock_waits.append(time.perf_counter() - started)
+
+        try:
+            with connection.execute_wrapper(measure_lock_wait):
+                while next(remaining) < attempts:
+                    count = rng.randint(1, max_per_booking)
+                    payload = {
+                        'passengers': [
+                            {'name': f"Stress {n}", 'age': 30, 'email': 'stress@example.com',
+                             'adhar_number': f"{rng.randrange(10 ** 11, 10 ** 12)}"}
+                            for n in range(count)
+                        ],
+                        'selected_seats': rng.sample(range(seats), count),
+                    }
+                    online = mode == 'online' or (mode == 'mixed' and rng.random() < 0.5)
+                    if online:
+                        order_id, payment_id = f"order_stress_{uuid.uuid4().hex}", f"pay_stress_{uuid.uuid4().hex}"
+                        payload.update(order_id=order_id, payment_id=payment_id,
+                                       signature=sign_payment(order_id, payment_id, secret))
+                    url = reverse('confirm_booking' if online else 'confirm_offline_booking', args=[trip_id])
+
+                    started = time.perf_counter()
+                    response = client.post(url, data=json.dumps(payload), content_type='application/json')
+                    finished = time.perf_counter()
+                    with lock:
+                        results['statuses'].append(response.status_code)
+                        results['latencies'].append(finished - started)
+                        if response.status_code == 200:
+                            results['committed_at'].append(time.time())
+        finally:
+            with lock:
+                results['lock_waits'].extend(lock_waits)
+            connection.close()
+
+    pool = [threading.Thread(target=attempt_loop, args=(thread,)) for thread in range(threads)]
+    try:
+        for thread in pool:
+            thread.start()
+        for thread in pool:
+            thread.join()
+    finally:
+        views.razorpay_client = previous_client
+    return results
+
+
+def _run_worker(args):
+    return run_worker(*args)
+
+
+class Command(BaseCommand):
+    help = (
+        "Fire parallel booking attempts at one fresh trip from threads (and optionally processes), "
+        "then check that no seat was oversold or sold twice"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--attempts', type=int, default=300, help="Booking attempts in total")
+        parser.add_argument('--threads', type=int, default=16, help="Threads per process")
+        parser.add_argument('--processes', type=int, default=1, help="Worker processes, needs a shared database")
+        parser.add_argument('--seats', type=int, default=40, help="Seats on the stress trip")
+        parser.add_argument('--max-per-booking', type=int, default=2, help="Most seats in one booking")
+        parser.add_argument('--mode', choices=['online', 'offline', 'mixed'], default='mixed')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--keep', action='store_true', help="Keep the stress trip and its bookings")
+
+    def handle(self, *args, **options):
+        for name in ('attempts', 'threads', 'processes', 'seats', 'max_per_booking'):
+            if options[name] <= 0:
+                raise CommandError(f"--{name.replace('_', '-')} must be positive")
+        if options['seats'] > SEATS_PER_TRIP:
+            raise CommandError(f"--seats can't exceed the {SEATS_PER_TRIP} seats of the seat map")
+        processes = options['processes']
+        if processes > 1 and connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            raise CommandError("--processes needs a database shared between processes, not in-memory SQLite")
+
+        trip = self.create_trip(options['seats'])
+        for worker, thread in itertools.product(range(processes), range(options['threads'])):
+            User.objects.get_or_create(username=f"{STRESS_USER_PREFIX}{worker}_{thread}")
+
+        shares = [options['attempts'] // processes + (worker < options['attempts'] % processes) for worker in range(processes)]
+        tasks = [
+            (worker, trip.pk, share, options['threads'], options['seats'], options['max_per_booking'], options['mode'], options['seed'])
+            for worker, share in enumerate(shares)
+        ]
+
+        started = time.perf_counter()
+        if processes == 1:
+            results = [run_worker(*tasks[0])]
+        else:
+            # Children must not inherit the parent's open connection
+            connections.close_all()
+            with multiprocessing.get_context('fork').Pool(processes) as pool:
+                results = pool.map(_run_worker, tasks)
+        elapsed = time.perf_counter() - started
+
+        merged = {key: sorted(value for result in results for value in result[key]) for key in results[0]}
+        try:
+            self.report(merged, elapsed)
+            self.check_invariants(trip, options['seats'], merged)
+        finally:
+            if not options['keep']:
+                self.cleanup(trip)
+        self.stdout.write(self.style.SUCCESS("No oversell: seat counts and seat numbers are consistent"))
+
+    def create_trip(self, seats):
+        mode = TravelModes.objects.get_or_create(travel_mode='Bus')[0]
+        start = timezone.now() + timedelta(days=30)
+        return TravelOptions.objects.create(
+            traveltype=mode, source='Stress', destination=f"Test {uuid.uuid4().hex[:6]}",
+            travel_date=start, return_date=start + timedelta(days=2), price=Decimal('100.00'),
+            available_seats=seats,
+        )
+
+    def check_invariants(self, trip, seats, merged):
+        trip.refresh_from_db()
+        active = BookingTrip.objects.filter(trip=trip).exclude(booking_status='Cancelled')
+        sold = active.aggregate(total=Sum('number_of_seats'))['total'] or 0
+        seat_numbers = [str(seat) for numbers in active.values_list('seat_numbers', flat=True) for seat in numbers]
+        committed = merged['statuses'].count(200)
+
+        problems = []
+        if trip.available_seats < 0:
+            problems.append(f"available_seats went negative ({trip.available_seats})")
+        if trip.available_seats != seats - sold:
+            problems.append(f"available_seats is {trip.available_seats} but {sold} of {seats} seats were sold")
+        if len(seat_numbers) != len(set(seat_numbers)):
+            duplicates = sorted({seat for seat in seat_numbers if seat_numbers.count(seat) > 1})
+            problems.append(f"seats sold twice: {', '.join(duplicates)}")
+        if active.count() != committed:
+            problems.append(f"{committed} confirmations returned 200 but {active.count()} bookings exist")
+        if problems:
+            raise CommandError("Oversell detected: " + "; ".join(problems))
+
+    def report(self, merged, elapsed):
+        statuses = merged['statuses']
+        committed = statuses.count(200)
+        window = merged['committed_at'][-1] - merged['committed_at'][0] if committed > 1 else elapsed
+        lock_waits = merged['lock_waits']
+        summary = {
+            'attempts': len(statuses),
+            'committed': committed,
+            'rejected': statuses.count(400),
+            'errors': len([status for status in statuses if status >= 500]),
+            'elapsed_s': round(elapsed, 3),
+            'committed_per_s': round(committed / max(window, 1e-9), 2),
+            'latency_p50_ms': _ms(merged['latencies'], 50),
+            'latency_p95_ms': _ms(merged['latencies'], 95),
+            'lock_wait_p50_ms': _ms(lock_waits, 50),
+            'lock_wait_p95_ms': _ms(lock_waits, 95),
+            'lock_wait_max_ms': _ms(lock_waits, 100),
+            'lock_wait_total_s': round(sum(lock_waits), 3),
+        }
+        for key, value in summary.items():
+            self.stdout.write(f"{key:<20}{value}")
+
+    def cleanup(self, trip):
+        bookings = BookingTrip.objects.filter(trip=trip)
+        PassengerDetails.objects.filter(bookingtrip__in=bookings).delete()
+        trip.delete()
+        User.objects.filter(username__startswith=STRESS_USER_PREFIX).delete()
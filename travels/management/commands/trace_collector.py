@@ -0,0 +1,63 @@
+import json
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Lock
+
+from django.core.management.base import BaseCommand
+
+from travels.tracing import from_otlp
+
+
+# Minimal OTLP/HTTP JSON receiver: spans posted to /v1/traces are appended to `output`
+# as the same JSON lines the file exporter writes
+def make_server(host, port, output, echo=None):
+    lock = Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+
+        def do_POST(self):
+            if self.path != '/v1/traces':
+                self.send_error(404)
+                return
+            try:
+                body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                spans = from_otlp(json.loads(body))
+            except (ValueError, KeyError, TypeError) as e:
+                self.send_error(400, str(e))
+                return
+            with lock, open(output, 'a') as fh:
+                fh.writelines(json.dumps(item) + '\n' for item in spans)
+            if echo:
+                for item in spans:
+                    echo(f"{item['trace_id']} {item['name']} {item['duration_ms']} ms")
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.end_headers()
+            self.wfile.write(b'{}')
+
+        def log_message(self, format, *args):
+            pass
+
+    return ThreadingHTTPServer((host, port), Handler)
+
+
+class Command(BaseCommand):
+    help = (
+        "Local stand-in for an OpenTelemetry collector: accepts OTLP/HTTP JSON on /v1/traces "
+        "and writes the spans to a JSON lines file for trace_report"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=4318)
+        parser.add_argument('--output', '-o', default='traces.jsonl')
+
+    def handle(self, *args, **options):
+        echo = self.stdout.write if options['verbosity'] >= 2 else None
+        server = make_server(options['host'], options['port'], options['output'], echo)
+        self.stdout.write(f"Collecting spans on http://{options['host']}:{server.server_port}/v1/traces into {options['output']}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
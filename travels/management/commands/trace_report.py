@@ -0,0 +1,85 @@
+import json
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand, CommandError
+
+from travels.command_utils import PERCENTILES, percentile
+
+
+# Span name prefix -> component, everything else is time spent in app code
+COMPONENTS = {'db': 'db', 'template': 'template', 'payment': 'payment'}
+
+
+def component(span):
+    return COMPONENTS.get(span['name'].split('.', 1)[0], 'app')
+
+
+def read_spans(paths):
+    for path in paths:
+        with open(path) as fh:
+            for line in fh:
+                if line.strip():
+                    yield json.loads(line)
+
+
+# Milliseconds of one trace spent in each component, counting every span's self time (its
+# duration minus its children's) so a query run while rendering counts as db, not template
+def breakdown(spans):
+    children = defaultdict(float)
+    for span in spans:
+        if span['parent_id']:
+            children[span['parent_id']] += span['duration_ms']
+    totals = defaultdict(float)
+    for span in spans:
+        totals[component(span)] += max(span['duration_ms'] - children[span['span_id']], 0)
+    return totals
+
+
+class Command(BaseCommand):
+    help = "Attribute request latency to app code, the ORM, templates and payment calls from exported spans"
+
+    def add_arguments(self, parser):
+        parser.add_argument('files', nargs='+', help="Span JSON lines from TRACING_FILE or trace_collector")
+        parser.add_argument('--route', help="Only requests to this URL name")
+        parser.add_argument('--top', type=int, default=5, help="Slowest traces to list")
+
+    def handle(self, *args, **options):
+        traces = defaultdict(list)
+        for span in read_spans(options['files']):
+            traces[span['trace_id']].append(span)
+
+        requests = []
+        for spans in traces.values():
+            ids = {span['span_id'] for span in spans}
+            roots = [span for span in spans if span['parent_id'] not in ids]
+            root = max(roots, key=lambda span: span['duration_ms'])
+            if options['route'] and root['attributes'].get('http.route') != options['route']:
+                continue
+            requests.append((root, breakdown(spans)))
+        if not requests:
+            raise CommandError("No traces found")
+
+        requests.sort(key=lambda item: item[0]['duration_ms'])
+        durations = [root['duration_ms'] for root, _ in requests]
+        names = sorted({name for _, totals in requests for name in totals})
+
+        self.stdout.write(f"{len(requests)} traces")
+        self.stdout.write(f"{'component':<12}" + ''.join(f"{f'p{pct} ms':>12}" for pct in PERCENTILES))
+        self.stdout.write(f"{'total':<12}" + ''.join(f"{percentile(durations, pct):>12.2f}" for pct in PERCENTILES))
+        for name in names:
+            values = sorted(totals.get(name, 0) for _, totals in requests)
+            self.stdout.write(f"{name:<12}" + ''.join(f"{percentile(values, pct):>12.2f}" for pct in PERCENTILES))
+
+        # Where the time of the tail requests went
+        threshold = percentile(durations, PERCENTILES[-1])
+        tail = [(root, totals) for root, totals in requests if root['duration_ms'] >= threshold]
+        spent = {name: sum(totals.get(name, 0) for _, totals in tail) for name in names}
+        overall = sum(spent.values()) or 1
+        self.stdout.write(f"\nRequests at or above p{PERCENTILES[-1]} ({threshold:.2f} ms):")
+        for name in sorted(spent, key=spent.get, reverse=True):
+            self.stdout.write(f"  {name:<10}{spent[name] / overall * 100:6.1f}%")
+
+        self.stdout.write(f"\nSlowest {options['top']}:")
+        for root, totals in reversed(requests[-options['top']:]):
+            parts = ', '.join(f"{name} {totals[name]:.1f}" for name in names if totals.get(name))
+            self.stdout.write(f"  {root['trace_id']} {root['name']} {root['duration_ms']:.1f} ms ({parts})")
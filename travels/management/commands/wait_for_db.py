@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS
+
+from travels.health import wait_for_database
+
+
+class Command(BaseCommand):
+    help = "Wait until the database accepts connections, with exponential backoff"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+        parser.add_argument('--timeout', type=float, default=60, help="Give up after this many seconds")
+        parser.add_argument('--initial-delay', type=float, default=0.1)
+        parser.add_argument('--max-delay', type=float, default=5)
+
+    def handle(self, *args, **options):
+        attempts = wait_for_database(
+            options['database'], options['timeout'], options['initial_delay'], options['max_delay'],
+            log=self.stdout.write if options['verbosity'] >= 1 else None,
+        )
+        self.stdout.write(self.style.SUCCESS(f"Database ready after {attempts} attempt(s)"))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from travels.warmup import warm_up
+
+
+class Command(BaseCommand):
+    help = "Run the warm-up steps the server runs before taking traffic and report their timings"
+
+    def handle(self, *args, **options):
+        report = warm_up()
+        for name, (count, ms) in report.items():
+            self.stdout.write(f"{name:<16}{count:>6}  {ms:>8.1f} ms")
+        self.stdout.write(self.style.SUCCESS(f"Warm-up done in {sum(ms for _, ms in report.values()):.1f} ms"))
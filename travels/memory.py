@@ -0,0 +1,171 @@
+import gc
+import logging
+import os
+import threading
+import time
+import tracemalloc
+from collections import Counter
+
+from django.conf import settings
+
+
+logger = logging.getLogger('travels.memory')
+
+# Allocations made by the census itself are not the app's
+IGNORED_ALLOCATIONS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+    tracemalloc.Filter(False, '<unknown>'),
+)
+
+
+def start_tracing():
+    if settings.MEMORY_TRACING and not tracemalloc.is_tracing():
+        tracemalloc.start(settings.MEMORY_TRACE_FRAMES)
+
+
+def rss_bytes():
+    try:
+        with open('/proc/self/statm') as fh:
+            return int(fh.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        pass
+    try:
+        import resource
+    except ImportError:  # Windows
+        return 0
+    # Peak rather than current RSS where /proc is missing, in KiB on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if os.uname().sysname == 'Darwin' else peak * 1024
+
+
+def _short(filename):
+    base = str(settings.BASE_DIR)
+    if filename.startswith(base):
+        return os.path.relpath(filename, base)
+    return filename.split('site-packages/', 1)[-1]
+
+
+def _statistics(stats, limit):
+    return [{
+        'where': f"{_short(stat.traceback[0].filename)}:{stat.traceback[0].lineno}",
+        'size_kb': round(stat.size / 1024, 1),
+        'count': stat.count,
+    } for stat in stats[:limit]]
+
+
+def _differences(stats, limit):
+    return [{
+        'where': f"{_short(stat.traceback[0].filename)}:{stat.traceback[0].lineno}",
+        'size_diff_kb': round(stat.size_diff / 1024, 1),
+        'count_diff': stat.count_diff,
+        'size_kb': round(stat.size / 1024, 1),
+    } for stat in stats[:limit] if stat.size_diff > 0]
+
+
+def object_counts():
+    return Counter(f"{type(obj).__module__}.{type(obj).__qualname__}" for obj in gc.get_objects())
+
+
+# Snapshots of one worker's memory compared over time: against the first census of the process
+# (baseline) and the one before (previous), so steady growth in one place stands out. Also keeps
+# the tracemalloc delta of every request per URL name.
+class MemoryCensus:
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.pid = os.getpid()
+        self.baseline = None
+        self.previous = None
+        self.previous_objects = None
+        self.started_at = time.time()
+        self.requests = {}
+
+    def _check_fork(self):
+        if self.pid != os.getpid():
+            self.reset()
+
+    def record_request(self, view, delta):
+        with self.lock:
+            self._check_fork()
+            count, total, largest = self.requests.get(view, (0, 0, 0))
+            self.requests[view] = (count + 1, total + delta, max(largest, delta))
+
+    def take(self, limit=20, objects=True):
+        with self.lock:
+            self._check_fork()
+            report = {
+                'pid': os.getpid(),
+                'uptime_s': round(time.time() - self.started_at),
+                'rss_mb': round(rss_bytes() / 2 ** 20, 1),
+                'tracemalloc': tracemalloc.is_tracing(),
+            }
+
+            if tracemalloc.is_tracing():
+                snapshot = tracemalloc.take_snapshot().filter_traces(IGNORED_ALLOCATIONS)
+                current, peak = tracemalloc.get_traced_memory()
+                report['traced_mb'] = round(current / 2 ** 20, 1)
+                report['traced_peak_mb'] = round(peak / 2 ** 20, 1)
+                report['top_allocators'] = _statistics(snapshot.statistics('lineno'), limit)
+                if self.baseline is None:
+                    self.baseline = snapshot
+                report['growth_since_baseline'] = _differences(snapshot.compare_to(self.baseline, 'lineno'), limit)
+                report['growth_since_previous'] = _differences(
+                    snapshot.compare_to(self.previous, 'lineno'), limit) if self.previous else []
+                self.previous = snapshot
+
+            if objects:
+                counts = object_counts()
+                report['objects'] = dict(counts.most_common(limit))
+                if self.previous_objects is not None:
+                    growth = counts - self.previous_objects
+                    report['objects_growth'] = dict(growth.most_common(limit))
+                self.previous_objects = counts
+
+            report['requests'] = {
+                view: {'count': count, 'mean_delta_kb': round(total / count / 1024, 1), 'max_delta_kb': round(largest / 1024, 1)}
+                for view, (count, total, largest) in sorted(self.requests.items(), key=lambda item: -item[1][1])
+            }
+            return report
+
+
+census = MemoryCensus()
+
+
+# Logs a short census every MEMORY_CENSUS_INTERVAL seconds from a daemon thread, one per process
+class CensusLogger:
+
+    def __init__(self):
+        self.pid = None
+        self.lock = threading.Lock()
+
+    def ensure_started(self):
+        interval = settings.MEMORY_CENSUS_INTERVAL
+        if interval <= 0 or self.pid == os.getpid():
+            return
+        with self.lock:
+            if self.pid != os.getpid():
+                self.pid = os.getpid()
+                threading.Thread(target=self.run, args=(interval,), daemon=True).start()
+
+    def run(self, interval):
+        while True:
+            time.sleep(interval)
+            try:
+                self.log(census.take(limit=5))
+            except Exception:
+                logger.exception("Memory census failed")
+
+    def log(self, report):
+        logger.info("Memory census pid=%s rss=%sMB traced=%sMB", report['pid'], report['rss_mb'], report.get('traced_mb', '-'))
+        for item in report.get('growth_since_previous', []):
+            logger.info("  grew %+.1fKB (%+d blocks) at %s", item['size_diff_kb'], item['count_diff'], item['where'])
+        for name, count in report.get('objects_growth', {}).items():
+            logger.info("  +%d %s objects", count, name)
+
+
+census_logger = CensusLogger()
@@ -0,0 +1,168 @@
+import atexit
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from pathlib import Path
+
+from django.conf import settings
+
+
+# Prometheus' default latency buckets, in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100)
+
+# Seconds between writes of this process' metrics to METRICS_DIR
+FLUSH_INTERVAL = 5.0
+
+# name -> (type, help, buckets)
+METRICS = {
+    'travelease_http_requests_total': (
+        'counter', "Requests served, by URL name, method and status", None),
+    'travelease_http_request_duration_seconds': (
+        'histogram', "Time from the first middleware until the response is returned, by URL name", LATENCY_BUCKETS),
+    'travelease_db_queries_per_request': (
+        'histogram', "Database queries run by one request, by URL name", QUERY_COUNT_BUCKETS),
+    'travelease_db_queries_total': (
+        'counter', "Database queries run, by URL name", None),
+    'travelease_db_query_duration_seconds_total': (
+        'counter', "Time spent in database queries, by URL name", None),
+    'travelease_template_render_duration_seconds_total': (
+        'counter', "Time spent rendering templates, by URL name", None),
+    'travelease_slow_queries_total': (
+        'counter', "Queries over SLOW_QUERY_MS in sampled requests, by URL name", None),
+    'travelease_n_plus_one_total': (
+        'counter', "Query fingerprints repeated N_PLUS_ONE_THRESHOLD times or more in sampled requests, by URL name", None),
+    'travelease_page_cache_total': (
+        'counter', "Full-page cache lookups, by URL name and result (hit, stale, miss, bypass)", None),
+}
+
+
+def _labels_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(pairs):
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in pairs) + '}'
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+# In-process counters and histograms. With METRICS_DIR set every process also writes its
+# snapshot to <METRICS_DIR>/metrics_<pid>.json, and render() sums all of them so a scrape that
+# lands on any one uvicorn/gunicorn worker reports the whole server.
+class Registry:
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+        atexit.register(self.flush, force=True)
+
+    def reset(self):
+        self.pid = os.getpid()
+        self.counters = {}
+        self.histograms = {}
+        self.last_flush = 0.0
+
+    # A forked worker must not report what its parent recorded before the fork
+    def _check_fork(self):
+        if self.pid != os.getpid():
+            self.reset()
+
+    def inc(self, name, labels, value=1):
+        key = (name, _labels_key(labels))
+        with self.lock:
+            self._check_fork()
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, labels, value):
+        buckets = METRICS[name][2]
+        key = (name, _labels_key(labels))
+        with self.lock:
+            self._check_fork()
+            counts, total = self.histograms.get(key, ([0] * (len(buckets) + 1), 0))
+            counts[bisect_left(buckets, value)] += 1
+            self.histograms[key] = (counts, total + value)
+
+    def snapshot(self):
+        with self.lock:
+            self._check_fork()
+            return {
+                'counters': [[name, list(map(list, labels)), value] for (name, labels), value in self.counters.items()],
+                'histograms': [[name, list(map(list, labels)), list(counts), total]
+                               for (name, labels), (counts, total) in self.histograms.items()],
+            }
+
+    def directory(self):
+        return Path(settings.METRICS_DIR) if settings.METRICS_DIR else None
+
+    def flush(self, force=False):
+        directory = self.directory()
+        if directory is None or (not force and time.monotonic() - self.last_flush < FLUSH_INTERVAL):
+            return
+        self.last_flush = time.monotonic()
+        directory.mkdir(parents=True, exist_ok=True)
+        path = directory / f"metrics_{os.getpid()}.json"
+        tmp = path.with_suffix('.tmp')
+        tmp.write_text(json.dumps(self.snapshot()))
+        os.replace(tmp, path)
+
+    # This process' live values plus the last flushed values of every other worker
+    def collect(self):
+        snapshots = [self.snapshot()]
+        directory = self.directory()
+        if directory is not None and directory.is_dir():
+            own = f"metrics_{os.getpid()}.json"
+            for path in sorted(directory.glob('metrics_*.json')):
+                if path.name == own:
+                    continue
+                try:
+                    snapshots.append(json.loads(path.read_text()))
+                except (OSError, ValueError):
+                    continue
+
+        counters, histograms = {}, {}
+        for snapshot in snapshots:
+            for name, labels, value in snapshot['counters']:
+                key = (name, tuple(map(tuple, labels)))
+                counters[key] = counters.get(key, 0) + value
+            for name, labels, counts, total in snapshot['histograms']:
+                key = (name, tuple(map(tuple, labels)))
+                merged, merged_total = histograms.get(key, ([0] * len(counts), 0))
+                histograms[key] = ([a + b for a, b in zip(merged, counts)], merged_total + total)
+        return counters, histograms
+
+    def render(self):
+        counters, histograms = self.collect()
+        lines = []
+        for name, (kind, help_text, buckets) in METRICS.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            if kind == 'counter':
+                for (metric, labels), value in sorted(counters.items()):
+                    if metric == name:
+                        lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+                continue
+            for (metric, labels), (counts, total) in sorted(histograms.items()):
+                if metric != name:
+                    continue
+                cumulative = 0
+                for bound, count in zip(list(buckets) + ['+Inf'], counts):
+                    cumulative += count
+                    le = bound if bound == '+Inf' else _format_value(float(bound))
+                    lines.append(f"{name}_bucket{_format_labels(labels + (('le', le),))} {cumulative}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(total)}")
+                lines.append(f"{name}_count{_format_labels(labels)} {cumulative}")
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
@@ -0,0 +1,343 @@
+import logging
+import random
+import time
+import tracemalloc
+from contextlib import ExitStack
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DatabaseError, connection, connections
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified
+from django.middleware.gzip import GZipMiddleware
+from django.template.backends.django import Template
+from django.utils import timezone
+from django.utils.cache import patch_vary_headers
+
+from travels.health import pending_migrations
+from travels.memory import census, census_logger
+from travels.metrics import registry
+from travels.profiling import PROFILE_HEADER, run_profiled, save_profile, valid_profile_token
+from travels.querylog import QueryLog
+from travels.static_files import accepted_encodings, build_index, choose_variant, not_modified, static_headers, static_url_prefix
+from travels.tracing import current_span, span, start_trace, trace_query
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+
+logger = logging.getLogger('travels.queries')
+health_logger = logging.getLogger('travels.health')
+
+
+# Per-request database and template timings, read by the middleware once the view returns
+class RequestStats:
+    __slots__ = ('queries', 'db_time', 'template_time')
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+
+    def time_query(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - started
+            self.queries += 1
+
+
+current_stats = ContextVar('current_stats', default=None)
+
+
+# Wrap the template backend's render(), which render() and TemplateResponse go through once per
+# page, to time it for the metrics and give it a trace span. {% include %} renders below it, so
+# nested templates are not counted twice.
+def instrument_templates():
+    if getattr(Template.render, 'instrumented', False):
+        return
+    render = Template.render
+
+    def timed_render(self, context=None, request=None):
+        stats = current_stats.get()
+        started = time.perf_counter()
+        try:
+            with span('template.render', **{'template.name': self.template.name or ''}):
+                return render(self, context, request)
+        finally:
+            if stats is not None:
+                stats.template_time += time.perf_counter() - started
+
+    timed_render.instrumented = True
+    Template.render = timed_render
+
+
+# Serves the collectstatic output in STATIC_ROOT from the app process: hashed names with a
+# one year immutable Cache-Control, the precompressed .br or .gz variant the client accepts, and
+# 304s on ETag or Last-Modified. First in MIDDLEWARE, assets skip the rest of the stack.
+class StaticFilesMiddleware:
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.prefix = static_url_prefix()
+        self.index = None
+
+    def __call__(self, request):
+        if request.method not in ('GET', 'HEAD') or not request.path.startswith(self.prefix):
+            return self.get_response(request)
+        if self.index is None:
+            self.index = build_index(settings.STATIC_ROOT, self.prefix) if settings.STATIC_ROOT else {}
+        static_file = self.index.get(request.path)
+        if static_file is None:
+            return self.get_response(request)
+
+        headers = static_headers(static_file)
+        if not_modified(static_file, request):
+            response = HttpResponseNotModified()
+        else:
+            encoding, (path, size) = choose_variant(static_file, request.headers.get('Accept-Encoding', ''))
+            if request.method == 'HEAD':
+                response = HttpResponse(content_type=static_file.content_type)
+            else:
+                response = FileResponse(open(path, 'rb'), content_type=static_file.content_type)
+                del response['Content-Disposition']
+            response['Content-Length'] = size
+            if encoding:
+                response['Content-Encoding'] = encoding
+        for header, value in headers.items():
+            response[header] = value
+        return response
+
+
+# Compresses responses with brotli or gzip. Against BREACH, gzip output carries Django's random
+# length padding and pages that rendered a CSRF token are never brotli compressed, brotli has no
+# such padding; the tokens themselves are masked differently in every response.
+class CompressionMiddleware(GZipMiddleware):
+    brotli_quality = 5
+
+    def process_response(self, request, response):
+        # gzip buffers a stream until enough output piles up, events must go out as they happen
+        if response.get('Content-Type', '').startswith('text/event-stream'):
+            return response
+        if (brotli is None or response.streaming or response.has_header('Content-Encoding')
+                or len(response.content) < 200 or self.may_carry_csrf_token(response)
+                or 'br' not in accepted_encodings(request.META.get('HTTP_ACCEPT_ENCODING', ''))):
+            return super().process_response(request, response)
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        compressed = brotli.compress(response.content, quality=self.brotli_quality)
+        if len(compressed) >= len(response.content):
+            return response
+        response.content = compressed
+        response.headers['Content-Length'] = str(len(compressed))
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = 'br'
+        return response
+
+    # CsrfViewMiddleware (inside this one) sets the cookie on every response whose view or
+    # template asked for a token. With the token kept in the session there is no such trace,
+    # so no HTML page is brotli compressed then.
+    @staticmethod
+    def may_carry_csrf_token(response):
+        if settings.CSRF_USE_SESSIONS:
+            return response.get('Content-Type', '').startswith('text/html')
+        return settings.CSRF_COOKIE_NAME in response.cookies
+
+
+# Liveness and readiness probes answered before any other middleware, so probes never touch the
+# session, auth, metrics or tracing. /healthz only says the process serves requests; /readyz
+# also needs the database to answer and every migration to be applied.
+class HealthCheckMiddleware:
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.migrated = False
+
+    def __call__(self, request):
+        if request.path == '/healthz':
+            return HttpResponse('ok', content_type='text/plain')
+        if request.path == '/readyz':
+            return self.readiness()
+        return self.get_response(request)
+
+    def readiness(self):
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            # Migrations are only applied at deploy time, so once done it stays done
+            if not self.migrated:
+                if pending_migrations(connection):
+                    return HttpResponse('migrations pending', status=503, content_type='text/plain')
+                self.migrated = True
+        except DatabaseError:
+            # The probe is unauthenticated, the error (hosts, users, SQL) only goes to the logs
+            health_logger.exception("Readiness check failed")
+            return HttpResponse('database unavailable', status=503, content_type='text/plain')
+        return HttpResponse('ok', content_type='text/plain')
+
+
+# Opens the root span of every request, continuing an incoming W3C traceparent, and gives each
+# query its own span. Keep it first in MIDDLEWARE so the span covers the whole stack; the view,
+# template and payment spans nest under it. The trace id is returned in X-Trace-Id.
+class TracingMiddleware:
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        instrument_templates()
+
+    def __call__(self, request):
+        root = start_trace(f"{request.method} {request.path}", request.headers.get('traceparent'), **{
+            'http.method': request.method,
+            'http.target': request.get_full_path(),
+        })
+        token = current_span.set(root)
+        try:
+            with ExitStack() as stack:
+                if root.recording:
+                    for connection in connections.all():
+                        stack.enter_context(connection.execute_wrapper(trace_query))
+                response = self.get_response(request)
+            root.attributes['http.status_code'] = response.status_code
+            response['X-Trace-Id'] = root.trace_id
+            return response
+        except BaseException as e:
+            root.error = type(e).__name__
+            raise
+        finally:
+            match = request.resolver_match
+            if match:
+                root.name = f"{request.method} {match.view_name}"
+                root.attributes['http.route'] = match.view_name
+            current_span.reset(token)
+            root.end()
+
+
+# Records latency, status, query count/time and template time for every request, labelled with
+# the URL name so the views in travels/urls.py can be compared on /metrics. Keep it first in
+# MIDDLEWARE so the latency covers the rest of the stack. For streaming responses the latency
+# ends when the response starts, not when the last chunk is sent.
+class RequestMetricsMiddleware:
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        instrument_templates()
+
+    def __call__(self, request):
+        stats = RequestStats()
+        token = current_stats.set(stats)
+        started = time.perf_counter()
+        status = 500
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(stats.time_query))
+                response = self.get_response(request)
+            status = response.status_code
+            return response
+        finally:
+            current_stats.reset(token)
+            self.record(request, status, time.perf_counter() - started, stats)
+
+    def record(self, request, status, elapsed, stats):
+        match = request.resolver_match
+        view = {'view': match.view_name if match else 'unmatched'}
+        registry.inc('travelease_http_requests_total', {**view, 'method': request.method, 'status': str(status)})
+        registry.observe('travelease_http_request_duration_seconds', view, elapsed)
+        registry.observe('travelease_db_queries_per_request', view, stats.queries)
+        registry.inc('travelease_db_queries_total', view, stats.queries)
+        registry.inc('travelease_db_query_duration_seconds_total', view, stats.db_time)
+        registry.inc('travelease_template_render_duration_seconds_total', view, stats.template_time)
+        registry.flush()
+
+
+# Opt-in slow query and N+1 detection for a sample of requests (QUERY_INSPECTION_SAMPLE_RATE).
+# Requests outside the sample pass straight through, so it can stay on in production.
+class QueryInspectionMiddleware:
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        rate = settings.QUERY_INSPECTION_SAMPLE_RATE
+        if rate <= 0 or random.random() >= rate:
+            return self.get_response(request)
+
+        logs = [QueryLog(connection) for connection in connections.all()]
+        with ExitStack() as stack:
+            for log in logs:
+                stack.enter_context(log.connection.execute_wrapper(log))
+            response = self.get_response(request)
+
+        match = request.resolver_match
+        view = match.view_name if match else 'unmatched'
+        for log in logs:
+            self.report(view, log)
+        return response
+
+    def report(self, view, log):
+        for key, count, origin in log.repeated(settings.N_PLUS_ONE_THRESHOLD):
+            registry.inc('travelease_n_plus_one_total', {'view': view})
+            logger.warning("Possible N+1 in %s: %d x %s (first run at %s)", view, count, key, origin)
+        for elapsed_ms, sql, origin, plan in log.slow_queries():
+            registry.inc('travelease_slow_queries_total', {'view': view})
+            logger.warning("Slow query in %s (%.1f ms) at %s: %s\n%s", view, elapsed_ms, origin, sql, plan or '')
+
+
+# Profiles requests that carry a valid X-Profile-Token header, and a PROFILING_SAMPLE_RATE share of
+# the rest. Sampled profiles are only kept when the request took PROFILING_MIN_MS or longer, so
+# the stored ones are the tail-latency outliers. Browse them on the staff "profiles" page.
+class ProfilingMiddleware:
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        requested = PROFILE_HEADER in request.headers and valid_profile_token(request.headers[PROFILE_HEADER])
+        rate = settings.PROFILING_SAMPLE_RATE
+        if not requested and (rate <= 0 or random.random() >= rate):
+            return self.get_response(request)
+
+        started = time.perf_counter()
+        response, profile = run_profiled(lambda: self.get_response(request))
+        duration_ms = (time.perf_counter() - started) * 1000
+        if not requested and duration_ms < settings.PROFILING_MIN_MS:
+            return response
+
+        match = request.resolver_match
+        path = save_profile(profile, {
+            'view': match.view_name if match else 'unmatched',
+            'method': request.method,
+            'path': request.get_full_path(),
+            'status': response.status_code,
+            'duration_ms': round(duration_ms, 1),
+            'profiled_at': timezone.now().isoformat(),
+            'profiler': settings.PROFILER,
+            'trigger': 'header' if requested else 'sample',
+        })
+        if requested:
+            response['X-Profile'] = path.name
+        return response
+
+
+# Per-request change in tracemalloc's traced memory, by URL name, for the memory census. Only
+# active with MEMORY_TRACING. Concurrent requests in one worker share the heap, so single deltas
+# are noisy; a view that leaks shows up as a mean that stays above zero.
+class MemoryDeltaMiddleware:
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        # Checked per request so workers forked after loading the app start their own logger
+        census_logger.ensure_started()
+        if not tracemalloc.is_tracing():
+            return self.get_response(request)
+        before = tracemalloc.get_traced_memory()[0]
+        response = self.get_response(request)
+        match = request.resolver_match
+        census.record_request(match.view_name if match else 'unmatched', tracemalloc.get_traced_memory()[0] - before)
+        return response
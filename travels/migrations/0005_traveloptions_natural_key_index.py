@@ -0,0 +1,17 @@
+# Generated by Django 5.2.5 on 2026-10-19 00:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('travels', '0004_alter_passengerdetails_adhar_number'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='traveloptions',
+            index=models.Index(fields=['source', 'destination', 'travel_date'], name='travels_tra_source_d96abd_idx'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.5 on 2026-10-19 00:12
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('travels', '0005_traveloptions_natural_key_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='bookingtrip',
+            index=models.Index(fields=['booked_at'], name='travels_boo_booked__b92eb8_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='passengerdetails',
+            index=models.Index(fields=['adhar_number'], name='travels_pas_adhar_n_64bcd5_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='passengerdetails',
+            index=models.Index(fields=['name'], name='travels_pas_name_f2bbf1_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='traveloptions',
+            index=models.Index(fields=['travel_date'], name='travels_tra_travel__deedc2_idx'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.5 on 2026-10-19 01:22
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('travels', '0006_admin_lookup_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TripTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('trip_id', models.BigIntegerField()),
+                ('deleted_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='traveloptions',
+            index=models.Index(fields=['updated_at', 'id'], name='travels_tra_updated_760821_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='triptombstone',
+            index=models.Index(fields=['deleted_at', 'id'], name='travels_tri_deleted_e04101_idx'),
+        ),
+    ]
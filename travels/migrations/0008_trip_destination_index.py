@@ -0,0 +1,17 @@
+# Generated by Django 5.2.5 on 2026-10-19 01:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('travels', '0007_change_feed'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='traveloptions',
+            index=models.Index(fields=['destination'], name='travels_tra_destina_03e6e0_idx'),
+        ),
+    ]
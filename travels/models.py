@@ -3,6 +3,7 @@ from django.db import models
 from django.db import models
 from django.contrib.auth.models import User
 from django.forms import ValidationError
+from django.utils import timezone
 from django.utils.crypto import get_random_string
 # Create your models here.
 
@@ -37,11 +38,15 @@ class TravelOptions(models.Model):
             if self.return_date < self.travel_date:
                 raise ValidationError({"return_date": "Return must be after start."})
 
+    # Shared by save() and the bulk import path, which bypasses save()
+    @staticmethod
+    def compute_duration(travel_date, return_date):
+        if travel_date and return_date:
+            return return_date - travel_date
+        return None
+
     def save(self, *args, **kwargs):
-        if self.travel_date and self.return_date:
-            self.duration = self.return_date - self.travel_date
-        else:
-            self.duration = None
+        self.duration = self.compute_duration(self.travel_date, self.return_date)
         super().save(*args, **kwargs)
 
     @property
@@ -54,10 +59,33 @@ class TravelOptions(models.Model):
     
     class Meta:
         ordering = ['-travel_date']
+        indexes = [
+            # Natural key used by the import_trips upsert
+            models.Index(fields=['source', 'destination', 'travel_date']),
+            models.Index(fields=['travel_date']),
+            # Admin trip search, source is served by the natural key index
+            models.Index(fields=['destination']),
+            # Keyset order of the change feed
+            models.Index(fields=['updated_at', 'id']),
+        ]
 
     def __str__(self):
         return f"{self.source} - {self.destination} Travel"
 
+
+# Left Behind By A Deleted Trip So The Change Feed Can Report The Deletion
+class TripTombstone(models.Model):
+    trip_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['deleted_at', 'id']),
+        ]
+
+    def __str__(self):
+        return f"Trip {self.trip_id} deleted at {self.deleted_at}"
+
 # This Model Saves The Passenger Details While Booking A Trip
 class PassengerDetails(models.Model):
     name = models.CharField(max_length=100)
@@ -69,6 +97,12 @@ class PassengerDetails(models.Model):
     def __str__(self):
         return f"{self.name} - {self.adhar_number}"
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['adhar_number']),
+            models.Index(fields=['name']),
+        ]
+
 
 # Booking Model to Save User Bookings
 
@@ -112,4 +146,5 @@ class BookingTrip(models.Model):
             models.Index(fields=['user']),
             models.Index(fields=['trip']),
             models.Index(fields=['booking_status']),
+            models.Index(fields=['booked_at']),
         ]
@@ -0,0 +1,91 @@
+import hashlib
+import time
+from functools import wraps
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import patch_cache_control, patch_vary_headers
+
+from travels.metrics import registry
+
+
+# Seconds one request may spend refreshing a stale page before another one takes over
+REFRESH_LOCK_TIMEOUT = 30
+
+CACHED_HEADERS = ('Content-Type', 'Content-Language')
+
+
+# Only the parameters the page reads make up the key, in a fixed order, so tracking parameters
+# (utm_source, fbclid) and reordered query strings share one entry
+def page_cache_key(request, params, version=''):
+    values = [(name, request.GET[name]) for name in sorted(params) if name in request.GET]
+    digest = hashlib.md5(f"{version}?{urlencode(values)}".encode()).hexdigest()
+    return f"page:{request.resolver_match.view_name}:{digest}"
+
+
+def cacheable(response):
+    cache_control = response.get('Cache-Control', '')
+    return (response.status_code == 200 and not response.streaming and not response.cookies
+            and 'private' not in cache_control and 'no-store' not in cache_control)
+
+
+def cached_response(entry, age, result):
+    response = HttpResponse(entry['content'])
+    for header, value in entry['headers'].items():
+        response[header] = value
+    response['Age'] = str(int(age))
+    response['X-Page-Cache'] = result
+    return response
+
+
+# Full-page cache for anonymous GETs. A page is fresh for PAGE_CACHE_TIMEOUT seconds, then for
+# PAGE_CACHE_STALE seconds more one request re-renders it while everyone else still gets the
+# stale copy, so an expiring entry never sends a crowd to the database. Signed in users always
+# get a fresh render. `params` lists the query parameters the page reads, `version` returns a
+# string that changes when a deploy changes the page.
+def anonymous_page_cache(params, version=None):
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            timeout = settings.PAGE_CACHE_TIMEOUT
+            view_name = request.resolver_match.view_name if request.resolver_match else view.__name__
+            if timeout <= 0 or request.method not in ('GET', 'HEAD') or request.user.is_authenticated:
+                registry.inc('travelease_page_cache_total', {'view': view_name, 'result': 'bypass'})
+                return view(request, *args, **kwargs)
+
+            key = page_cache_key(request, params, version() if version else '')
+            lock = f"{key}:refresh"
+            entry = cache.get(key)
+            refreshing = False
+            if entry is not None:
+                age = time.time() - entry['stored_at']
+                if age < timeout:
+                    registry.inc('travelease_page_cache_total', {'view': view_name, 'result': 'hit'})
+                    return cached_response(entry, age, 'hit')
+                refreshing = cache.add(lock, 1, REFRESH_LOCK_TIMEOUT)
+                if not refreshing:
+                    registry.inc('travelease_page_cache_total', {'view': view_name, 'result': 'stale'})
+                    return cached_response(entry, age, 'stale')
+
+            registry.inc('travelease_page_cache_total', {'view': view_name, 'result': 'miss'})
+            try:
+                response = view(request, *args, **kwargs)
+                if cacheable(response):
+                    patch_cache_control(response, public=True, max_age=timeout,
+                                        stale_while_revalidate=settings.PAGE_CACHE_STALE)
+                    # The session was read to tell visitors from users, signed in users must
+                    # not get a downstream copy either
+                    patch_vary_headers(response, ('Cookie',))
+                    headers = {header: response[header] for header in (*CACHED_HEADERS, 'Cache-Control', 'Vary')
+                               if response.has_header(header)}
+                    cache.set(key, {'content': response.content, 'headers': headers, 'stored_at': time.time()},
+                              timeout + settings.PAGE_CACHE_STALE)
+                    response['X-Page-Cache'] = 'miss'
+                return response
+            finally:
+                if refreshing:
+                    cache.delete(lock)
+        return wrapper
+    return decorator
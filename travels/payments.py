@@ -0,0 +1,56 @@
+import hashlib
+import hmac
+import os
+import uuid
+
+import razorpay
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+
+# Offline stand-in for the parts of razorpay.Client the booking views use. Orders are
+# created locally and signatures use Razorpay's scheme, HMAC-SHA256 of "order_id|payment_id"
+# keyed with the secret, so benchmarks and CI can book trips without network access.
+class LocalGateway:
+
+    class Orders:
+        def create(self, data):
+            return {
+                'id': f"order_local_{uuid.uuid4().hex[:14]}",
+                'amount': data['amount'],
+                'currency': data.get('currency', 'INR'),
+                'status': 'created',
+            }
+
+    class Utility:
+        def __init__(self, secret):
+            self.secret = secret
+
+        def verify_payment_signature(self, params):
+            expected = sign_payment(params['razorpay_order_id'], params['razorpay_payment_id'], self.secret)
+            if not hmac.compare_digest(expected, params.get('razorpay_signature') or ''):
+                raise razorpay.errors.SignatureVerificationError('Razorpay Signature Verification Failed')
+            return True
+
+    def __init__(self, secret):
+        self.order = self.Orders()
+        self.utility = self.Utility(secret)
+
+
+def sign_payment(order_id, payment_id, secret):
+    message = f"{order_id}|{payment_id}".encode()
+    return hmac.new(secret.encode(), message, hashlib.sha256).hexdigest()
+
+
+# Anyone holding the secret can sign payments, so it is never derived from a committed key
+def gateway_secret():
+    if not settings.PAYMENT_LOCAL_SECRET:
+        raise ImproperlyConfigured("PAYMENT_GATEWAY=local needs PAYMENT_LOCAL_SECRET to sign payments")
+    return settings.PAYMENT_LOCAL_SECRET
+
+
+# Client used by the views, Razorpay unless PAYMENT_GATEWAY is 'local'
+def get_payment_client():
+    if settings.PAYMENT_GATEWAY == 'local':
+        return LocalGateway(gateway_secret())
+    return razorpay.Client(auth=(os.getenv("RAZORPAY_KEY_ID"), os.getenv("RAZORPAY_SECRET_ID")))
@@ -0,0 +1,128 @@
+import cProfile
+import json
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+from django.conf import settings
+from django.core import signing
+
+
+# Requests carrying a valid token in this header are always profiled
+PROFILE_HEADER = 'X-Profile-Token'
+TOKEN_SALT = 'travels.profiling'
+
+PROFILE_FORMATS = {'sampling': 'collapsed', 'cprofile': 'prof'}
+PROFILE_NAME = re.compile(r"^[\w.-]+\.(collapsed|prof)$")
+
+
+# Token for the profiling header, valid for PROFILING_TOKEN_MAX_AGE seconds
+def make_profile_token():
+    return signing.TimestampSigner(salt=TOKEN_SALT).sign('profile')
+
+
+def valid_profile_token(token):
+    try:
+        return signing.TimestampSigner(salt=TOKEN_SALT).unsign(token, max_age=settings.PROFILING_TOKEN_MAX_AGE) == 'profile'
+    except signing.BadSignature:
+        return False
+
+
+def _frame_name(frame):
+    filename = frame.f_code.co_filename
+    if filename.startswith(str(settings.BASE_DIR)):
+        filename = str(Path(filename).relative_to(settings.BASE_DIR))
+    elif 'site-packages/' in filename:
+        filename = filename.split('site-packages/', 1)[1]
+    return f"{filename}:{frame.f_code.co_name}".replace(';', ':').replace(' ', '_')
+
+
+# Statistical profiler: a background thread records the stack of one thread every `interval`
+# seconds, giving collapsed stacks ("outer;inner count") that flamegraph tools read directly
+class StackSampler:
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            names = []
+            while frame is not None:
+                names.append(_frame_name(frame))
+                frame = frame.f_back
+            if names:
+                self.stacks[';'.join(reversed(names))] += 1
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stopped.set()
+        self.thread.join()
+
+    def collapsed(self):
+        return ''.join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+# Runs func() under the configured profiler, returns its result and the finished profiler
+def run_profiled(func):
+    if settings.PROFILER == 'cprofile':
+        profiler = cProfile.Profile()
+        try:
+            result = profiler.runcall(func)
+        finally:
+            profiler.create_stats()
+        return result, profiler
+    with StackSampler(threading.get_ident(), settings.PROFILING_INTERVAL_MS / 1000) as sampler:
+        result = func()
+    return result, sampler
+
+
+def profile_dir():
+    return Path(settings.PROFILING_DIR)
+
+
+# Writes the profile next to a .json sidecar with the request details, keeping the newest
+# PROFILING_KEEP profiles
+def save_profile(profile, meta):
+    directory = profile_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    view = re.sub(r"[^\w-]", '_', meta['view'])
+    stem = f"{int(time.time() * 1000)}-{view}-{meta['duration_ms']:.0f}ms"
+    extension = PROFILE_FORMATS[settings.PROFILER]
+    path = directory / f"{stem}.{extension}"
+    if isinstance(profile, StackSampler):
+        path.write_text(profile.collapsed())
+    else:
+        profile.dump_stats(path)
+    (directory / f"{stem}.json").write_text(json.dumps({**meta, 'file': path.name}))
+
+    sidecars = sorted(directory.glob('*.json'))
+    for old in sidecars[:max(len(sidecars) - settings.PROFILING_KEEP, 0)]:
+        for stale in directory.glob(f"{old.stem}.*"):
+            stale.unlink(missing_ok=True)
+    return path
+
+
+# Details of the stored profiles, slowest first
+def list_profiles(limit=None):
+    directory = profile_dir()
+    if not directory.is_dir():
+        return []
+    profiles = []
+    for sidecar in directory.glob('*.json'):
+        try:
+            profiles.append(json.loads(sidecar.read_text()))
+        except (OSError, ValueError):
+            continue
+    profiles.sort(key=lambda meta: meta['duration_ms'], reverse=True)
+    return profiles[:limit]
@@ -0,0 +1,217 @@
+import json
+import re
+from dataclasses import dataclass
+from datetime import timedelta
+
+from django.contrib import admin
+from django.contrib.auth.models import User
+from django.db import models
+from django.db.models import Count, Max, Q, Sum, Value
+from django.utils import timezone
+
+from travels.api import CHANGED, TRIP_FIELDS, changed_rows, deleted_rows, encode_cursor, page_rows, parse_trip_query
+from travels.models import BookingTrip, TravelOptions
+from travels.read_models import BookingRow, TripCard
+
+
+# Values for the registry queries picked from the seeded data, so every filter matches rows
+def sample_parameters():
+    user_id = (BookingTrip.objects.values('user_id').annotate(n=Count('id')).order_by('-n')
+               .values_list('user_id', flat=True).first()) or User.objects.values_list('pk', flat=True).first()
+    trip = TravelOptions.objects.order_by('pk').values('pk', 'traveltype_id', 'destination').first() or {}
+    booking_ids = list(BookingTrip.objects.filter(user=user_id).order_by('-booked_at').values_list('pk', flat=True)[:50])
+    return {
+        'today': timezone.localdate(),
+        'user_id': user_id or 0,
+        'booking_ids': booking_ids or [0],
+        'trip_id': trip.get('pk', 0),
+        'mode_id': trip.get('traveltype_id', 0),
+        'search': (trip.get('destination') or 'a')[:3],
+        'city': trip.get('destination') or 'a',
+    }
+
+
+# aggregate() runs at once and returns a dict; grouped on a constant, which Django leaves out of
+# GROUP BY, the same aggregate stays a queryset that can be explained
+def aggregate(queryset, **aggregates):
+    return (queryset.order_by().annotate(_all=Value(1)).values('_all')
+            .annotate(**aggregates).values(*aggregates))
+
+
+def main_page_filter(p):
+    return TravelOptions.objects.filter(
+        traveltype=p['mode_id'], travel_date__gte=p['today'], return_date__lte=p['today'] + timedelta(days=90),
+        price__gte=100, price__lte=25000,
+    ).values_list(*TripCard.COLUMNS)
+
+
+def main_page_search(p):
+    return TravelOptions.objects.filter(destination__icontains=p['search'], price__gte=100).values_list(*TripCard.COLUMNS)
+
+
+def my_bookings_upcoming(p):
+    return BookingTrip.objects.filter(user=p['user_id']).order_by('-booked_at').filter(
+        trip__travel_date__gte=p['today'],
+    ).filter(
+        models.Q(booking_status='Confirmed') | models.Q(payment_status='pending')
+    ).exclude(booking_status='Cancelled').values_list(*BookingRow.COLUMNS)
+
+
+def my_bookings_totals(p):
+    successful = Q(payment_status='success', booking_status='Confirmed')
+    return aggregate(
+        BookingTrip.objects.filter(user=p['user_id']),
+        total=Count('pk'),
+        successful=Count('pk', filter=successful),
+        pending=Count('pk', filter=Q(payment_status='pending', booking_status='Pending')),
+        spent=Sum('total_price', filter=successful),
+    )
+
+
+# Passenger names of every listed booking, read by booking_rows in one query
+def my_bookings_passengers(p):
+    passengers = BookingTrip.passengers.through.objects.filter(bookingtrip_id__in=p['booking_ids']).order_by('pk')
+    return passengers.values_list('bookingtrip_id', 'passengerdetails__name')
+
+
+# Second page of the trips API, newest first: keyset seek past the cursor, no OFFSET
+def api_trips_page(p):
+    return page_rows(parse_trip_query({'cursor': encode_cursor(timezone.now(), p['trip_id'])}))
+
+
+# The aggregate behind the trips API ETag, for a filtered search and for the whole catalogue
+def api_trips_etag(p, params=None):
+    trips = parse_trip_query(params if params is not None else {'travel_mode': str(p['mode_id'])}).trips
+    return aggregate(trips, count=Count('pk'), updated=Max('updated_at'))
+
+
+# Change feed page of a client that synced an hour ago: the (updated_at, id) and (deleted_at, id)
+# range scans merged by change_page
+def change_feed_cursor():
+    return timezone.now() - timedelta(hours=1), CHANGED, 0
+
+
+def change_feed_changed(p):
+    return changed_rows(change_feed_cursor(), 100, list(TRIP_FIELDS), timezone.now())
+
+
+def change_feed_deleted(p):
+    return deleted_rows(change_feed_cursor(), 100, timezone.now())
+
+
+# Admin trip autocomplete, searched through the admin itself so search_fields are what's explained
+def admin_trip_search(p):
+    queryset, _ = admin.site._registry[TravelOptions].get_search_results(None, TravelOptions.objects.all(), p['city'])
+    return queryset
+
+
+# The WHERE clause of the conditional seat UPDATE in reserve_seats, as a SELECT so it can be explained
+def seat_availability_reserve(p):
+    return TravelOptions.objects.filter(pk=p['trip_id'], available_seats__gte=1)
+
+
+def seat_availability_taken(p):
+    return BookingTrip.objects.filter(trip=p['trip_id']).exclude(booking_status='Cancelled').values_list('seat_numbers', flat=True)
+
+
+@dataclass(frozen=True)
+class CriticalQuery:
+    build: object
+    # Leading-wildcard searches can't use a b-tree index, a scan there is expected
+    allow_seq_scan: bool = False
+    description: str = ''
+
+
+# Queries behind the hot paths, mirroring how the views build them. Add a query here together
+# with the view change that introduces it.
+CRITICAL_QUERIES = {
+    'main_page.filter': CriticalQuery(main_page_filter, description="Home page with mode, date and price filters"),
+    'main_page.search': CriticalQuery(main_page_search, allow_seq_scan=True, description="Home page destination search"),
+    'my_bookings.upcoming': CriticalQuery(my_bookings_upcoming, description="Upcoming bookings of one user"),
+    'my_bookings.totals': CriticalQuery(my_bookings_totals, description="Booking stats of one user"),
+    'my_bookings.passengers': CriticalQuery(my_bookings_passengers, description="Passenger names of the listed bookings"),
+    'api_trips.page': CriticalQuery(api_trips_page, description="Trips API page after a cursor"),
+    'api_trips.etag': CriticalQuery(api_trips_etag, description="Trips API ETag of a filtered search"),
+    'api_trips.etag_all': CriticalQuery(lambda p: api_trips_etag(p, {}), allow_seq_scan=True,
+                                        description="Trips API ETag without filters, counts every trip"),
+    'change_feed.changed': CriticalQuery(change_feed_changed, description="Trips edited since a change feed cursor"),
+    'change_feed.deleted': CriticalQuery(change_feed_deleted, description="Trips deleted since a change feed cursor"),
+    'admin.trip_search': CriticalQuery(admin_trip_search, description="Admin trip autocomplete by city"),
+    'seat_availability.reserve': CriticalQuery(seat_availability_reserve, description="Seat count check of reserve_seats"),
+    'seat_availability.taken': CriticalQuery(seat_availability_taken, description="Taken seat numbers of one trip"),
+}
+
+
+# Plan of one query reduced to what is compared: the scans it does, and on PostgreSQL its
+# estimated total cost (plus the measured time with ANALYZE)
+@dataclass
+class Plan:
+    text: str
+    scans: list
+    cost: float = None
+    actual_ms: float = None
+
+    def seq_scans(self):
+        return sorted({table for kind, table in self.scans if kind == 'seq'})
+
+    def shape(self):
+        return sorted(f"{kind}:{table}" for kind, table in self.scans)
+
+    def as_dict(self):
+        return {'cost': self.cost, 'scans': self.shape(), 'plan': self.text}
+
+
+def parse_postgresql(explained):
+    root = json.loads(explained)[0]
+    scans = []
+
+    def walk(node):
+        relation = node.get('Relation Name')
+        if relation:
+            scans.append(('seq' if node['Node Type'] == 'Seq Scan' else 'index', relation))
+        for child in node.get('Plans', []):
+            walk(child)
+
+    walk(root['Plan'])
+    return Plan(
+        text=json.dumps(root['Plan'], indent=1),
+        scans=scans,
+        cost=root['Plan']['Total Cost'],
+        actual_ms=root.get('Execution Time'),
+    )
+
+
+# SQLite only reports the access path: "SEARCH t USING INDEX" seeks into an index, any "SCAN t"
+# reads every row, also "SCAN t USING INDEX", which only walks the table in index order
+def parse_sqlite(explained):
+    scans = []
+    for line in explained.splitlines():
+        match = re.search(r"\b(SCAN|SEARCH) (\w+)", line)
+        if match:
+            kind, table = match.groups()
+            scans.append(('seq' if kind == 'SCAN' else 'index', table))
+    return Plan(text=explained, scans=scans)
+
+
+def explain(queryset, vendor, analyze=False):
+    if vendor == 'postgresql':
+        return parse_postgresql(queryset.explain(format='json', analyze=analyze))
+    if analyze:
+        raise ValueError(f"EXPLAIN ANALYZE is not supported on {vendor}")
+    return parse_sqlite(queryset.explain())
+
+
+# Problems of one plan against its baseline: a new sequential scan fails, so does an estimated
+# cost more than `cost_threshold` times the baseline's. A changed shape alone is only reported.
+def compare(query, plan, baseline, cost_threshold):
+    failures, notes = [], []
+    if plan.seq_scans() and not query.allow_seq_scan:
+        failures.append(f"sequential scan on {', '.join(plan.seq_scans())}")
+    if baseline:
+        if plan.cost is not None and baseline.get('cost') and plan.cost > baseline['cost'] * cost_threshold:
+            failures.append(f"estimated cost {plan.cost:.2f} is {plan.cost / baseline['cost']:.1f}x the baseline {baseline['cost']:.2f}")
+        if plan.shape() != baseline.get('scans'):
+            notes.append(f"plan changed: {', '.join(baseline.get('scans') or ['-'])} -> {', '.join(plan.shape()) or '-'}")
+    else:
+        notes.append("no baseline")
+    return failures, notes
@@ -0,0 +1,87 @@
+import re
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+
+from django.conf import settings
+from django.db import DatabaseError
+
+
+APP_DIR = str(Path(__file__).resolve().parent)
+
+# Instrumentation frames are never the origin of a query
+SKIPPED_FILES = {
+    str(Path(__file__).resolve()),
+    str(Path(__file__).resolve().with_name('middleware.py')),
+}
+
+# Transaction bookkeeping repeats with every atomic block and is never an N+1
+TRANSACTION_STATEMENTS = ('SAVEPOINT', 'RELEASE SAVEPOINT', 'ROLLBACK TO SAVEPOINT')
+
+
+# Same shape of query, whatever the literals or the length of an IN list / VALUES rows
+def fingerprint(sql):
+    sql = re.sub(r"'(?:[^']|'')*'", '?', sql)
+    sql = re.sub(r"\b\d+(?:\.\d+)?\b", '?', sql)
+    sql = re.sub(r"\(\s*(?:\?|%s)(?:\s*,\s*(?:\?|%s))*\s*\)", '(...)', sql)
+    sql = re.sub(r"\(\.\.\.\)(?:\s*,\s*\(\.\.\.\))+", '(...)', sql)
+    return re.sub(r"\s+", ' ', sql).strip()
+
+
+# "travels/views.py:123 in booking_page" for the innermost app frame that ran the query
+def find_origin():
+    frame = sys._getframe(1)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename.startswith(APP_DIR) and filename not in SKIPPED_FILES:
+            relative = Path(filename).relative_to(Path(APP_DIR).parent)
+            return f"{relative}:{frame.f_lineno} in {frame.f_code.co_name}"
+        frame = frame.f_back
+    return 'unknown'
+
+
+def explain(connection, sql, params):
+    if not sql.lstrip().upper().startswith(('SELECT', 'WITH')):
+        return None
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(f"{connection.ops.explain_query_prefix()} {sql}", params)
+            return '\n'.join(' '.join(str(column) for column in row) for row in cursor.fetchall())
+    except DatabaseError as e:
+        return f"EXPLAIN failed: {e}"
+
+
+# Every query of one sampled request: fingerprints with the origin of their first run, and the
+# queries slower than SLOW_QUERY_MS kept for an EXPLAIN once the response is built
+class QueryLog:
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.slow_ms = settings.SLOW_QUERY_MS
+        self.counts = Counter()
+        self.origins = {}
+        self.slow = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            if not sql.lstrip().upper().startswith(TRANSACTION_STATEMENTS):
+                key = fingerprint(sql)
+                self.counts[key] += 1
+                if key not in self.origins:
+                    self.origins[key] = find_origin()
+                if elapsed_ms >= self.slow_ms:
+                    origin = self.origins[key] if self.counts[key] == 1 else find_origin()
+                    self.slow.append((elapsed_ms, sql, params, many, origin))
+
+    def repeated(self, threshold):
+        return [(key, count, self.origins[key]) for key, count in self.counts.most_common() if count >= threshold]
+
+    def slow_queries(self):
+        for elapsed_ms, sql, params, many, origin in self.slow:
+            plan = None if many else explain(self.connection, sql, params)
+            yield elapsed_ms, sql, origin, plan
@@ -0,0 +1,86 @@
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import ClassVar
+
+from travels.models import BookingTrip, TravelOptions
+
+
+# Read models for list pages: only the columns a page renders, fetched with values_list() and
+# kept in slotted rows instead of model instances (no __dict__, no _state, no init signals).
+# COLUMNS lists the lookups filling the leading fields, in field order.
+
+
+@dataclass(slots=True)
+class TripCard:
+    id: int
+    source: str
+    destination: str
+    travel_date: datetime
+    return_date: datetime
+    duration: timedelta
+    price: Decimal
+    number_of_persons: int
+    available_seats: int
+    created_at: datetime
+    updated_at: datetime
+    travel_mode: str
+
+    COLUMNS: ClassVar[tuple] = (
+        'id', 'source', 'destination', 'travel_date', 'return_date', 'duration', 'price',
+        'number_of_persons', 'available_seats', 'created_at', 'updated_at', 'traveltype__travel_mode',
+    )
+
+    # Same as TravelOptions.days and .nights
+    @property
+    def days(self):
+        return self.duration.days if self.duration else 0
+
+    @property
+    def nights(self):
+        return self.days - 1
+
+
+@dataclass(slots=True)
+class BookingRow:
+    id: int
+    booking_reference: str
+    booked_at: datetime
+    booking_status: str
+    payment_status: str
+    number_of_seats: int
+    seat_numbers: list
+    total_price: Decimal
+    trip_source: str
+    trip_destination: str
+    trip_travel_date: datetime
+    passenger_names: tuple = ()
+
+    COLUMNS: ClassVar[tuple] = (
+        'id', 'booking_reference', 'booked_at', 'booking_status', 'payment_status', 'number_of_seats',
+        'seat_numbers', 'total_price', 'trip__source', 'trip__destination', 'trip__travel_date',
+    )
+
+
+def project(queryset, row_class):
+    return [row_class(*values) for values in queryset.values_list(*row_class.COLUMNS)]
+
+
+def trip_cards(queryset=None):
+    return project(TravelOptions.objects.all() if queryset is None else queryset, TripCard)
+
+
+# Booking rows of several lists with their passenger names, read for all of them in one query
+def booking_rows(*querysets):
+    lists = [project(queryset, BookingRow) for queryset in querysets]
+    names = defaultdict(list)
+    ids = {row.id for rows in lists for row in rows}
+    if ids:
+        passengers = BookingTrip.passengers.through.objects.filter(bookingtrip_id__in=ids).order_by('pk')
+        for booking_id, name in passengers.values_list('bookingtrip_id', 'passengerdetails__name'):
+            names[booking_id].append(name)
+    for rows in lists:
+        for row in rows:
+            row.passenger_names = tuple(names[row.id])
+    return lists
@@ -0,0 +1,65 @@
+from decimal import Decimal, InvalidOperation
+
+from django.db.models import Q
+from django.utils.dateparse import parse_date
+
+
+# Query parameters of a trip search, read by the home page and the trips API
+SEARCH_PARAMS = ('search', 'travel_mode', 'start_date', 'end_date', 'min_price', 'price_range')
+
+
+class SearchError(ValueError):
+    pass
+
+
+# A price bound as a Decimal. float() would let "inf", "nan" and "1e400" (inf) through to the
+# DecimalField lookup, which fails on them with a ValidationError instead of a 400.
+def parse_price(value, message):
+    try:
+        price = Decimal(str(value).strip())
+    except InvalidOperation:
+        raise SearchError(message)
+    if not price.is_finite():
+        raise SearchError(message)
+    return price
+
+
+# Applies the home page filters in `params` (request.GET) to a TravelOptions queryset, raises
+# SearchError with a message for the client on an invalid value
+def filter_trips(queryset, params):
+    search = params.get('search', '').strip()
+    travel_mode_id = params.get('travel_mode', None)
+    start_date_str = params.get('start_date', None)
+    end_date_str = params.get('end_date', None)
+    min_price = params.get('min_price', 100)
+    max_price = params.get('price_range', None)
+
+    # Filter by search term over destination using icontains for partial match
+    if search:
+        queryset = queryset.filter(Q(destination__icontains=search))
+
+    # Filter by travel_mode foreign key if valid
+    if travel_mode_id and travel_mode_id.isdecimal():
+        queryset = queryset.filter(traveltype=int(travel_mode_id))
+
+    # Filter by date range if provided
+    if start_date_str:
+        start_date = parse_date(start_date_str)
+        if not start_date:
+            raise SearchError("Invalid start_date format. Use YYYY-MM-DD.")
+        queryset = queryset.filter(travel_date__gte=start_date)
+
+    if end_date_str:
+        end_date = parse_date(end_date_str)
+        if not end_date:
+            raise SearchError("Invalid end_date format. Use YYYY-MM-DD.")
+        queryset = queryset.filter(return_date__lte=end_date)
+
+    # Filter by price range if provided
+    if min_price:
+        queryset = queryset.filter(price__gte=parse_price(min_price, "min_price must be a valid number"))
+
+    if max_price:
+        queryset = queryset.filter(price__lte=parse_price(max_price, "max_price must be a valid number"))
+
+    return queryset
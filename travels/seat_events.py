@@ -0,0 +1,193 @@
+import asyncio
+import contextvars
+import json
+import logging
+from contextlib import contextmanager
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import DatabaseError, connection
+
+from travels.models import BookingTrip, TravelOptions
+
+logger = logging.getLogger(__name__)
+
+# Seconds between comment lines keeping idle streams open through proxies
+HEARTBEAT_INTERVAL = 15
+
+# Client reconnect delay in milliseconds, sent with the first event
+RETRY_MS = 3000
+
+# Published when a poller dies: its streams end without a "closed" event and browsers reconnect
+RECONNECT = object()
+
+
+@contextmanager
+def reconnect_on_error():
+    try:
+        yield
+    except DatabaseError:
+        # Drop a broken connection so the next poll reconnects
+        connection.close()
+        raise
+
+
+# Seats of the booking page layout (10 rows x 4), numbered 0 to SEATS_PER_TRIP - 1
+SEATS_PER_TRIP = 40
+
+
+# One form for a seat number wherever seats are compared: an int, whether it came as 5 or '05'.
+# Anything else (labels of old bookings) is kept as a string.
+def canonical_seat(seat):
+    if isinstance(seat, int) and not isinstance(seat, bool):
+        return seat
+    text = str(seat).strip()
+    return int(text) if text.isdecimal() else text
+
+
+# Seat numbers held by active bookings of a trip, as the seat map numbers them
+def booked_seats(trip_id):
+    taken = set()
+    active = BookingTrip.objects.filter(trip_id=trip_id).exclude(booking_status='Cancelled')
+    for seats in active.values_list('seat_numbers', flat=True):
+        taken.update(canonical_seat(seat) for seat in seats or [])
+    return sorted(taken, key=lambda seat: (isinstance(seat, str), str(seat).zfill(8)))
+
+
+# Snapshot sent to the booking page, None once the trip is gone
+def seat_state(trip_id):
+    with reconnect_on_error():
+        trip = TravelOptions.objects.filter(pk=trip_id).values('available_seats').first()
+        if trip is None:
+            return None
+        return {'trip_id': trip_id, 'available_seats': trip['available_seats'], 'booked_seats': booked_seats(trip_id)}
+
+
+def trip_version(trip_id):
+    with reconnect_on_error():
+        return TravelOptions.objects.filter(pk=trip_id).values_list('updated_at', flat=True).first()
+
+
+def format_event(data, event='seats', retry=None):
+    lines = [f"retry: {retry}"] if retry else []
+    lines += [f"event: {event}", f"data: {json.dumps(data, separators=(',', ':'))}"]
+    return ('\n'.join(lines) + '\n\n').encode()
+
+
+class SeatChannel:
+
+    def __init__(self, trip_id):
+        self.trip_id = trip_id
+        self.subscribers = set()
+        self.wake = asyncio.Event()
+        self.state = None
+        self.task = None
+
+
+# Per-process fan-out of seat snapshots, one channel per trip with listeners. A channel's single
+# poller task checks the trip's updated_at (bumped by bookings, cancellations and edits in any
+# worker) every SEAT_EVENTS_POLL_INTERVAL seconds and pushes a new snapshot to every listener
+# when it moves, so the database sees one small query per trip, however many pages are open.
+# Bookings committed in this process wake the poller at once through notify().
+class SeatFanout:
+
+    def __init__(self):
+        self.channels = {}
+        self.loop = None
+
+    def subscribe(self, trip_id):
+        self.loop = asyncio.get_running_loop()
+        channel = self.channels.get(trip_id)
+        if channel is None:
+            channel = self.channels[trip_id] = SeatChannel(trip_id)
+        # Newest snapshot only, a slow reader skips the ones it missed
+        queue = asyncio.Queue(maxsize=1)
+        channel.subscribers.add(queue)
+        if channel.state is not None:
+            queue.put_nowait(channel.state)
+        if channel.task is None:
+            # A fresh context: the poller outlives the request that started it, it must not run
+            # its queries in that request's (soon closed) thread
+            channel.task = self.loop.create_task(self.poll(channel), context=contextvars.Context())
+        return queue
+
+    def unsubscribe(self, trip_id, queue):
+        channel = self.channels.get(trip_id)
+        # The queue's channel may already be gone and replaced by a newer one
+        if channel is None or queue not in channel.subscribers:
+            return
+        channel.subscribers.discard(queue)
+        if not channel.subscribers and channel.task is not None:
+            channel.task.cancel()
+            del self.channels[trip_id]
+
+    # Thread safe, called after a booking or cancellation commits
+    def notify(self, trip_id):
+        channel = self.channels.get(trip_id)
+        if channel is not None and self.loop is not None and not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(channel.wake.set)
+
+    # Last snapshot of a channel that stops polling, None when the trip is gone
+    def close(self, channel, state):
+        if self.channels.get(channel.trip_id) is channel:
+            del self.channels[channel.trip_id]
+        self.publish(channel, state)
+
+    def publish(self, channel, state):
+        channel.state = state
+        for queue in list(channel.subscribers):
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(state)
+
+    async def poll(self, channel):
+        version = None
+        while True:
+            try:
+                current = await sync_to_async(trip_version)(channel.trip_id)
+                if current is None or current != version:
+                    state = await sync_to_async(seat_state)(channel.trip_id)
+                    version = current
+                    if state is None:
+                        self.close(channel, None)
+                        return
+                    self.publish(channel, state)
+            except DatabaseError:
+                # Usually an outage, the next poll tries again
+                logger.warning("Seat poll for trip %s failed", channel.trip_id, exc_info=True)
+            except Exception:
+                # Would fail the same way on every poll: end the streams, the browsers' reconnects
+                # start a fresh poller
+                logger.exception("Seat poll for trip %s crashed", channel.trip_id)
+                self.close(channel, RECONNECT)
+                return
+            try:
+                await asyncio.wait_for(channel.wake.wait(), settings.SEAT_EVENTS_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            channel.wake.clear()
+
+    # Server-sent events for one listener: a snapshot on connect and on every change, a
+    # heartbeat comment while idle, and a final "closed" event when the trip is deleted
+    async def stream(self, trip_id):
+        queue = self.subscribe(trip_id)
+        retry = RETRY_MS
+        try:
+            while True:
+                try:
+                    state = await asyncio.wait_for(queue.get(), HEARTBEAT_INTERVAL)
+                except asyncio.TimeoutError:
+                    yield b": keep-alive\n\n"
+                    continue
+                if state is RECONNECT:
+                    return
+                if state is None:
+                    yield format_event({'trip_id': trip_id}, event='closed', retry=retry)
+                    return
+                yield format_event(state, retry=retry)
+                retry = None
+        finally:
+            self.unsubscribe(trip_id, queue)
+
+
+fanout = SeatFanout()
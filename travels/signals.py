@@ -0,0 +1,23 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from travels.cache import trips
+from travels.models import TravelModes, TravelOptions, TripTombstone
+
+
+# Admin and model edits to trips or travel modes start a new `trips` cache namespace, so the
+# cached travel mode list and home pages are rebuilt. Seat counts change through update()
+# (no signal) and are left to the page cache's short timeout.
+@receiver(post_save, sender=TravelOptions)
+@receiver(post_delete, sender=TravelOptions)
+@receiver(post_save, sender=TravelModes)
+@receiver(post_delete, sender=TravelModes)
+def invalidate_trips(sender, **kwargs):
+    trips.invalidate()
+
+
+# Deleted trips leave a tombstone for the change feed, queryset deletes included (they send
+# post_delete per row while a receiver is connected)
+@receiver(post_delete, sender=TravelOptions)
+def record_tombstone(sender, instance, **kwargs):
+    TripTombstone.objects.create(trip_id=instance.pk)
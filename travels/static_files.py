@@ -0,0 +1,166 @@
+import gzip
+import mimetypes
+import os
+import re
+from dataclasses import dataclass
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.utils.http import http_date, parse_http_date_safe
+
+try:
+    import brotli
+except ImportError:  # .br variants are skipped, gzip is always written
+    brotli = None
+
+
+# Names with the content hash ManifestStaticFilesStorage adds, safe to cache forever
+HASHED_NAME = re.compile(r"\.[0-9a-f]{12}\.\w+$")
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+UNHASHED_CACHE_CONTROL = 'public, max-age=300'
+
+# Already compressed formats (woff2, images) gain nothing
+COMPRESSIBLE = ('.css', '.js', '.mjs', '.svg', '.json', '.map', '.txt', '.html', '.xml', '.ttf', '.eot')
+MIN_COMPRESS_SIZE = 256
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+mimetypes.add_type('font/woff2', '.woff2')
+mimetypes.add_type('font/woff', '.woff')
+
+
+def compress_file(path):
+    data = path.read_bytes()
+    if len(data) < MIN_COMPRESS_SIZE:
+        return []
+    variants = [('.gz', gzip.compress(data, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        variants.append(('.br', brotli.compress(data, quality=11)))
+    written = []
+    for suffix, compressed in variants:
+        # Not worth a second lookup and a Vary hit for a few bytes
+        if len(compressed) < len(data) * 0.95:
+            target = path.with_name(path.name + suffix)
+            target.write_bytes(compressed)
+            written.append(target)
+    return written
+
+
+# collectstatic storage: hashed names from the manifest (as ManifestStaticFilesStorage) plus
+# .gz and .br variants of every text file next to them, served by StaticFilesMiddleware
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        for name in {*paths, *self.hashed_files.values()}:
+            if name.endswith(COMPRESSIBLE) and self.exists(name):
+                compress_file(Path(self.path(name)))
+
+    # Names missing from the manifest (nothing collected yet in development and tests) link
+    # unhashed. With STATIC_MANIFEST_STRICT, the default outside DEBUG, an asset that was never
+    # built or collected fails the page instead of linking a name that 404s or never expires.
+    def stored_name(self, name):
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            if settings.STATIC_MANIFEST_STRICT:
+                raise
+            return name
+
+
+@dataclass
+class StaticFile:
+    path: str
+    content_type: str
+    size: int
+    last_modified: float
+    cache_control: str
+    variants: dict
+
+    # Weak, it is shared by the plain and the compressed bodies
+    @property
+    def etag(self):
+        return f'W/"{self.size:x}-{int(self.last_modified):x}"'
+
+
+# Files under STATIC_ROOT by URL path, read once: the directory only changes on deploy
+def build_index(root, url_prefix):
+    index = {}
+    root = Path(root)
+    if not root.is_dir():
+        return index
+    for directory, _, filenames in os.walk(root):
+        for filename in filenames:
+            if filename.endswith(('.gz', '.br')):
+                continue
+            path = Path(directory, filename)
+            name = path.relative_to(root).as_posix()
+            stat = path.stat()
+            content_type, _ = mimetypes.guess_type(filename)
+            content_type = content_type or 'application/octet-stream'
+            if content_type.startswith('text/') or content_type in ('application/javascript', 'application/json'):
+                content_type += '; charset=utf-8'
+            variants = {}
+            for encoding, suffix in ENCODINGS:
+                compressed = path.with_name(filename + suffix)
+                if compressed.exists():
+                    variants[encoding] = (str(compressed), compressed.stat().st_size)
+            index[url_prefix + name] = StaticFile(
+                path=str(path),
+                content_type=content_type,
+                size=stat.st_size,
+                last_modified=stat.st_mtime,
+                cache_control=IMMUTABLE_CACHE_CONTROL if HASHED_NAME.search(filename) else UNHASHED_CACHE_CONTROL,
+                variants=variants,
+            )
+    return index
+
+
+# Encodings the client takes, "gzip;q=0" excluded
+def accepted_encodings(header):
+    accepted = set()
+    for item in header.split(','):
+        name, _, params = item.strip().partition(';')
+        quality = params.strip()
+        if quality.startswith('q='):
+            try:
+                if float(quality[2:]) == 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.add(name.strip().lower())
+    return accepted
+
+
+# The variant to send and its (path, size), the first encoding the client accepts
+def choose_variant(static_file, accept_encoding):
+    accepted = accepted_encodings(accept_encoding)
+    for encoding, _ in ENCODINGS:
+        if encoding in static_file.variants and (encoding in accepted or '*' in accepted):
+            return encoding, static_file.variants[encoding]
+    return None, (static_file.path, static_file.size)
+
+
+def not_modified(static_file, request):
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match is not None:
+        return static_file.etag in [tag.strip() for tag in if_none_match.split(',')] or if_none_match.strip() == '*'
+    since = parse_http_date_safe(request.headers.get('If-Modified-Since', ''))
+    return since is not None and int(static_file.last_modified) <= since
+
+
+def static_headers(static_file):
+    headers = {
+        'Cache-Control': static_file.cache_control,
+        'ETag': static_file.etag,
+        'Last-Modified': http_date(static_file.last_modified),
+    }
+    if static_file.variants:
+        headers['Vary'] = 'Accept-Encoding'
+    return headers
+
+
+def static_url_prefix():
+    return settings.STATIC_URL if settings.STATIC_URL.startswith('/') else '/' + settings.STATIC_URL
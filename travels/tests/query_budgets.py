@@ -0,0 +1,84 @@
+import difflib
+import re
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+# Most queries each URL name may run for one request, session and user lookups included.
+# Raise a budget only together with the change that needs it.
+QUERY_BUDGETS = {
+    'home': 2,
+    'details': 4,
+    'bookingpage': 3,
+    'seat_events': 4,
+    'create_booking': 3,
+    'confirm_booking': 11,
+    'confirm_offline_booking': 10,
+    'signup': 0,
+    'signin': 0,
+    'logout': 4,
+    'errorpage': 0,
+    'mybookings': 6,
+    'profile': 4,
+    'update_profile': 3,
+    'cancel_offline_booking': 7,
+    'export_bookings': 4,
+    'api_trips': 2,
+    'api_trip_changes': 2,
+    'metrics': 0,
+    'profiles': 2,
+    'profile_download': 2,
+    'memory_census': 2,
+}
+
+
+def normalize_sql(sql):
+    sql = re.sub(r"'[^']*'", "'?'", sql)
+    return re.sub(r"\b\d+\b", "?", sql)
+
+
+# Runs a view against datasets of growing size and fails when it exceeds its budget or when
+# its query count grows with the data (an N+1), printing the offending SQL as a diff
+class QueryBudgetMixin:
+    dataset_sizes = (1, 5, 15)
+
+    def seed_dataset(self, size):
+        raise NotImplementedError
+
+    def capture(self, make_request, arg):
+        with CaptureQueriesContext(connection) as ctx:
+            response = make_request(arg)
+            if response.streaming:
+                b''.join(response.streaming_content)
+        return response, [query['sql'] for query in ctx.captured_queries]
+
+    # prepare(size) runs outside the capture and its result is passed to make_request,
+    # use it for per-request fixtures such as a fresh trip to book
+    def assertQueryBudget(self, url_name, make_request, prepare=None):
+        runs = []
+        for size in self.dataset_sizes:
+            self.seed_dataset(size)
+            arg = prepare(size) if prepare else size
+            response, queries = self.capture(make_request, arg)
+            self.assertLess(response.status_code, 500, f"{url_name} returned {response.status_code} at size {size}")
+            runs.append((size, queries))
+
+        (small, small_queries), (large, large_queries) = runs[0], runs[-1]
+        if len(large_queries) > len(small_queries):
+            diff = difflib.unified_diff(
+                [normalize_sql(sql) for sql in small_queries],
+                [normalize_sql(sql) for sql in large_queries],
+                fromfile=f"{url_name} at size {small}", tofile=f"{url_name} at size {large}", lineterm='',
+            )
+            self.fail(
+                f"{url_name} query count grows with the data ({len(small_queries)} -> {len(large_queries)}), "
+                "likely an N+1:\n" + "\n".join(diff)
+            )
+
+        budget = QUERY_BUDGETS[url_name]
+        if len(large_queries) > budget:
+            self.fail(
+                f"{url_name} ran {len(large_queries)} queries, budget is {budget}:\n"
+                + "\n".join(f"{n}. {sql}" for n, sql in enumerate(large_queries, start=1))
+            )
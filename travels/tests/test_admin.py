@@ -0,0 +1,76 @@
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.test import TestCase, Client
+from django.urls import reverse
+from model_bakery import baker
+
+from travels.admin import ApproximateCountPaginator
+from travels.models import BookingTrip, PassengerDetails, TravelOptions
+
+
+class AdminPagesTest(TestCase):
+    """Test cases for the travels admin pages"""
+
+    def setUp(self):
+        self.client = Client()
+        self.admin = User.objects.create_superuser(username='admin', password='adminpassword123')
+        self.client.login(username='admin', password='adminpassword123')
+
+        self.trip = baker.make(TravelOptions, source='Mumbai', destination='Goa', available_seats=10)
+        self.passenger = baker.make(PassengerDetails, name='Asha', adhar_number='123412341234')
+        self.booking = baker.make(BookingTrip, user=self.admin, trip=self.trip)
+        self.booking.passengers.add(self.passenger)
+
+    def test_booking_change_form_uses_autocomplete(self):
+        """Test that the booking form does not render every related row as an <option>"""
+        baker.make(PassengerDetails, name='Other passenger', _quantity=5)
+        response = self.client.get(reverse('admin:travels_bookingtrip_change', args=[self.booking.pk]))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'class="admin-autocomplete"', count=3)
+        self.assertNotContains(response, 'Other passenger')
+
+    def test_booking_changelist_and_search(self):
+        """Test that the booking changelist loads and searches by reference"""
+        url = reverse('admin:travels_bookingtrip_changelist')
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+        response = self.client.get(url, {'q': self.booking.booking_reference})
+        self.assertContains(response, self.booking.booking_reference)
+
+    def test_changelists_load(self):
+        """Test that the trip and passenger changelists load with search"""
+        response = self.client.get(reverse('admin:travels_traveloptions_changelist'), {'q': 'Mumbai'})
+        self.assertContains(response, 'Mumbai')
+
+        response = self.client.get(reverse('admin:travels_passengerdetails_changelist'), {'q': '123412341234'})
+        self.assertContains(response, 'Asha')
+
+    def test_trip_autocomplete_endpoint(self):
+        """Test that the autocomplete view finds trips by source or destination city"""
+        params = {'app_label': 'travels', 'model_name': 'bookingtrip', 'field_name': 'trip'}
+        for term in ('Mumbai', 'Goa'):
+            response = self.client.get(reverse('admin:autocomplete'), {'term': term, **params})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.json()['results'][0]['id'], str(self.trip.pk))
+
+
+class ApproximateCountPaginatorTest(TestCase):
+    """Test cases for the changelist paginator"""
+
+    def test_exact_count_outside_postgresql(self):
+        """Test that the paginator counts exactly when no estimate is available"""
+        baker.make(PassengerDetails, _quantity=3)
+        paginator = ApproximateCountPaginator(PassengerDetails.objects.order_by('pk'), 2)
+        self.assertEqual(paginator.count, 3)
+        self.assertEqual(paginator.num_pages, 2)
+
+    def test_estimate_used_for_large_postgresql_tables(self):
+        """Test that a large pg_class estimate replaces COUNT(*) for unfiltered querysets"""
+        paginator = ApproximateCountPaginator(PassengerDetails.objects.order_by('pk'), 50)
+        with patch('travels.admin.connections') as connections:
+            connection = connections.__getitem__.return_value
+            connection.vendor = 'postgresql'
+            connection.cursor.return_value.__enter__.return_value.fetchone.return_value = (2500000,)
+            self.assertEqual(paginator.count, 2500000)
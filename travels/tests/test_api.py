@@ -0,0 +1,193 @@
+import json
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from model_bakery import baker
+
+from travels import api
+from travels.models import TravelModes, TravelOptions, TripTombstone
+
+
+class TripSearchApiTest(TestCase):
+    """Test cases for the versioned JSON trip search"""
+
+    def setUp(self):
+        self.bus = baker.make(TravelModes, travel_mode='Bus')
+        self.flight = baker.make(TravelModes, travel_mode='Flight')
+        start = timezone.now() + timedelta(days=10)
+        self.trips = [
+            baker.make(
+                TravelOptions, traveltype=self.bus if n % 2 else self.flight, source='Pune',
+                destination=f"City {n}", price=Decimal(f"{500 + n * 100}.00"), available_seats=20,
+                travel_date=start + timedelta(days=n // 2), return_date=start + timedelta(days=n // 2 + 2),
+            )
+            for n in range(5)
+        ]
+
+    def get(self, **params):
+        return self.client.get(reverse('api_trips'), params)
+
+    def test_keyset_pages_cover_every_trip_once(self):
+        """Test that following `next` walks all trips newest first, ties broken by id"""
+        url, seen = reverse('api_trips') + '?limit=2', []
+        while url:
+            data = json.loads(self.client.get(url).content)
+            self.assertLessEqual(len(data['results']), 2)
+            seen += [row['id'] for row in data['results']]
+            url = data['next']
+        expected = sorted(self.trips, key=lambda trip: (trip.travel_date, trip.id), reverse=True)
+        self.assertEqual(seen, [trip.id for trip in expected])
+
+    def test_filters_match_the_home_page(self):
+        """Test that the home page filters apply to the API"""
+        data = json.loads(self.get(travel_mode=self.bus.pk, price_range='700').content)
+        self.assertEqual([row['destination'] for row in data['results']], ['City 1'])
+        self.assertEqual(data['results'][0]['travel_mode'], 'Bus')
+
+    def test_field_selection_and_encoding(self):
+        """Test that only the requested fields come back, money as strings and durations in seconds"""
+        row = json.loads(self.get(fields='id,price,duration', search='City 0').content)['results'][0]
+        self.assertEqual(row, {'id': self.trips[0].id, 'price': '500.00', 'duration': 2 * 86400})
+
+    def test_stdlib_encoder_fallback(self):
+        """Test that the response is the same without orjson"""
+        with patch.object(api, 'orjson', None):
+            fallback = json.loads(self.get(limit=3).content)
+        self.assertEqual(fallback, json.loads(self.get(limit=3).content))
+
+    def test_unchanged_page_is_not_modified(self):
+        """Test that a repeat request with the ETag gets a 304 until a matching trip changes"""
+        etag = self.get()['ETag']
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('api_trips'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        TravelOptions.objects.filter(pk=self.trips[0].pk).update(available_seats=3, updated_at=timezone.now())
+        self.assertEqual(self.client.get(reverse('api_trips'), HTTP_IF_NONE_MATCH=etag).status_code, 200)
+        etag = self.get()['ETag']
+        self.trips[1].delete()
+        self.assertEqual(self.client.get(reverse('api_trips'), HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_invalid_queries_are_rejected(self):
+        """Test that bad fields, cursors, limits and filters answer 400 with a JSON error"""
+        for params in ({'fields': 'id,secret'}, {'cursor': 'not-a-cursor'}, {'limit': '500'}, {'limit': '²'},
+                       {'start_date': 'soon'}):
+            response = self.get(**params)
+            self.assertEqual(response.status_code, 400, params)
+            self.assertIn('error', json.loads(response.content))
+        # Not a decimal number, so not a travel mode filter, like on the home page
+        self.assertEqual(len(json.loads(self.get(travel_mode='²').content)['results']), 5)
+
+    def test_prices_must_be_finite_numbers(self):
+        """Test that infinite and NaN price bounds answer 400 on the API and the home page"""
+        for params in ({'min_price': 'inf'}, {'min_price': 'nan'}, {'price_range': '-Infinity'},
+                       {'price_range': 'sNaN'}, {'min_price': '5 00'}):
+            self.assertEqual(self.get(**params).status_code, 400, params)
+            self.assertEqual(self.client.get(reverse('home'), params).status_code, 400, params)
+        # Out of float range but a finite decimal, simply above every price
+        self.assertEqual(json.loads(self.get(min_price='1e400').content)['results'], [])
+        self.assertEqual(len(json.loads(self.get(price_range='1e400').content)['results']), 5)
+        self.assertEqual(self.client.get(reverse('home'), {'min_price': '1e400'}).status_code, 200)
+
+
+@override_settings(CHANGE_FEED_SETTLE=0)
+class TripChangeFeedTest(TestCase):
+    """Test cases for the cursor based trip change feed"""
+
+    def setUp(self):
+        self.mode = baker.make(TravelModes, travel_mode='Bus')
+        self.trips = [
+            baker.make(TravelOptions, traveltype=self.mode, destination=f"City {n}", price=Decimal('500.00'),
+                       available_seats=20, travel_date=timezone.now() + timedelta(days=n + 1),
+                       return_date=timezone.now() + timedelta(days=n + 3))
+            for n in range(3)
+        ]
+
+    def sync(self, cursor=None, **params):
+        if cursor:
+            params['cursor'] = cursor
+        changes = []
+        while True:
+            data = json.loads(self.client.get(reverse('api_trip_changes'), params).content)
+            changes += data['changes']
+            params['cursor'] = data['cursor']
+            if not data['has_more']:
+                return changes, data['cursor']
+
+    def test_first_sync_pages_through_everything(self):
+        """Test that a client without a cursor gets every trip once, in bounded pages"""
+        changes, cursor = self.sync(limit='2')
+        self.assertEqual([change['id'] for change in changes], [trip.id for trip in self.trips])
+        self.assertFalse(any(change['deleted'] for change in changes))
+        self.assertEqual(self.sync(cursor)[0], [])
+
+    def test_only_changes_since_the_cursor(self):
+        """Test that edits and deletions after the cursor come back, nothing else"""
+        _, cursor = self.sync()
+        TravelOptions.objects.filter(pk=self.trips[1].pk).update(available_seats=3, updated_at=timezone.now())
+        deleted_id = self.trips[0].pk
+        self.trips[0].delete()
+
+        changes, cursor = self.sync(cursor, fields='available_seats')
+        self.assertEqual(changes[0]['id'], self.trips[1].pk)
+        self.assertEqual(changes[0]['available_seats'], 3)
+        self.assertNotIn('destination', changes[0])
+        self.assertEqual((changes[1]['id'], changes[1]['deleted']), (deleted_id, True))
+        self.assertEqual(len(changes), 2)
+        self.assertEqual(self.sync(cursor)[0], [])
+
+    def test_ties_on_the_timestamp_are_not_skipped(self):
+        """Test that rows changed at the same instant straddling a page boundary all arrive"""
+        now = timezone.now()
+        TravelOptions.objects.update(updated_at=now)
+        TripTombstone.objects.create(trip_id=999, deleted_at=now)
+        changes, _ = self.sync(limit='1')
+        self.assertEqual([change['id'] for change in changes], [trip.id for trip in self.trips] + [999])
+
+    @override_settings(CHANGE_FEED_SETTLE=60)
+    def test_recent_changes_wait_for_the_settle_window(self):
+        """Test that changes newer than CHANGE_FEED_SETTLE are held back"""
+        changes, cursor = self.sync()
+        self.assertEqual((changes, cursor), ([], None))
+
+    @override_settings(CHANGE_FEED_RETENTION_DAYS=30)
+    def test_cursor_older_than_the_retention_is_gone(self):
+        """Test that a cursor whose deletions may have been purged answers 410"""
+        stale = api.encode_cursor(timezone.now() - timedelta(days=31), 0, 1)
+        response = self.client.get(reverse('api_trip_changes'), {'cursor': stale})
+        self.assertEqual(response.status_code, 410)
+        self.assertIn('sync again', json.loads(response.content)['error'])
+        fresh = api.encode_cursor(timezone.now() - timedelta(days=29), 0, 1)
+        self.assertEqual(self.client.get(reverse('api_trip_changes'), {'cursor': fresh}).status_code, 200)
+
+    def test_invalid_cursor(self):
+        """Test that a malformed cursor answers 400"""
+        response = self.client.get(reverse('api_trip_changes'), {'cursor': 'bogus'})
+        self.assertEqual(response.status_code, 400)
+
+
+class PurgeTombstonesCommandTest(TestCase):
+    """Test cases for the purge_tombstones management command"""
+
+    def test_deletes_only_tombstones_past_the_retention(self):
+        """Test that old tombstones go, batch by batch, and recent ones stay"""
+        old, recent = timezone.now() - timedelta(days=31), timezone.now() - timedelta(days=29)
+        TripTombstone.objects.bulk_create(
+            [TripTombstone(trip_id=n, deleted_at=old) for n in range(5)] + [TripTombstone(trip_id=99, deleted_at=recent)]
+        )
+        out = StringIO()
+        with self.assertNumQueries(6):  # three batches, each a select and a delete
+            call_command('purge_tombstones', '--days', '30', '--batch-size', '2', stdout=out)
+        self.assertIn('Deleted 5 tombstone(s) older than 30 days', out.getvalue())
+        self.assertEqual(list(TripTombstone.objects.values_list('trip_id', flat=True)), [99])
+
+    def test_retention_must_be_positive(self):
+        """Test that a zero retention, which would purge deletions not yet synced, is refused"""
+        with self.assertRaisesMessage(CommandError, '--days must be at least 1'):
+            call_command('purge_tombstones', '--days', '0', stdout=StringIO())
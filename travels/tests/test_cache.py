@@ -0,0 +1,218 @@
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.core.cache import cache, caches
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from model_bakery import baker
+
+from travels.cache import FileCache, Namespace, TieredCache, get_or_compute, trips
+from travels.models import TravelModes, TravelOptions
+
+
+class FileCacheTest(SimpleTestCase):
+    """Test cases for the file based shared cache"""
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+
+    def _cache(self):
+        return FileCache(self.dir.name, {})
+
+    def test_add_is_atomic_across_instances(self):
+        """Test that concurrent adds from separate instances let exactly one through"""
+        results = []
+        barrier = threading.Barrier(8)
+
+        def add():
+            file_cache = self._cache()
+            barrier.wait()
+            results.append(file_cache.add('lock', 1, 30))
+
+        threads = [threading.Thread(target=add) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results.count(True), 1)
+
+    def test_incr_keeps_the_expiry(self):
+        """Test that incr() adds to the value without making it permanent"""
+        file_cache = self._cache()
+        file_cache.set('counter', 1, 30)
+        self.assertEqual(file_cache.incr('counter', 2), 3)
+        self.assertEqual(file_cache.get('counter'), 3)
+        with patch('travels.cache.time.time', return_value=time.time() + 60):
+            with self.assertRaises(ValueError):
+                file_cache.incr('counter')
+
+    def test_incr_of_a_missing_key_fails(self):
+        """Test that incr() on a missing key raises ValueError like the other backends"""
+        with self.assertRaises(ValueError):
+            self._cache().incr('missing')
+
+
+@override_settings(CACHES={
+    'default': {'BACKEND': 'travels.cache.TieredCache',
+                'OPTIONS': {'SHARED_ALIAS': 'shared', 'LOCAL_MAX_ENTRIES': 2, 'LOCAL_TIMEOUT': 5}},
+    'shared': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'tiered-test'},
+})
+class TieredCacheTest(SimpleTestCase):
+    """Test cases for the per-process tier in front of the shared cache"""
+
+    def setUp(self):
+        self.tiered = caches['default']
+        self.shared = caches['shared']
+        self.tiered.clear()
+
+    def test_local_hits_skip_the_shared_cache(self):
+        """Test that a repeat read is answered in process"""
+        self.tiered.set('key', 'value')
+        with patch.object(self.shared, 'get', side_effect=AssertionError('shared read')):
+            self.assertEqual(self.tiered.get('key'), 'value')
+
+    def test_shared_values_fill_the_local_tier(self):
+        """Test that another worker's write is read once, then served locally"""
+        self.shared.set('key', 'value')
+        self.assertEqual(self.tiered.get('key'), 'value')
+        self.shared.set('key', 'changed')
+        self.assertEqual(self.tiered.get('key'), 'value')
+        with patch('travels.cache.time.monotonic', return_value=time.monotonic() + 10):
+            self.assertEqual(self.tiered.get('key'), 'changed')
+
+    def test_local_tier_is_bounded(self):
+        """Test that the least recently used entry is evicted locally only"""
+        for key in ('a', 'b', 'c'):
+            self.tiered.set(key, key)
+        self.assertEqual(list(self.tiered.local.entries), [self.tiered.make_key('b'), self.tiered.make_key('c')])
+        self.assertEqual(self.tiered.get('a'), 'a')
+
+    def test_delete_and_incr_reach_both_tiers(self):
+        """Test that deletes and counters never answer from a stale local copy"""
+        self.tiered.set('counter', 1)
+        self.assertEqual(self.tiered.incr('counter'), 2)
+        self.assertEqual(self.tiered.get('counter'), 2)
+        self.tiered.delete('counter')
+        self.assertIsNone(self.tiered.get('counter'))
+        self.assertIsNone(self.shared.get('counter'))
+
+    def test_cached_none_is_a_hit(self):
+        """Test that a stored None is not mistaken for a miss"""
+        self.tiered.set('empty', None)
+        self.assertTrue(self.tiered.has_key('empty'))
+        self.assertEqual(self.tiered.get_many(['empty', 'missing']), {'empty': None})
+
+    def test_is_a_configured_backend(self):
+        """Test that the settings put the tiered cache in front of the shared one"""
+        self.assertIsInstance(self.tiered, TieredCache)
+
+
+class GetOrComputeTest(SimpleTestCase):
+    """Test cases for single-flight cache reads"""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_concurrent_misses_compute_once(self):
+        """Test that callers racing on a miss share one computation"""
+        calls = []
+        barrier = threading.Barrier(6)
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.1)
+            return 'value'
+
+        results = []
+
+        def read():
+            barrier.wait()
+            results.append(get_or_compute('single-flight', compute, 30))
+
+        threads = [threading.Thread(target=read) for _ in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, ['value'] * 6)
+        self.assertEqual(len(calls), 1)
+        self.assertIsNone(cache.get('single-flight:lock'))
+
+    def test_waits_for_another_process(self):
+        """Test that a caller waits for the lock holder's result, then computes after `wait`"""
+        cache.add('elsewhere:lock', 1, 30)
+        threading.Timer(0.1, cache.set, ('elsewhere', 'theirs')).start()
+        self.assertEqual(get_or_compute('elsewhere', lambda: 'mine', 30, wait=2), 'theirs')
+        cache.add('stuck:lock', 1, 30)
+        self.assertEqual(get_or_compute('stuck', lambda: 'mine', 30, wait=0.1), 'mine')
+
+
+class NamespaceTest(SimpleTestCase):
+    """Test cases for versioned key namespaces"""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_invalidate_moves_every_key(self):
+        """Test that invalidating a namespace gives all its keys new names"""
+        namespace = Namespace('listings')
+        key = namespace.key('page')
+        cache.set(key, 'old')
+        namespace.invalidate()
+        self.assertNotEqual(namespace.key('page'), key)
+        self.assertIsNone(cache.get(namespace.key('page')))
+
+    def test_lost_version_never_restarts_at_old_numbers(self):
+        """Test that an evicted version starts over from the clock"""
+        namespace = Namespace('listings')
+        first = namespace.version()
+        cache.clear()
+        self.assertGreaterEqual(namespace.version(), first)
+        namespace.invalidate()
+        self.assertGreater(namespace.version(), first)
+
+
+class TripsNamespaceTest(TestCase):
+    """Test cases for invalidating cached trip data on edits"""
+
+    def setUp(self):
+        cache.clear()
+        self.mode = baker.make(TravelModes, travel_mode='Flight')
+
+    def test_trip_and_mode_edits_invalidate(self):
+        """Test that saving or deleting trips and modes moves the trips namespace"""
+        version = trips.version()
+        trip = baker.make(TravelOptions, traveltype=self.mode, price=Decimal('5000.00'), available_seats=5,
+                          travel_date=timezone.now() + timedelta(days=3))
+        self.assertNotEqual(trips.version(), version)
+        version = trips.version()
+        trip.delete()
+        self.assertNotEqual(trips.version(), version)
+        version = trips.version()
+        self.mode.save()
+        self.assertNotEqual(trips.version(), version)
+
+    def test_home_page_caches_travel_modes(self):
+        """Test that the travel mode list is read once until a mode changes"""
+        self.client.get(reverse('home'))
+        self.assertEqual([m.travel_mode for m in cache.get(trips.key('travel_modes'))], ['Flight'])
+        baker.make(TravelModes, travel_mode='Train')
+        response = self.client.get(reverse('home'))
+        self.assertContains(response, 'Train')
+
+    @override_settings(PAGE_CACHE_TIMEOUT=30)
+    def test_edit_drops_cached_home_pages(self):
+        """Test that a trip saved through the ORM shows up despite the page cache"""
+        self.client.get(reverse('home'))
+        baker.make(TravelOptions, traveltype=self.mode, source='Pune', destination='Goa', price=Decimal('5000.00'),
+                   available_seats=5, travel_date=timezone.now() + timedelta(days=3),
+                   return_date=timezone.now() + timedelta(days=5))
+        response = self.client.get(reverse('home'))
+        self.assertEqual(response['X-Page-Cache'], 'miss')
+        self.assertContains(response, 'Pune → Goa')
@@ -0,0 +1,436 @@
+import csv
+import json
+import os
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.contrib.auth.models import User
+from django.db import OperationalError
+from django.db.models import Sum
+from django.test import LiveServerTestCase, TestCase, override_settings
+from model_bakery import baker
+from unittest.mock import patch
+
+from travels import query_plans
+from travels.cache import trips
+from travels.command_utils import percentile
+from travels.management.commands.benchmark_http import Recorder
+from travels.models import BookingTrip, PassengerDetails, TravelModes, TravelOptions
+from travels.payments import LocalGateway, gateway_secret
+
+
+class ImportTripsCommandTest(TestCase):
+    """Test cases for the import_trips management command"""
+
+    def write_file(self, suffix, content):
+        fd, path = tempfile.mkstemp(suffix=suffix)
+        with os.fdopen(fd, 'w') as fh:
+            fh.write(content)
+        self.addCleanup(os.remove, path)
+        return path
+
+    def run_import(self, path, **options):
+        out, err = StringIO(), StringIO()
+        call_command('import_trips', path, stdout=out, stderr=err, **options)
+        return out.getvalue(), err.getvalue()
+
+    def test_csv_import_computes_duration(self):
+        """Test that CSV rows are created with duration computed"""
+        path = self.write_file('.csv', (
+            "travel_mode,source,destination,travel_date,return_date,price,available_seats\n"
+            "Bus,Mumbai,Goa,2030-01-01T08:00:00,2030-01-04T08:00:00,1500.00,40\n"
+            "Flight,Delhi,Leh,2030-02-01,2030-02-06,9000,120\n"
+        ))
+        out, _ = self.run_import(path)
+
+        self.assertIn("2 created, 0 updated, 0 invalid", out)
+        trip = TravelOptions.objects.get(source="Mumbai")
+        self.assertEqual(trip.duration, timedelta(days=3))
+        self.assertEqual(trip.traveltype.travel_mode, "Bus")
+        self.assertEqual(TravelModes.objects.count(), 2)
+
+    def test_jsonl_import_upserts_on_natural_key(self):
+        """Test that re-importing the same trip updates it instead of duplicating"""
+        row = {
+            'travel_mode': 'Train', 'source': 'Pune', 'destination': 'Nagpur',
+            'travel_date': '2030-03-01T06:00:00', 'return_date': '2030-03-02T06:00:00',
+            'price': '800', 'available_seats': 60,
+        }
+        self.run_import(self.write_file('.jsonl', json.dumps(row) + "\n"))
+
+        row.update(price='950', return_date='2030-03-03T06:00:00')
+        version = trips.version()
+        out, _ = self.run_import(self.write_file('.jsonl', json.dumps(row) + "\n"), batch_size=1)
+
+        self.assertIn("0 created, 1 updated", out)
+        trip = TravelOptions.objects.get()
+        self.assertEqual(trip.price, Decimal('950.00'))
+        self.assertEqual(trip.duration, timedelta(days=2))
+        self.assertNotEqual(trips.version(), version)  # bulk_update sends no signal
+
+    def test_invalid_rows_are_skipped_and_reported(self):
+        """Test that invalid rows are reported without stopping the import"""
+        path = self.write_file('.csv', (
+            "travel_mode,source,destination,travel_date,return_date,price,available_seats\n"
+            "Bus,Mumbai,Goa,2030-01-05,2030-01-01,1500,40\n"
+            "Bus,Mumbai,Goa,2030-01-01,2030-01-05,abc,40\n"
+            "Bus,Mumbai,Goa,2030-01-01,2030-01-05,1500,40\n"
+        ))
+        out, err = self.run_import(path)
+
+        self.assertIn("1 created, 0 updated, 2 invalid", out)
+        self.assertIn("line 2: return_date must be after travel_date", err)
+        self.assertIn("line 3: price must be a number", err)
+
+    def test_jsonl_values_of_the_wrong_type_are_invalid(self):
+        """Test that non-string JSON values are reported as invalid rows instead of crashing"""
+        row = {
+            'travel_mode': 'Bus', 'source': 'Pune', 'destination': 'Goa',
+            'travel_date': '2030-03-01', 'return_date': '2030-03-02', 'price': 800, 'available_seats': 60,
+        }
+        bad_rows = [dict(row, travel_mode=3), dict(row, source=['Pune']), dict(row, travel_date=20300301),
+                    dict(row, price={'amount': 800}), dict(row, price=-1)]
+        path = self.write_file('.jsonl', "".join(json.dumps(r) + "\n" for r in [row] + bad_rows))
+        out, err = self.run_import(path)
+
+        self.assertIn("1 created, 0 updated, 5 invalid", out)
+        self.assertIn("line 2: travel_mode must be a string", err)
+        self.assertIn("line 3: source must be a string", err)
+        self.assertIn("line 4: travel_date must be a string", err)
+        self.assertIn("line 5: price must be a number", err)
+        self.assertIn("line 6: price must be a non-negative number", err)
+
+    @override_settings(CHANGE_FEED_SETTLE=5)
+    def test_batch_outlasting_the_change_feed_window_rolls_back(self):
+        """Test that a batch still writing CHANGE_FEED_SETTLE seconds after stamping updated_at is not committed"""
+        path = self.write_file('.csv', (
+            "travel_mode,source,destination,travel_date,return_date,price,available_seats\n"
+            "Bus,Mumbai,Goa,2030-01-01,2030-01-04,1500,40\n"
+            "Bus,Pune,Goa,2030-01-01,2030-01-04,1500,40\n"
+        ))
+        # Stamp and check times of two batches, the second one takes 10 seconds
+        with patch('travels.management.commands.import_trips.time') as clock:
+            clock.monotonic.side_effect = [0, 1, 10, 20]
+            with self.assertRaisesMessage(CommandError, 'smaller --batch-size'):
+                self.run_import(path, batch_size=1)
+        self.assertEqual(list(TravelOptions.objects.values_list('source', flat=True)), ['Mumbai'])
+
+    def test_strict_mode_aborts_on_invalid_row(self):
+        """Test that --strict stops at the first invalid row"""
+        path = self.write_file('.jsonl', "not json\n")
+        with self.assertRaises(CommandError):
+            self.run_import(path, strict=True)
+
+    def test_missing_file(self):
+        """Test that a missing file raises a CommandError"""
+        with self.assertRaises(CommandError):
+            self.run_import('/nonexistent/trips.csv')
+
+
+class ExportBookingsCommandTest(TestCase):
+    """Test cases for the export_bookings management command"""
+
+    def setUp(self):
+        user = User.objects.create_user(username='traveller')
+        trip = baker.make(TravelOptions, source='Delhi', destination='Agra', available_seats=5)
+        baker.make(BookingTrip, user=user, trip=trip, booking_status='Confirmed', _quantity=3)
+        baker.make(BookingTrip, user=user, trip=trip, booking_status='Pending')
+
+    def test_export_to_stdout_in_chunks(self):
+        """Test that every matching booking is written when chunks are smaller than the result"""
+        out = StringIO()
+        call_command('export_bookings', '--format', 'jsonl', '--status', 'Confirmed', '--chunk-size', '2', stdout=out)
+
+        rows = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual(len(rows), 3)
+        self.assertTrue(all(row['destination'] == 'Agra' for row in rows))
+
+    def test_export_to_file(self):
+        """Test that --output writes a CSV file with a header row"""
+        fd, path = tempfile.mkstemp(suffix='.csv')
+        os.close(fd)
+        self.addCleanup(os.remove, path)
+
+        call_command('export_bookings', '--output', path)
+        with open(path) as fh:
+            self.assertEqual(len(fh.read().splitlines()), 5)
+
+    def test_csv_cells_are_not_formulas(self):
+        """Test that names a spreadsheet would evaluate are quoted in the CSV"""
+        user = User.objects.create_user(username='@SUM(A1)')
+        booking = baker.make(BookingTrip, user=user, trip=TravelOptions.objects.get(), booking_status='Confirmed')
+        booking.passengers.add(baker.make(PassengerDetails, name='=HYPERLINK("http://evil")', age=30))
+        out = StringIO()
+        call_command('export_bookings', stdout=out)
+
+        row = next(r for r in csv.DictReader(StringIO(out.getvalue())) if r['username'].endswith('SUM(A1)'))
+        self.assertEqual(row['username'], "'@SUM(A1)")
+        self.assertEqual(row['passengers'], "'=HYPERLINK(\"http://evil\") (30)")
+        self.assertEqual(row['destination'], 'Agra')
+
+    def test_invalid_date(self):
+        """Test that a malformed date raises a CommandError"""
+        with self.assertRaises(CommandError):
+            call_command('export_bookings', '--start-date', '01/01/2030', stdout=StringIO())
+
+
+class SeedLoadDataCommandTest(TestCase):
+    """Test cases for the seed_load_data management command"""
+
+    def seed(self, *args):
+        out = StringIO()
+        call_command('seed_load_data', '--trips', '40', '--users', '10', '--bookings', '150',
+                     '--base-date', '2030-01-01', '--batch-size', '25', *args, stdout=out)
+        return out.getvalue()
+
+    def snapshot(self):
+        trips = list(TravelOptions.objects.order_by('travel_date', 'source', 'destination', 'price').values_list(
+            'source', 'destination', 'travel_date', 'price', 'available_seats'))
+        bookings = list(BookingTrip.objects.order_by('booking_reference').values_list(
+            'booking_reference', 'user__username', 'number_of_seats', 'seat_numbers', 'total_price', 'booking_status'))
+        return trips, bookings
+
+    def test_seed_is_deterministic(self):
+        """Test that the same seed and base date generate identical data"""
+        out = self.seed()
+        self.assertIn("Seeded 40 trips, 10 users", out)
+        first = self.snapshot()
+
+        self.seed('--flush')
+        self.assertEqual(self.snapshot(), first)
+        self.assertEqual(User.objects.count(), 10)
+
+        self.seed('--flush', '--seed', '7')
+        self.assertNotEqual(self.snapshot(), first)
+
+    def test_seats_match_bookings(self):
+        """Test that available seats and seat numbers agree with the generated bookings"""
+        self.seed()
+        self.assertGreater(BookingTrip.objects.count(), 0)
+        for trip in TravelOptions.objects.all():
+            active = trip.bookingtrip_set.exclude(booking_status='Cancelled')
+            booked = active.aggregate(total=Sum('number_of_seats'))['total'] or 0
+            self.assertEqual(trip.available_seats, 40 - booked)
+            seats = [seat for numbers in active.values_list('seat_numbers', flat=True) for seat in numbers]
+            self.assertEqual(len(seats), len(set(seats)))
+
+        booking = BookingTrip.objects.select_related('trip').first()
+        self.assertEqual(booking.passengers.count(), booking.number_of_seats)
+        self.assertEqual(booking.total_price, booking.trip.price * booking.number_of_seats)
+
+    def test_existing_load_data_requires_flush(self):
+        """Test that seeding twice without --flush is refused"""
+        self.seed()
+        with self.assertRaises(CommandError):
+            self.seed()
+
+    def test_failed_or_booking_free_seed_is_not_duplicated(self):
+        """Test that a failed seed leaves nothing behind and one without bookings still blocks a rerun"""
+        with patch.object(BookingTrip.objects, 'bulk_create', side_effect=OperationalError), \
+                self.assertRaises(OperationalError):
+            self.seed()
+        self.assertEqual((TravelOptions.objects.count(), User.objects.count()), (0, 0))
+
+        self.seed('--bookings', '0')
+        with self.assertRaises(CommandError):
+            self.seed('--bookings', '0')
+        self.assertEqual(TravelOptions.objects.count(), 40)
+
+
+class BenchmarkHttpCommandTest(LiveServerTestCase):
+    """Test cases for the benchmark_http management command against a live server"""
+
+    def setUp(self):
+        call_command('seed_load_data', '--trips', '20', '--users', '3', '--bookings', '10', stdout=StringIO())
+
+    def test_benchmark_writes_latency_report(self):
+        """Test a short mixed run through the local payment gateway"""
+        fd, path = tempfile.mkstemp(suffix='.json')
+        os.close(fd)
+        self.addCleanup(os.remove, path)
+
+        with patch('travels.views.razorpay_client', LocalGateway(gateway_secret())):
+            out = StringIO()
+            call_command('benchmark_http', '--base-url', self.live_server_url, '--concurrency', '2',
+                         '--duration', '2', '--warmup', '0', '--book-ratio', '0.5', '--output', path, stdout=out)
+
+        with open(path) as fh:
+            results = json.load(fh)
+        self.assertGreater(results['total']['requests'], 0)
+        self.assertIn('home', results['endpoints'])
+        for stats in results['endpoints'].values():
+            self.assertLessEqual(stats['p50_ms'], stats['p95_ms'])
+            self.assertLessEqual(stats['p95_ms'], stats['p99_ms'])
+        self.assertIn('req/s', out.getvalue())
+
+    def test_requires_seeded_database(self):
+        """Test that the benchmark refuses to run without load users"""
+        User.objects.filter(username__startswith='load_user_').delete()
+        with self.assertRaises(CommandError):
+            call_command('benchmark_http', '--duration', '1', stdout=StringIO())
+
+
+class BenchmarkStatsTest(TestCase):
+    """Test cases for the benchmark statistics helpers"""
+
+    def test_percentile_nearest_rank(self):
+        """Test nearest-rank percentiles over sorted samples"""
+        samples = list(range(1, 101))
+        self.assertEqual(percentile(samples, 50), 50)
+        self.assertEqual(percentile(samples, 99), 99)
+        self.assertEqual(percentile([7], 95), 7)
+        self.assertIsNone(percentile([], 50))
+
+    def test_recorder_summary_counts_errors(self):
+        """Test that failed statuses and connection errors count as errors"""
+        recorder = Recorder()
+        recorder.add('home', 1.0, 200)
+        recorder.recording = True
+        recorder.add('home', 0.010, 200)
+        recorder.add('home', 0.030, 500)
+        recorder.add('details', 0.020, 'error')
+
+        summary = recorder.summary(elapsed=2)
+        self.assertEqual(summary['total']['requests'], 3)
+        self.assertEqual(summary['total']['errors'], 2)
+        self.assertEqual(summary['endpoints']['home']['p99_ms'], 30.0)
+        self.assertEqual(summary['endpoints']['home']['throughput_rps'], 1.0)
+
+
+class TraceReportCommandTest(TestCase):
+    """Test cases for the trace_report management command"""
+
+    def span(self, trace, span_id, parent, name, duration, **attributes):
+        return {'trace_id': trace, 'span_id': span_id, 'parent_id': parent, 'name': name, 'kind': 'internal',
+                'start_ns': 0, 'end_ns': 0, 'duration_ms': duration, 'attributes': attributes, 'error': None}
+
+    def test_latency_is_attributed_by_self_time(self):
+        """Test that queries run while rendering count as db time, not template time"""
+        spans = [
+            self.span('t1', 'r1', None, 'GET bookingpage', 100, **{'http.route': 'bookingpage'}),
+            self.span('t1', 'p1', 'r1', 'payment.order.create', 30),
+            self.span('t1', 'm1', 'r1', 'template.render', 50),
+            self.span('t1', 'q1', 'm1', 'db.query', 20),
+            self.span('t2', 'r2', None, 'GET home', 10, **{'http.route': 'home'}),
+        ]
+        fd, path = tempfile.mkstemp(suffix='.jsonl')
+        with os.fdopen(fd, 'w') as fh:
+            fh.writelines(json.dumps(span) + '\n' for span in spans)
+        self.addCleanup(os.remove, path)
+
+        out = StringIO()
+        call_command('trace_report', path, '--route', 'bookingpage', stdout=out)
+        output = out.getvalue()
+        self.assertIn('1 traces', output)
+        self.assertIn('t1 GET bookingpage 100.0 ms (app 20.0, db 20.0, payment 30.0, template 30.0)', output)
+        self.assertRegex(output, r'payment\s+30\.0%')
+
+        with self.assertRaises(CommandError):
+            call_command('trace_report', path, '--route', 'profile', stdout=StringIO())
+
+
+class CheckQueryPlansCommandTest(TestCase):
+    """Test cases for the check_query_plans management command"""
+
+    def setUp(self):
+        fd, self.baseline = tempfile.mkstemp(suffix='.json')
+        os.close(fd)
+        os.remove(self.baseline)
+        self.addCleanup(lambda: os.path.exists(self.baseline) and os.remove(self.baseline))
+        user = User.objects.create_user(username='planner')
+        mode = baker.make(TravelModes, travel_mode='Bus')
+        trips = baker.make(TravelOptions, traveltype=mode, price=Decimal('500.00'), _quantity=5)
+        for trip in trips:
+            baker.make(BookingTrip, user=user, trip=trip, seat_numbers=[1], total_price=Decimal('500.00'))
+
+    def run_check(self, *args):
+        out = StringIO()
+        call_command('check_query_plans', '--baseline', self.baseline, *args, stdout=out)
+        return out.getvalue()
+
+    def test_baseline_round_trip(self):
+        """Test that stored plans are compared on the next run"""
+        output = self.run_check('--update-baseline')
+        self.assertIn('Baseline for sqlite written', output)
+        with open(self.baseline) as fh:
+            stored = json.load(fh)['sqlite']
+        self.assertEqual(set(stored), set(query_plans.CRITICAL_QUERIES))
+        self.assertEqual(stored['seat_availability.reserve']['scans'], ['index:travels_traveloptions'])
+
+        self.assertEqual(stored['my_bookings.totals']['scans'], ['index:travels_bookingtrip'])
+        self.assertIn('index:travels_bookingtrip_passengers', stored['my_bookings.passengers']['scans'])
+        self.assertNotIn('seq:travels_traveloptions', stored['api_trips.page']['scans'])
+        self.assertEqual(stored['api_trips.etag']['scans'], ['index:travels_traveloptions'])
+        self.assertIn('index:travels_traveloptions', stored['change_feed.changed']['scans'])
+        self.assertEqual(stored['change_feed.deleted']['scans'], ['index:travels_triptombstone'])
+        self.assertEqual(stored['admin.trip_search']['scans'], ['index:travels_traveloptions'] * 2)
+
+        output = self.run_check()
+        self.assertIn(f"{len(query_plans.CRITICAL_QUERIES)} query plans ok", output)
+        self.assertNotIn('no baseline', output)
+
+    def test_sequential_scan_fails(self):
+        """Test that a critical query reading a whole table fails the check"""
+        unindexed = query_plans.CriticalQuery(lambda p: TravelOptions.objects.filter(number_of_persons=3))
+        with patch.dict(query_plans.CRITICAL_QUERIES, {'unindexed': unindexed}):
+            with self.assertRaisesMessage(CommandError, 'Query plan regression in unindexed'):
+                self.run_check()
+
+    def test_cost_jump_fails(self):
+        """Test that an estimated cost beyond the threshold fails and a changed plan is reported"""
+        query = query_plans.CriticalQuery(lambda p: None)
+        baseline = {'cost': 10.0, 'scans': ['index:travels_traveloptions']}
+        plan = query_plans.Plan(text='', scans=[('index', 'travels_bookingtrip')], cost=16.0)
+        failures, notes = query_plans.compare(query, plan, baseline, 1.5)
+        self.assertEqual(failures, ['estimated cost 16.00 is 1.6x the baseline 10.00'])
+        self.assertEqual(notes, ['plan changed: index:travels_traveloptions -> index:travels_bookingtrip'])
+        self.assertEqual(query_plans.compare(query, plan, baseline, 2)[0], [])
+
+    def test_postgresql_plan_parsing(self):
+        """Test that PostgreSQL JSON plans yield their scans and total cost"""
+        explained = json.dumps([{'Plan': {
+            'Node Type': 'Nested Loop', 'Total Cost': 42.5, 'Plans': [
+                {'Node Type': 'Seq Scan', 'Relation Name': 'travels_bookingtrip', 'Total Cost': 30.0},
+                {'Node Type': 'Index Scan', 'Relation Name': 'travels_traveloptions', 'Total Cost': 8.3},
+            ],
+        }, 'Execution Time': 1.25}])
+        plan = query_plans.parse_postgresql(explained)
+        self.assertEqual(plan.cost, 42.5)
+        self.assertEqual(plan.actual_ms, 1.25)
+        self.assertEqual(plan.seq_scans(), ['travels_bookingtrip'])
+
+    def test_analyze_needs_postgresql(self):
+        """Test that EXPLAIN ANALYZE is refused on SQLite"""
+        with self.assertRaises(CommandError):
+            self.run_check('--analyze')
+
+
+class StartupCommandsTest(TestCase):
+    """Test cases for the wait_for_db and migrate_with_lock management commands"""
+
+    def test_wait_for_db_ready(self):
+        """Test that a reachable database is reported after one attempt"""
+        out = StringIO()
+        call_command('wait_for_db', stdout=out)
+        self.assertIn('Database ready after 1 attempt(s)', out.getvalue())
+
+    def test_wait_for_db_backs_off_then_gives_up(self):
+        """Test that retries back off exponentially and stop at the timeout"""
+        sleeps = []
+        with patch('django.db.backends.base.base.BaseDatabaseWrapper.cursor', side_effect=OperationalError('down')), \
+                patch('travels.health.time.sleep', side_effect=sleeps.append), \
+                patch('travels.health.random.uniform', return_value=1), \
+                patch('travels.health.time.monotonic', side_effect=[0, 0, 0, 0, 0, 100]):
+            with self.assertRaisesMessage(CommandError, 'not reachable after 5 attempts'):
+                call_command('wait_for_db', '--timeout', '10', '--initial-delay', '1', '--max-delay', '4', stdout=StringIO())
+        self.assertEqual(sleeps, [1, 2, 4, 4])
+
+    def test_migrate_with_lock_skips_when_migrated(self):
+        """Test that an up to date database is left alone"""
+        out = StringIO()
+        call_command('migrate_with_lock', stdout=out)
+        self.assertIn('No migrations to apply', out.getvalue())
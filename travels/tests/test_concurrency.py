@@ -0,0 +1,33 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TransactionTestCase
+
+from travels.models import BookingTrip, TravelOptions
+
+
+class StressBookingsTest(TransactionTestCase):
+    """Parallel booking attempts against a single trip must never oversell it"""
+
+    def run_stress(self, *args):
+        out = StringIO()
+        call_command('stress_bookings', '--seats', '12', '--seed', '3', *args, stdout=out)
+        return out.getvalue()
+
+    def test_parallel_threads_do_not_oversell(self):
+        """Test that threaded online and offline confirms keep seat counts consistent"""
+        out = self.run_stress('--attempts', '60', '--threads', '8', '--keep')
+
+        self.assertIn("No oversell", out)
+        self.assertIn("committed_per_s", out)
+        self.assertIn("lock_wait_p95_ms", out)
+
+        trip = TravelOptions.objects.get(source='Stress')
+        self.assertGreaterEqual(trip.available_seats, 0)
+        self.assertTrue(BookingTrip.objects.filter(trip=trip).exists())
+
+    def test_stress_data_is_removed(self):
+        """Test that the stress trip and its bookings are cleaned up by default"""
+        self.run_stress('--attempts', '10', '--threads', '2', '--mode', 'offline')
+        self.assertFalse(TravelOptions.objects.filter(source='Stress').exists())
+        self.assertFalse(BookingTrip.objects.exists())
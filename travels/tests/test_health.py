@@ -0,0 +1,36 @@
+from unittest.mock import patch
+
+from django.db import OperationalError
+from django.test import TestCase
+
+
+class HealthCheckTest(TestCase):
+    """Test cases for the liveness and readiness probes"""
+
+    def test_healthz_skips_the_stack(self):
+        """Test that liveness answers without queries, cookies or tracing headers"""
+        with self.assertNumQueries(0):
+            response = self.client.get('/healthz')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, b'ok')
+        self.assertFalse(response.cookies)
+        self.assertNotIn('X-Trace-Id', response)
+
+    def test_readyz_checks_the_database(self):
+        """Test that readiness needs a reachable, fully migrated database"""
+        response = self.client.get('/readyz')
+        self.assertEqual(response.status_code, 200)
+
+        error = OperationalError('could not connect to server at db.internal:5432')
+        with patch('django.db.backends.base.base.BaseDatabaseWrapper.cursor', side_effect=error), \
+                self.assertLogs('travels.health', level='ERROR') as logs:
+            response = self.client.get('/readyz')
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.content, b'database unavailable')
+        self.assertIn('db.internal', logs.output[0])
+
+    def test_readyz_waits_for_migrations(self):
+        """Test that readiness fails while migrations are pending"""
+        with patch('travels.middleware.pending_migrations', return_value=[('migration', False)]):
+            response = self.client.get('/readyz')
+        self.assertEqual(response.status_code, 503)
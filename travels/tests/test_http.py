@@ -0,0 +1,100 @@
+import gzip
+import zlib
+from datetime import timedelta
+from decimal import Decimal
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from model_bakery import baker
+
+from travels.models import TravelModes, TravelOptions
+from travels.views import reserve_seats
+
+
+class CompressionTest(TestCase):
+    """Test cases for CompressionMiddleware"""
+
+    def setUp(self):
+        mode = baker.make(TravelModes, travel_mode='Flight')
+        baker.make(
+            TravelOptions, _quantity=5, traveltype=mode, price=Decimal('5000.00'), available_seats=20,
+            travel_date=timezone.now() + timedelta(days=10), return_date=timezone.now() + timedelta(days=15),
+        )
+
+    def test_pages_are_gzipped_with_padding(self):
+        """Test that HTML is gzipped and every response is padded differently"""
+        first = self.client.get(reverse('home'), headers={'Accept-Encoding': 'gzip'})
+        second = self.client.get(reverse('home'), headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(first['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', first['Vary'])
+        self.assertIn(b'TravelEase', gzip.decompress(first.content))
+        self.assertNotEqual(first.content, second.content)
+
+    def test_uncompressed_without_accept_encoding(self):
+        """Test that clients not asking for compression get plain HTML"""
+        response = self.client.get(reverse('home'))
+        self.assertNotIn('Content-Encoding', response)
+
+    def test_brotli_skips_csrf_pages(self):
+        """Test that brotli is used unless the page carries a CSRF token"""
+        with patch('travels.middleware.brotli', SimpleNamespace(compress=lambda data, quality: zlib.compress(data))):
+            response = self.client.get(reverse('home'), headers={'Accept-Encoding': 'gzip, br'})
+            self.assertEqual(response['Content-Encoding'], 'br')
+            self.assertIn(b'TravelEase', zlib.decompress(response.content))
+            response = self.client.get(reverse('signin'), headers={'Accept-Encoding': 'gzip, br'})
+            self.assertEqual(response['Content-Encoding'], 'gzip')
+            self.assertIn('csrftoken', response.cookies)
+
+            with override_settings(CSRF_USE_SESSIONS=True):
+                response = self.client.get(reverse('home'), headers={'Accept-Encoding': 'gzip, br'})
+                self.assertEqual(response['Content-Encoding'], 'gzip')
+
+
+class ConditionalGetTest(TestCase):
+    """Test cases for ETag and Last-Modified handling"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='traveller', password='testpassword123')
+        self.client.force_login(self.user)
+        self.trip = baker.make(
+            TravelOptions, price=Decimal('5000.00'), available_seats=20,
+            travel_date=timezone.now() + timedelta(days=10), return_date=timezone.now() + timedelta(days=15),
+        )
+        self.url = reverse('details', args=[self.trip.pk])
+
+    def test_pages_get_content_etags(self):
+        """Test that a page without its own validator answers 304 to its content ETag"""
+        response = self.client.get(reverse('home'))
+        response = self.client.get(reverse('home'), headers={'If-None-Match': response['ETag']})
+        self.assertEqual(response.status_code, 304)
+
+    def test_trip_detail_304_skips_rendering(self):
+        """Test that a matching trip ETag answers 304 without fetching the trip or rendering"""
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Last-Modified'][-3:], 'GMT')
+        # The user and the trip's updated_at, the session comes from the cache
+        with self.assertNumQueries(2), self.assertTemplateNotUsed('details.html'):
+            response = self.client.get(self.url, headers={'If-None-Match': response['ETag']})
+        self.assertEqual(response.status_code, 304)
+
+    def test_trip_detail_etag_follows_updates_and_user(self):
+        """Test that a seat change or another user invalidates the ETag"""
+        etag = self.client.get(self.url)['ETag']
+        reserve_seats(self.trip, 1, ['1'])
+        response = self.client.get(self.url, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+
+        etag = response['ETag']
+        self.client.force_login(User.objects.create_user(username='other', password='testpassword123'))
+        response = self.client.get(self.url, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+
+    def test_missing_trip_has_no_validator(self):
+        """Test that an unknown trip is never answered 304"""
+        response = self.client.get(reverse('details', args=[self.trip.pk + 100]), headers={'If-None-Match': '*'})
+        self.assertNotEqual(response.status_code, 304)
@@ -0,0 +1,104 @@
+import tracemalloc
+
+from django.contrib.auth.models import User
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from travels.memory import CensusLogger, census
+
+
+# Module level so the allocation has a stable line to be attributed to
+leaked = []
+
+
+def leak(size):
+    leaked.append(bytearray(size))
+
+
+class MemoryCensusTest(TestCase):
+    """Test cases for the memory census and the staff diagnostics endpoint"""
+
+    def setUp(self):
+        tracemalloc.start()
+        self.addCleanup(tracemalloc.stop)
+        self.addCleanup(leaked.clear)
+        census.reset()
+        self.staff = User.objects.create_user(username='staff', is_staff=True)
+
+    def test_growth_between_snapshots_is_attributed(self):
+        """Test that memory allocated between two census runs is reported at the allocating line"""
+        census.take(objects=False)
+        leak(2 * 2 ** 20)
+        report = census.take(objects=False)
+        [top] = report['growth_since_previous'][:1]
+        self.assertIn('travels/tests/test_memory.py', top['where'])
+        self.assertGreaterEqual(top['size_diff_kb'], 2048)
+        self.assertEqual(report['growth_since_baseline'][0]['where'], top['where'])
+
+    def test_object_counts_growth(self):
+        """Test that object counts are compared with the previous census"""
+        census.take()
+
+        class Marker:
+            pass
+
+        keep = [Marker() for _ in range(500)]
+        report = census.take()
+        marker = f"{Marker.__module__}.{Marker.__qualname__}"
+        self.assertEqual(report['objects_growth'].get(marker), len(keep))
+
+    def test_request_deltas_by_url_name(self):
+        """Test that each request's traced memory change is recorded under its URL name"""
+        self.client.force_login(self.staff)
+        self.client.get(reverse('profile'))
+        self.client.get(reverse('profile'))
+        report = census.take(objects=False)
+        self.assertEqual(report['requests']['profile']['count'], 2)
+
+    def test_endpoint_is_staff_only(self):
+        """Test that only staff can fetch a census"""
+        user = User.objects.create_user(username='customer')
+        self.client.force_login(user)
+        self.assertEqual(self.client.get(reverse('memory_census')).status_code, 302)
+
+        self.client.force_login(self.staff)
+        response = self.client.get(reverse('memory_census'), {'limit': 5, 'objects': '0'})
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertTrue(data['tracemalloc'])
+        self.assertLessEqual(len(data['top_allocators']), 5)
+        self.assertNotIn('objects', data)
+        for limit in ('x', '0', '-5'):
+            self.assertEqual(self.client.get(reverse('memory_census'), {'limit': limit}).status_code, 400)
+
+    def test_only_a_csrf_protected_post_resets(self):
+        """Test that GET never clears the census and a POST without a CSRF token is refused"""
+        self.client.force_login(self.staff)
+        census.record_request('profile', 1024)
+        self.client.get(reverse('memory_census'), {'reset': '1', 'objects': '0'})
+        self.assertIn('profile', census.take(objects=False)['requests'])
+
+        csrf_client = Client(enforce_csrf_checks=True)
+        csrf_client.force_login(self.staff)
+        self.assertEqual(csrf_client.post(reverse('memory_census')).status_code, 403)
+        self.assertIn('profile', census.take(objects=False)['requests'])
+
+        response = self.client.post(reverse('memory_census') + '?objects=0')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('profile', census.take(objects=False)['requests'])
+
+    def test_census_logger_lines(self):
+        """Test that the periodic logger reports growth lines"""
+        census.take(objects=False)
+        leak(2 ** 20)
+        with self.assertLogs('travels.memory', level='INFO') as logs:
+            CensusLogger().log(census.take(limit=3))
+        self.assertIn('Memory census pid=', logs.output[0])
+        self.assertTrue(any('test_memory.py' in line for line in logs.output[1:]))
+
+    @override_settings(MEMORY_CENSUS_INTERVAL=0)
+    def test_logger_disabled_by_default(self):
+        """Test that no logger thread starts without an interval"""
+        census_logger = CensusLogger()
+        census_logger.ensure_started()
+        self.assertIsNone(census_logger.pid)
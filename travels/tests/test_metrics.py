@@ -0,0 +1,100 @@
+import json
+import os
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from model_bakery import baker
+
+from travels.metrics import Registry, registry
+from travels.models import TravelModes, TravelOptions
+
+
+class RegistryTest(SimpleTestCase):
+    """Test cases for the in-process metrics registry and its text format"""
+
+    def setUp(self):
+        self.registry = Registry()
+
+    def test_counter_rendering(self):
+        """Test that counters are summed per label set and label values are escaped"""
+        self.registry.inc('travelease_http_requests_total', {'view': 'home', 'method': 'GET', 'status': '200'})
+        self.registry.inc('travelease_http_requests_total', {'view': 'home', 'method': 'GET', 'status': '200'})
+        self.registry.inc('travelease_http_requests_total', {'view': 'a"b', 'method': 'GET', 'status': '500'})
+        text = self.registry.render()
+        self.assertIn('# TYPE travelease_http_requests_total counter', text)
+        self.assertIn('travelease_http_requests_total{method="GET",status="200",view="home"} 2', text)
+        self.assertIn('view="a\\"b"', text)
+
+    def test_histogram_buckets_are_cumulative(self):
+        """Test that histogram buckets count every observation at or below their bound"""
+        for seconds in (0.003, 0.02, 0.02, 3):
+            self.registry.observe('travelease_http_request_duration_seconds', {'view': 'home'}, seconds)
+        text = self.registry.render()
+        self.assertIn('travelease_http_request_duration_seconds_bucket{view="home",le="0.005"} 1', text)
+        self.assertIn('travelease_http_request_duration_seconds_bucket{view="home",le="0.025"} 3', text)
+        self.assertIn('travelease_http_request_duration_seconds_bucket{view="home",le="2.5"} 3', text)
+        self.assertIn('travelease_http_request_duration_seconds_bucket{view="home",le="+Inf"} 4', text)
+        self.assertIn('travelease_http_request_duration_seconds_count{view="home"} 4', text)
+        self.assertIn('travelease_http_request_duration_seconds_sum{view="home"} 3.043', text)
+
+    def test_workers_are_aggregated(self):
+        """Test that snapshots flushed by other workers are added to this process' values"""
+        with tempfile.TemporaryDirectory() as directory, override_settings(METRICS_DIR=directory):
+            self.registry.inc('travelease_db_queries_total', {'view': 'home'}, 3)
+            self.registry.flush(force=True)
+            self.assertTrue(os.path.exists(os.path.join(directory, f"metrics_{os.getpid()}.json")))
+
+            other = {
+                'counters': [['travelease_db_queries_total', [['view', 'home']], 4]],
+                'histograms': [['travelease_db_queries_per_request', [['view', 'home']], [0, 0, 1, 0, 0, 0, 0, 0], 4]],
+            }
+            with open(os.path.join(directory, 'metrics_999999.json'), 'w') as fh:
+                json.dump(other, fh)
+
+            text = self.registry.render()
+        self.assertIn('travelease_db_queries_total{view="home"} 7', text)
+        self.assertIn('travelease_db_queries_per_request_bucket{view="home",le="5"} 1', text)
+
+
+class RequestMetricsMiddlewareTest(TestCase):
+    """Test cases for the request metrics middleware and the /metrics endpoint"""
+
+    def setUp(self):
+        registry.reset()
+        mode = baker.make(TravelModes, travel_mode='Bus')
+        start = timezone.now() + timedelta(days=5)
+        baker.make(TravelOptions, traveltype=mode, travel_date=start, return_date=start + timedelta(days=1),
+                   price=Decimal('500.00'), _quantity=3)
+
+    def test_request_is_recorded_by_url_name(self):
+        """Test that latency, status, queries and template time are labelled with the URL name"""
+        self.client.get(reverse('home'))
+        self.client.get('/no-such-page/')
+        counters, histograms = registry.collect()
+
+        self.assertEqual(counters[('travelease_http_requests_total', (('method', 'GET'), ('status', '200'), ('view', 'home')))], 1)
+        self.assertEqual(counters[('travelease_http_requests_total', (('method', 'GET'), ('status', '404'), ('view', 'unmatched')))], 1)
+        self.assertGreater(counters[('travelease_db_queries_total', (('view', 'home'),))], 0)
+        self.assertGreater(counters[('travelease_db_query_duration_seconds_total', (('view', 'home'),))], 0)
+        self.assertGreater(counters[('travelease_template_render_duration_seconds_total', (('view', 'home'),))], 0)
+        counts, total = histograms[('travelease_http_request_duration_seconds', (('view', 'home'),))]
+        self.assertEqual(sum(counts), 1)
+
+    def test_metrics_endpoint(self):
+        """Test that /metrics serves the Prometheus text format"""
+        self.client.get(reverse('home'))
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        self.assertIn('travelease_http_requests_total{method="GET",status="200",view="home"} 1', response.content.decode())
+
+    @override_settings(METRICS_TOKEN='scrape-token')
+    def test_metrics_token(self):
+        """Test that a configured token is required to scrape"""
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 403)
+        response = self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer scrape-token')
+        self.assertEqual(response.status_code, 200)
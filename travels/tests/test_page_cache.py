@@ -0,0 +1,84 @@
+from datetime import timedelta
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import resolve, reverse
+from django.utils import timezone
+from model_bakery import baker
+
+from travels.models import TravelOptions
+from travels.page_cache import page_cache_key
+from travels.views import MAIN_PAGE_PARAMS, main_page_version
+
+
+@override_settings(PAGE_CACHE_TIMEOUT=30, PAGE_CACHE_STALE=300)
+class PageCacheTest(TestCase):
+    """Test cases for the anonymous full-page cache of the home page"""
+
+    def setUp(self):
+        cache.clear()
+        self.trip = baker.make(
+            TravelOptions, source='Mumbai', destination='Goa', price=Decimal('5000.00'), available_seats=20,
+            travel_date=timezone.now() + timedelta(days=10), return_date=timezone.now() + timedelta(days=15),
+        )
+
+    def test_anonymous_hits_skip_the_database(self):
+        """Test that a repeat anonymous visit is served from cache without queries"""
+        response = self.client.get(reverse('home'))
+        self.assertEqual(response['X-Page-Cache'], 'miss')
+        self.assertIn('public', response['Cache-Control'])
+        self.assertIn('stale-while-revalidate=300', response['Cache-Control'])
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('home'))
+        self.assertEqual(response['X-Page-Cache'], 'hit')
+        self.assertContains(response, 'Mumbai → Goa')
+        self.assertIn('Cookie', response['Vary'])
+
+    def test_key_ignores_unknown_and_reordered_params(self):
+        """Test that tracking parameters and parameter order share one entry"""
+        self.client.get(reverse('home') + '?search=goa&min_price=100')
+        response = self.client.get(reverse('home') + '?min_price=100&utm_source=mail&search=goa')
+        self.assertEqual(response['X-Page-Cache'], 'hit')
+        response = self.client.get(reverse('home') + '?search=pune')
+        self.assertEqual(response['X-Page-Cache'], 'miss')
+
+    def test_signed_in_users_bypass_the_cache(self):
+        """Test that signed in users always get a fresh page"""
+        self.client.get(reverse('home'))
+        self.client.force_login(User.objects.create_user(username='traveller', password='testpassword123'))
+        response = self.client.get(reverse('home'))
+        self.assertNotIn('X-Page-Cache', response)
+        self.assertContains(response, 'traveller')
+
+    def test_stale_page_is_refreshed_by_one_request(self):
+        """Test that after the timeout one request re-renders while others get the stale copy"""
+        self.client.get(reverse('home'))
+        TravelOptions.objects.filter(pk=self.trip.pk).update(source='Pune', updated_at=timezone.now())
+
+        later = timezone.now().timestamp() + 60
+        with patch('travels.page_cache.time.time', return_value=later):
+            cache.add(f"{self._key()}:refresh", 1)  # another request is already refreshing
+            response = self.client.get(reverse('home'))
+            self.assertEqual(response['X-Page-Cache'], 'stale')
+            self.assertContains(response, 'Mumbai → Goa')
+
+            cache.delete(f"{self._key()}:refresh")
+            response = self.client.get(reverse('home'))
+            self.assertEqual(response['X-Page-Cache'], 'miss')
+            self.assertContains(response, 'Pune → Goa')
+        self.assertIsNone(cache.get(f"{self._key()}:refresh"))
+
+    def test_errors_are_not_cached(self):
+        """Test that a rejected filter is rendered every time"""
+        self.client.get(reverse('home') + '?start_date=soon')
+        response = self.client.get(reverse('home') + '?start_date=soon')
+        self.assertEqual(response.status_code, 400)
+        self.assertNotIn('X-Page-Cache', response)
+
+    def _key(self):
+        request = RequestFactory().get(reverse('home'))
+        request.resolver_match = resolve(reverse('home'))
+        return page_cache_key(request, MAIN_PAGE_PARAMS, main_page_version())
@@ -0,0 +1,42 @@
+import razorpay
+from django.core.exceptions import ImproperlyConfigured
+from django.test import SimpleTestCase, override_settings
+
+from travels.payments import LocalGateway, get_payment_client, sign_payment
+
+
+class LocalGatewayTest(SimpleTestCase):
+    """Test cases for the offline payment gateway stand-in"""
+
+    def setUp(self):
+        self.gateway = LocalGateway('secret')
+
+    def test_order_create(self):
+        """Test that orders are created locally with the requested amount"""
+        order = self.gateway.order.create({'amount': 50000, 'currency': 'INR', 'payment_capture': 1})
+        self.assertTrue(order['id'].startswith('order_local_'))
+        self.assertEqual(order['amount'], 50000)
+
+    def test_signature_verification(self):
+        """Test that only signatures made with the gateway secret are accepted"""
+        params = {
+            'razorpay_order_id': 'order_1',
+            'razorpay_payment_id': 'pay_1',
+            'razorpay_signature': sign_payment('order_1', 'pay_1', 'secret'),
+        }
+        self.assertTrue(self.gateway.utility.verify_payment_signature(params))
+
+        params['razorpay_signature'] = sign_payment('order_1', 'pay_1', 'other')
+        with self.assertRaises(razorpay.errors.SignatureVerificationError):
+            self.gateway.utility.verify_payment_signature(params)
+
+    @override_settings(PAYMENT_GATEWAY='local')
+    def test_client_selected_by_setting(self):
+        """Test that PAYMENT_GATEWAY='local' selects the stand-in"""
+        self.assertIsInstance(get_payment_client(), LocalGateway)
+
+    @override_settings(PAYMENT_GATEWAY='local', PAYMENT_LOCAL_SECRET='')
+    def test_local_gateway_needs_its_own_secret(self):
+        """Test that the local gateway refuses to start without PAYMENT_LOCAL_SECRET"""
+        with self.assertRaises(ImproperlyConfigured):
+            get_payment_client()
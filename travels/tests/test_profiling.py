@@ -0,0 +1,105 @@
+import json
+import shutil
+import tempfile
+import time
+
+from django.contrib.auth.models import User
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from travels.middleware import ProfilingMiddleware
+from travels.profiling import PROFILE_HEADER, list_profiles, make_profile_token, valid_profile_token
+
+
+def slow_view(request):
+    time.sleep(0.05)
+    return HttpResponse('ok')
+
+
+class ProfilingTest(TestCase):
+    """Test cases for on-demand and sampled request profiling"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        settings_override = override_settings(PROFILING_DIR=self.directory, PROFILING_SAMPLE_RATE=0, PROFILING_MIN_MS=20)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def profile(self, **headers):
+        request = RequestFactory().get('/slow/', headers=headers)
+        request.resolver_match = None
+        return ProfilingMiddleware(slow_view)(request)
+
+    def test_profile_token(self):
+        """Test that only unexpired tokens signed with this project's key are accepted"""
+        token = make_profile_token()
+        self.assertTrue(valid_profile_token(token))
+        self.assertFalse(valid_profile_token(token + 'x'))
+        with override_settings(PROFILING_TOKEN_MAX_AGE=-1):
+            self.assertFalse(valid_profile_token(token))
+
+    def test_header_profiles_request_as_collapsed_stacks(self):
+        """Test that a signed header stores collapsed stacks that include the view"""
+        response = self.profile(**{PROFILE_HEADER: make_profile_token()})
+        [meta] = list_profiles()
+        self.assertEqual(response['X-Profile'], meta['file'])
+        self.assertEqual((meta['view'], meta['trigger'], meta['status']), ('unmatched', 'header', 200))
+        with open(f"{self.directory}/{meta['file']}") as fh:
+            stacks = fh.read()
+        self.assertIn('travels/tests/test_profiling.py:slow_view', stacks)
+        self.assertRegex(stacks.splitlines()[0], r'^\S+ \d+$')
+
+    @override_settings(PROFILER='cprofile')
+    def test_cprofile_writes_pstats(self):
+        """Test that the cprofile profiler writes a pstats file"""
+        import pstats
+        self.profile(**{PROFILE_HEADER: make_profile_token()})
+        [meta] = list_profiles()
+        self.assertTrue(meta['file'].endswith('.prof'))
+        stats = pstats.Stats(f"{self.directory}/{meta['file']}")
+        self.assertTrue(any(func[2] == 'slow_view' for func in stats.stats))
+
+    def test_invalid_token_and_no_sampling_skip_profiling(self):
+        """Test that requests without a valid token are not profiled when sampling is off"""
+        response = self.profile(**{PROFILE_HEADER: 'forged'})
+        self.assertNotIn('X-Profile', response)
+        self.assertEqual(list_profiles(), [])
+
+    @override_settings(PROFILING_SAMPLE_RATE=1)
+    def test_sampled_requests_kept_only_when_slow(self):
+        """Test that sampled profiles are only kept for requests over PROFILING_MIN_MS"""
+        self.profile()
+        with override_settings(PROFILING_MIN_MS=10 ** 6):
+            self.profile()
+        [meta] = list_profiles()
+        self.assertEqual(meta['trigger'], 'sample')
+
+    @override_settings(PROFILING_KEEP=2)
+    def test_old_profiles_are_pruned(self):
+        """Test that only the newest PROFILING_KEEP profiles are kept"""
+        for _ in range(3):
+            self.profile(**{PROFILE_HEADER: make_profile_token()})
+            time.sleep(0.002)
+        self.assertEqual(len(list_profiles()), 2)
+
+    def test_staff_page_lists_slowest_first(self):
+        """Test that the staff page lists profiles by duration and serves them"""
+        for duration, view in ((120.0, 'home'), (900.0, 'mybookings')):
+            with open(f"{self.directory}/{view}.json", 'w') as fh:
+                json.dump({'view': view, 'method': 'GET', 'path': '/', 'status': 200, 'duration_ms': duration,
+                           'profiled_at': '', 'trigger': 'sample', 'file': f"{view}.collapsed"}, fh)
+            with open(f"{self.directory}/{view}.collapsed", 'w') as fh:
+                fh.write('a;b 1\n')
+
+        self.assertEqual(self.client.get(reverse('profiles')).status_code, 302)
+        staff = User.objects.create_user(username='staff', is_staff=True)
+        self.client.force_login(staff)
+        response = self.client.get(reverse('profiles'))
+        self.assertEqual([p['view'] for p in response.context['profiles']], ['mybookings', 'home'])
+        self.assertContains(response, PROFILE_HEADER)
+
+        download = self.client.get(reverse('profile_download', args=['home.collapsed']))
+        self.assertEqual(b''.join(download.streaming_content), b'a;b 1\n')
+        self.assertEqual(self.client.get(reverse('profile_download', args=['home.json'])).status_code, 404)
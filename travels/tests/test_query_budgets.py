@@ -0,0 +1,165 @@
+import itertools
+import json
+import shutil
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from pathlib import Path
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import get_resolver, reverse
+from django.utils import timezone
+from model_bakery import baker
+
+from travels.models import BookingTrip, PassengerDetails, TravelModes, TravelOptions
+from travels.payments import LocalGateway, sign_payment
+from travels.tests.query_budgets import QUERY_BUDGETS, QueryBudgetMixin
+
+
+class QueryBudgetTest(QueryBudgetMixin, TestCase):
+    """Every view must stay within its query budget however much data there is"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='budget', is_superuser=True, is_staff=True)
+        self.client.force_login(self.user)
+        self.other = User.objects.create_user(username='other')
+        self.mode = baker.make(TravelModes, travel_mode='Bus')
+        self.adhar_numbers = itertools.count(100000000000)
+        self.trips = []
+        self.gateway = LocalGateway('budget-secret')
+        patcher = patch('travels.views.razorpay_client', self.gateway)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.profiles_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.profiles_dir)
+
+    def make_trip(self):
+        start = timezone.now() + timedelta(days=10 + len(self.trips))
+        return baker.make(
+            TravelOptions, traveltype=self.mode, source='Pune', destination=f"City {len(self.trips)}",
+            travel_date=start, return_date=start + timedelta(days=3), price=Decimal('500.00'), available_seats=40,
+        )
+
+    def make_booking(self, user, trip, status='Confirmed', payment='success'):
+        booking = baker.make(
+            BookingTrip, user=user, trip=trip, booking_status=status, payment_status=payment,
+            number_of_seats=2, seat_numbers=[], total_price=Decimal('1000.00'),
+        )
+        booking.passengers.add(*baker.make(PassengerDetails, _quantity=2))
+        return booking
+
+    # Grow trips and bookings (with passengers) for both users up to `size` each
+    def seed_dataset(self, size):
+        while len(self.trips) < size:
+            trip = self.make_trip()
+            self.trips.append(trip)
+            self.make_booking(self.user, trip)
+            self.make_booking(self.user, trip, status='Cancelled', payment='pending')
+            self.make_booking(self.other, trip)
+
+    def passengers(self, size):
+        return [
+            {'name': f"P{n}", 'age': 30, 'adhar_number': str(next(self.adhar_numbers)), 'email': 'p@example.com'}
+            for n in range(min(size, 4))
+        ]
+
+    def test_every_url_has_a_budget(self):
+        """Test that a new URL name cannot be added without declaring its budget"""
+        names = {pattern.name for pattern in get_resolver('travels.urls').url_patterns}
+        self.assertEqual(names - set(QUERY_BUDGETS), set())
+
+    def test_home(self):
+        self.client.logout()
+        self.assertQueryBudget('home', lambda size: self.client.get(reverse('home')))
+
+    def test_details(self):
+        self.assertQueryBudget('details', lambda size: self.client.get(reverse('details', args=[self.trips[0].pk])))
+
+    def test_bookingpage(self):
+        def request(trip):
+            return self.client.get(reverse('bookingpage', args=[trip.pk]), {'travelers': 2})
+        self.assertQueryBudget('bookingpage', request, prepare=lambda size: self.make_trip())
+
+    def test_create_booking(self):
+        def request(size):
+            payload = {'trip_id': self.trips[0].pk, 'travelers': size}
+            return self.client.post(reverse('create_booking'), json.dumps(payload), content_type='application/json')
+        self.assertQueryBudget('create_booking', request)
+
+    # A fresh trip and a party that grows with the dataset, up to four passengers
+    def booking_payload(self, size):
+        trip = self.make_trip()
+        return trip, {'passengers': self.passengers(size), 'selected_seats': list(range(1, min(size, 4) + 1))}
+
+    def test_confirm_booking(self):
+        def request(prepared):
+            trip, payload = prepared
+            order_id, payment_id = f"order_{trip.pk}", f"pay_{trip.pk}"
+            payload.update(order_id=order_id, payment_id=payment_id, signature=sign_payment(order_id, payment_id, 'budget-secret'))
+            return self.client.post(reverse('confirm_booking', args=[trip.pk]), json.dumps(payload), content_type='application/json')
+        self.assertQueryBudget('confirm_booking', request, prepare=self.booking_payload)
+
+    def test_confirm_offline_booking(self):
+        def request(prepared):
+            trip, payload = prepared
+            return self.client.post(reverse('confirm_offline_booking', args=[trip.pk]), json.dumps(payload), content_type='application/json')
+        self.assertQueryBudget('confirm_offline_booking', request, prepare=self.booking_payload)
+
+    def test_cancel_offline_booking(self):
+        def request(booking):
+            return self.client.post(reverse('cancel_offline_booking', args=[booking.pk]))
+        self.assertQueryBudget(
+            'cancel_offline_booking', request,
+            prepare=lambda size: self.make_booking(self.user, self.trips[0], status='Pending', payment='pending'),
+        )
+
+    def test_anonymous_pages(self):
+        self.client.logout()
+        for name in ('signup', 'signin', 'errorpage', 'metrics'):
+            with self.subTest(name=name):
+                self.assertQueryBudget(name, lambda size: self.client.get(reverse(name)))
+
+    def test_logout(self):
+        self.assertQueryBudget(
+            'logout', lambda size: self.client.get(reverse('logout')),
+            prepare=lambda size: self.client.force_login(self.user),
+        )
+
+    def test_mybookings(self):
+        self.assertQueryBudget('mybookings', lambda size: self.client.get(reverse('mybookings')))
+
+    def test_profile(self):
+        self.assertQueryBudget('profile', lambda size: self.client.get(reverse('profile')))
+
+    def test_update_profile(self):
+        def request(size):
+            return self.client.post(reverse('update_profile'), {'update_info': '1', 'email': f"budget{size}@example.com"})
+        self.assertQueryBudget('update_profile', request)
+
+    def test_profiles(self):
+        with self.settings(PROFILING_DIR=self.profiles_dir):
+            self.assertQueryBudget('profiles', lambda size: self.client.get(reverse('profiles')))
+
+    def test_profile_download(self):
+        (Path(self.profiles_dir) / 'budget.collapsed').write_text('a;b 1\n')
+        with self.settings(PROFILING_DIR=self.profiles_dir):
+            self.assertQueryBudget('profile_download', lambda size: self.client.get(reverse('profile_download', args=['budget.collapsed'])))
+
+    def test_memory_census(self):
+        self.assertQueryBudget('memory_census', lambda size: self.client.get(reverse('memory_census'), {'objects': '0'}))
+
+    def test_export_bookings(self):
+        self.assertQueryBudget('export_bookings', lambda size: self.client.get(reverse('export_bookings')))
+
+    def test_api_trips(self):
+        self.client.logout()
+        self.assertQueryBudget('api_trips', lambda size: self.client.get(reverse('api_trips'), {'limit': '5'}))
+
+    def test_api_trip_changes(self):
+        self.client.logout()
+        self.assertQueryBudget('api_trip_changes', lambda size: self.client.get(reverse('api_trip_changes'), {'limit': '5'}))
+
+    def test_seat_events(self):
+        self.assertQueryBudget('seat_events', lambda size: self.client.get(reverse('seat_events', args=[self.trips[-1].id])))
@@ -0,0 +1,72 @@
+from django.contrib.auth.models import User
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+
+from travels.middleware import QueryInspectionMiddleware
+from travels.querylog import fingerprint
+
+
+class FingerprintTest(SimpleTestCase):
+    """Test cases for query fingerprints"""
+
+    def test_literals_and_lists_are_collapsed(self):
+        """Test that queries differing only in literals, IN lists or VALUES rows share a fingerprint"""
+        self.assertEqual(
+            fingerprint("SELECT * FROM t WHERE id = 1 AND name = 'a''b'"),
+            fingerprint("SELECT  *  FROM t WHERE id = 22 AND name = 'c'"),
+        )
+        self.assertEqual(
+            fingerprint('SELECT * FROM t WHERE id IN (%s, %s, %s)'),
+            'SELECT * FROM t WHERE id IN (...)',
+        )
+        self.assertEqual(
+            fingerprint('INSERT INTO t (a, b) VALUES (%s, %s), (%s, %s)'),
+            fingerprint('INSERT INTO t (a, b) VALUES (%s, %s)'),
+        )
+
+
+def n_plus_one_view(request):
+    for user in User.objects.order_by('pk'):
+        User.objects.filter(pk=user.pk).exists()
+    return HttpResponse('ok')
+
+
+@override_settings(QUERY_INSPECTION_SAMPLE_RATE=1, SLOW_QUERY_MS=10 ** 6, N_PLUS_ONE_THRESHOLD=3)
+class QueryInspectionMiddlewareTest(TestCase):
+    """Test cases for the sampled slow query and N+1 detector"""
+
+    def setUp(self):
+        for n in range(4):
+            User.objects.create(username=f"user{n}")
+        self.request = RequestFactory().get('/')
+        self.request.resolver_match = None
+
+    def test_repeated_fingerprint_is_flagged(self):
+        """Test that a query repeated per row is logged as an N+1 with the line that ran it"""
+        with self.assertLogs('travels.queries', level='WARNING') as logs:
+            QueryInspectionMiddleware(n_plus_one_view)(self.request)
+        self.assertEqual(len(logs.output), 1)
+        self.assertIn('Possible N+1 in unmatched: 4 x', logs.output[0])
+        self.assertIn('travels/tests/test_querylog.py', logs.output[0])
+        self.assertIn('in n_plus_one_view', logs.output[0])
+
+    @override_settings(SLOW_QUERY_MS=0)
+    def test_slow_query_is_explained(self):
+        """Test that a query over the threshold is logged with its EXPLAIN plan"""
+        def view(request):
+            list(User.objects.filter(username='user1'))
+            return HttpResponse('ok')
+
+        with self.assertLogs('travels.queries', level='WARNING') as logs:
+            QueryInspectionMiddleware(view)(self.request)
+        self.assertEqual(len(logs.output), 1)
+        self.assertIn('Slow query in unmatched', logs.output[0])
+        self.assertIn('auth_user', logs.output[0])
+        self.assertIn('SEARCH auth_user USING INDEX', logs.output[0])
+
+    @override_settings(QUERY_INSPECTION_SAMPLE_RATE=0)
+    def test_unsampled_requests_are_not_inspected(self):
+        """Test that requests outside the sample run without instrumentation"""
+        with self.assertNoLogs('travels.queries', level='WARNING'):
+            response = QueryInspectionMiddleware(n_plus_one_view)(self.request)
+        self.assertEqual(response.status_code, 200)
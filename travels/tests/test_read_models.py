@@ -0,0 +1,61 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from model_bakery import baker
+
+from travels.models import BookingTrip, PassengerDetails, TravelModes, TravelOptions
+from travels.read_models import BookingRow, TripCard, booking_rows, trip_cards
+
+
+class ReadModelTest(TestCase):
+    """Test cases for the slotted rows behind the list pages"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='traveller', password='testpassword123')
+        self.trip = baker.make(
+            TravelOptions, traveltype=baker.make(TravelModes, travel_mode='Train'), source='Pune',
+            destination='Goa', price=Decimal('1500.00'), available_seats=10,
+            travel_date=timezone.now() + timedelta(days=5), return_date=timezone.now() + timedelta(days=8),
+        )
+
+    def test_trip_cards_carry_only_rendered_columns(self):
+        """Test that trip cards are slotted rows with the model's derived values"""
+        with self.assertNumQueries(1):
+            card, = trip_cards()
+        self.assertIsInstance(card, TripCard)
+        self.assertFalse(hasattr(card, '__dict__'))
+        self.assertEqual((card.source, card.travel_mode, card.price), ('Pune', 'Train', Decimal('1500.00')))
+        self.assertEqual((card.days, card.nights), (self.trip.days, self.trip.nights))
+
+    def test_booking_rows_read_passengers_once(self):
+        """Test that passenger names for every list come from a single query"""
+        bookings = [baker.make(BookingTrip, user=self.user, trip=self.trip, booking_status=status)
+                    for status in ('Confirmed', 'Cancelled')]
+        for booking, names in zip(bookings, (['Asha', 'Ravi'], ['Meera'])):
+            booking.passengers.set([baker.make(PassengerDetails, name=name) for name in names])
+
+        queryset = BookingTrip.objects.filter(user=self.user)
+        with self.assertNumQueries(3):
+            confirmed, cancelled = booking_rows(queryset.filter(booking_status='Confirmed'),
+                                                queryset.filter(booking_status='Cancelled'))
+        self.assertIsInstance(confirmed[0], BookingRow)
+        self.assertEqual(confirmed[0].passenger_names, ('Asha', 'Ravi'))
+        self.assertEqual(cancelled[0].passenger_names, ('Meera',))
+        self.assertEqual(confirmed[0].trip_destination, 'Goa')
+
+    def test_my_bookings_renders_rows_and_stats(self):
+        """Test that the bookings page shows passengers and the one-query stats"""
+        booking = baker.make(BookingTrip, user=self.user, trip=self.trip, booking_status='Confirmed',
+                             payment_status='success', total_price=Decimal('3000.00'))
+        booking.passengers.set([baker.make(PassengerDetails, name=name) for name in ('Asha', 'Ravi', 'Kiran', 'Dev')])
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('mybookings'))
+        self.assertContains(response, 'Passengers (4)')
+        self.assertContains(response, 'title="Kiran"')
+        self.assertContains(response, '+1')
+        self.assertEqual(response.context['total_bookings'], 1)
+        self.assertEqual(response.context['total_spent'], Decimal('3000.00'))
@@ -0,0 +1,123 @@
+import asyncio
+import json
+from datetime import timedelta
+from decimal import Decimal
+from unittest.mock import patch
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.db import OperationalError
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from model_bakery import baker
+
+from travels.models import BookingTrip, TravelOptions
+from travels.seat_events import booked_seats, fanout, seat_state
+
+
+def parse_event(chunk):
+    fields = dict(line.split(': ', 1) for line in chunk.decode().strip().splitlines())
+    return fields.get('event'), json.loads(fields['data'])
+
+
+@override_settings(SEAT_EVENTS_POLL_INTERVAL=30)
+class SeatEventsTest(TestCase):
+    """Test cases for live seat availability on the booking page"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='traveller', password='testpassword123')
+        self.trip = baker.make(
+            TravelOptions, price=Decimal('1000.00'), available_seats=38,
+            travel_date=timezone.now() + timedelta(days=5), return_date=timezone.now() + timedelta(days=7),
+        )
+        other = User.objects.create_user(username='other')
+        baker.make(BookingTrip, trip=self.trip, user=other, seat_numbers=[12, 5], booking_status='Confirmed')
+        baker.make(BookingTrip, trip=self.trip, user=other, seat_numbers=[7], booking_status='Cancelled')
+
+    def url(self):
+        return reverse('seat_events', args=[self.trip.id])
+
+    def test_booking_page_shows_booked_seats(self):
+        """Test that the seat map starts from the real bookings, not a fixed demo list"""
+        self.assertEqual(booked_seats(self.trip.id), [5, 12])
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('bookingpage', args=[self.trip.id]), {'travelers': 1})
+        self.assertEqual(response.context['booked_seats'], '[5, 12]')
+        self.assertContains(response, self.url())
+
+    def test_wsgi_gets_a_single_snapshot(self):
+        """Test that without ASGI one event is sent and the browser is told to reconnect"""
+        self.client.force_login(self.user)
+        response = self.client.get(self.url(), HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertNotIn('Content-Encoding', response)
+        self.assertIn(b'retry: 3000', response.content)
+        self.assertEqual(parse_event(response.content.split(b'\n', 1)[1])[1]['booked_seats'], [5, 12])
+
+    def test_requires_login_and_a_trip(self):
+        """Test that anonymous visitors are redirected and unknown trips are 404"""
+        self.assertEqual(self.client.get(self.url()).status_code, 302)
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(reverse('seat_events', args=[self.trip.id + 100])).status_code, 404)
+
+    def test_cancellation_wakes_the_trip_channel(self):
+        """Test that a committed cancellation pushes the freed seats at once"""
+        booking = baker.make(BookingTrip, trip=self.trip, user=self.user, seat_numbers=[3], number_of_seats=1,
+                             booking_status='Confirmed', payment_status='pending')
+        self.client.force_login(self.user)
+        with patch.object(fanout, 'notify') as notify, self.captureOnCommitCallbacks(execute=True):
+            self.client.get(reverse('cancel_offline_booking', args=[booking.id]))
+        notify.assert_called_once_with(self.trip.id)
+
+    async def test_streams_share_one_poller_and_push_changes(self):
+        """Test that listeners of a trip share a channel and get a snapshot on every change"""
+        await sync_to_async(self.async_client.force_login)(self.user)
+        first = await self.async_client.get(self.url())
+        second = await self.async_client.get(self.url())
+        self.assertEqual(first['Content-Type'], 'text/event-stream')
+        streams = [first.streaming_content, second.streaming_content]
+        try:
+            for stream in streams:
+                event, data = parse_event(await asyncio.wait_for(anext(stream), 5))
+                self.assertEqual((event, data['booked_seats']), ('seats', [5, 12]))
+            self.assertEqual(len(fanout.channels[self.trip.id].subscribers), 2)
+
+            await TravelOptions.objects.filter(pk=self.trip.pk).aupdate(available_seats=37, updated_at=timezone.now())
+            await BookingTrip.objects.acreate(trip=self.trip, user=self.user, seat_numbers=[20], number_of_seats=1,
+                                              total_price=Decimal('1000.00'))
+            fanout.notify(self.trip.id)
+            for stream in streams:
+                event, data = parse_event(await asyncio.wait_for(anext(stream), 5))
+                self.assertEqual((data['available_seats'], data['booked_seats']), (37, [5, 12, 20]))
+
+            await TravelOptions.objects.filter(pk=self.trip.pk).adelete()
+            fanout.notify(self.trip.id)
+            for stream in streams:
+                event, _ = parse_event(await asyncio.wait_for(anext(stream), 5))
+                self.assertEqual(event, 'closed')
+        finally:
+            for stream in streams:
+                await stream.aclose()
+        self.assertNotIn(self.trip.id, fanout.channels)
+
+    def test_database_errors_drop_the_connection(self):
+        """Test that a failed snapshot query closes the connection so the next poll reconnects"""
+        with patch('travels.seat_events.booked_seats', side_effect=OperationalError('gone')), \
+                patch('travels.seat_events.connection.close') as close, self.assertRaises(OperationalError):
+            seat_state(self.trip.id)
+        close.assert_called_once_with()
+
+    async def test_crashed_poller_ends_streams_for_a_reconnect(self):
+        """Test that an unexpected poll error is logged and ends the streams without a closed event"""
+        await sync_to_async(self.async_client.force_login)(self.user)
+        with patch('travels.seat_events.seat_state', side_effect=RuntimeError('bug')), \
+                self.assertLogs('travels.seat_events', level='ERROR') as logs:
+            stream = (await self.async_client.get(self.url())).streaming_content
+            try:
+                with self.assertRaises(StopAsyncIteration):
+                    await asyncio.wait_for(anext(stream), 5)
+            finally:
+                await stream.aclose()
+        self.assertIn('crashed', logs.output[0])
+        self.assertNotIn(self.trip.id, fanout.channels)
@@ -0,0 +1,64 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+
+class CachedSessionTest(TestCase):
+    """Test cases for the cache-backed session engine"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='traveller', password='testpassword123')
+        self.client.login(username='traveller', password='testpassword123')
+
+    def test_requests_read_the_session_from_cache(self):
+        """Test that signed in requests no longer query the session table"""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('profile'))
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse([q['sql'] for q in queries if 'django_session' in q['sql']])
+
+    def test_cache_miss_falls_back_to_the_database(self):
+        """Test that a session evicted from the cache is still valid"""
+        cache.clear()
+        self.assertEqual(self.client.get(reverse('profile')).status_code, 200)
+
+    def test_logout_drops_the_cached_session(self):
+        """Test that a logged out session can't be reused from the cache"""
+        session_key = self.client.cookies['sessionid'].value
+        self.client.get(reverse('logout'))
+        self.client.cookies['sessionid'] = session_key
+        response = self.client.get(reverse('profile'))
+        self.assertEqual(response.status_code, 302)
+
+
+class PurgeSessionsCommandTest(TestCase):
+    """Test cases for the purge_sessions management command"""
+
+    def test_deletes_only_expired_sessions_in_batches(self):
+        """Test that expired rows go, batch by batch, and live ones stay"""
+        past, future = timezone.now() - timedelta(days=1), timezone.now() + timedelta(days=1)
+        Session.objects.bulk_create(
+            [Session(session_key=f"expired{i:02d}", session_data='', expire_date=past) for i in range(5)]
+            + [Session(session_key='live', session_data='', expire_date=future)]
+        )
+        out = StringIO()
+        with self.assertNumQueries(6):  # three batches, each a select and a delete
+            call_command('purge_sessions', '--batch-size', '2', stdout=out)
+        self.assertIn('Deleted 5 expired session(s)', out.getvalue())
+        self.assertEqual(list(Session.objects.values_list('session_key', flat=True)), ['live'])
+
+    @override_settings(SESSION_ENGINE='django.contrib.sessions.backends.signed_cookies')
+    def test_needs_a_database_backed_engine(self):
+        """Test that engines without a session table are refused"""
+        with self.assertRaisesMessage(CommandError, 'does not keep sessions in the database'):
+            call_command('purge_sessions', stdout=StringIO())
@@ -0,0 +1,174 @@
+import glob
+import gzip
+import json
+import re
+import tempfile
+import unittest
+from io import StringIO
+from pathlib import Path
+from unittest.mock import patch
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
+
+from travels.assets import ASSETS_DIR, OUTPUT_DIR, icon_css, icon_index, resolve_icons, used_icon_classes
+from travels.static_files import accepted_encodings
+
+
+FONT_AWESOME_METADATA = {
+    'plane': {'unicode': 'f072', 'free': ['solid'], 'aliases': {'names': []}},
+    'location-dot': {'unicode': 'f3c5', 'free': ['solid'], 'aliases': {'names': ['map-marker-alt']}},
+    'google': {'unicode': 'f1a0', 'free': ['brands']},
+    'steering-wheel': {'unicode': 'f622', 'free': []},
+}
+
+
+class IconSubsetTest(TestCase):
+    """Test cases for picking the Font Awesome icons the templates use"""
+
+    def test_templates_are_scanned(self):
+        """Test that icon classes written in markup and in scripts are found"""
+        classes = used_icon_classes()
+        self.assertIn('plane', classes)
+        self.assertIn('eye-slash', classes)  # only set from JavaScript
+        self.assertIn('spin', classes)
+
+    def test_icons_resolve_through_aliases(self):
+        """Test that old names resolve, modifiers are kept and pro-only icons are reported"""
+        index = icon_index(FONT_AWESOME_METADATA)
+        icons, modifiers, unknown = resolve_icons({'plane', 'map-marker-alt', 'google', 'spin', 'steering-wheel'}, index)
+        self.assertEqual(icons, {'google': ('brands', 0xf1a0), 'map-marker-alt': ('solid', 0xf3c5), 'plane': ('solid', 0xf072)})
+        self.assertEqual(modifiers, ['spin'])
+        self.assertEqual(unknown, ['steering-wheel'])
+
+    def test_icon_css(self):
+        """Test that only the used fonts and glyphs end up in the stylesheet"""
+        css = icon_css({'plane': ('solid', 0xf072)}, ['spin'])
+        self.assertIn('.fa-plane:before{content:"\\f072"}', css)
+        self.assertIn('url(webfonts/fa-solid-900.woff2)', css)
+        self.assertNotIn('fa-brands-400', css)
+        self.assertIn('@keyframes fa-spin', css)
+
+    def test_build_needs_the_npm_packages(self):
+        """Test that a missing npm install is reported"""
+        with patch('travels.assets.FONT_AWESOME_DIR', Path(tempfile.gettempdir()) / 'missing'):
+            with self.assertRaisesMessage(CommandError, 'npm install'):
+                call_command('build_assets', '--skip-css', stdout=StringIO())
+
+
+# Tailwind utilities the built CSS must define, by prefix, for the template classes check
+TAILWIND_UTILITY = re.compile(
+    r"^(?:[a-z]+:)*-?(?:bg|text|font|p[xytrbl]?|m[xytrbl]?|w|h|max-w|min-h|flex|grid|gap|space-[xy]|items|justify"
+    r"|rounded|shadow|border|from|via|to|top|z|transition|duration)(?:-|$)"
+)
+
+
+def template_classes():
+    classes = set()
+    for path in Path(settings.BASE_DIR, 'templates').glob('**/*.html'):
+        for value in re.findall(r'class="([^"{}]*)"', path.read_text(encoding='utf-8')):
+            classes.update(value.split())
+    return classes
+
+
+class TailwindBuildTest(TestCase):
+    """Test cases for the Tailwind build picking up the classes the templates use"""
+
+    def test_content_globs_cover_every_template(self):
+        """Test that tailwind.config.js scans every template, classes outside it are purged"""
+        config = (ASSETS_DIR / 'tailwind.config.js').read_text()
+        patterns = re.findall(r"'([^']+)'", re.search(r"content:\s*\[([^\]]*)\]", config).group(1))
+        scanned = {Path(path).resolve() for pattern in patterns
+                   for path in glob.glob(str(ASSETS_DIR / pattern), recursive=True)}
+        templates = {path.resolve() for path in Path(settings.BASE_DIR, 'templates').glob('**/*.html')}
+        self.assertTrue(templates)
+        self.assertEqual(templates - scanned, set())
+
+    @unittest.skipUnless((OUTPUT_DIR / 'app.css').exists(), "run manage.py build_assets first")
+    def test_built_css_has_the_template_classes(self):
+        """Test that the built stylesheet defines the Tailwind utilities written in the templates"""
+        css = (OUTPUT_DIR / 'app.css').read_text()
+        utilities = {name for name in template_classes() if TAILWIND_UTILITY.match(name)}
+        self.assertIn('bg-gradient-to-r', utilities)
+        missing = sorted(name for name in utilities if '.' + re.sub(r'([:/.\[\]#%])', r'\\\1', name) not in css)
+        self.assertEqual(missing, [])
+
+
+class StaticFilesTest(TestCase):
+    """Test cases for the collectstatic output and StaticFilesMiddleware"""
+
+    def setUp(self):
+        source = tempfile.TemporaryDirectory()
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(source.cleanup)
+        self.addCleanup(root.cleanup)
+        Path(source.name, 'travels').mkdir()
+        Path(source.name, 'travels', 'app.css').write_text('.card{color:red}\n' * 100)
+        settings = override_settings(STATIC_ROOT=root.name, STATICFILES_DIRS=[source.name])
+        settings.enable()
+        self.addCleanup(settings.disable)
+        call_command('collectstatic', interactive=False, verbosity=0)
+        self.root = Path(root.name)
+        manifest = json.loads((self.root / 'staticfiles.json').read_text())
+        self.url = '/static/' + manifest['paths']['travels/app.css']
+
+    def test_collectstatic_precompresses(self):
+        """Test that hashed text files get a gzip variant next to them"""
+        hashed = self.root / self.url.removeprefix('/static/')
+        self.assertEqual(gzip.decompress((hashed.parent / (hashed.name + '.gz')).read_bytes()), hashed.read_bytes())
+
+    def test_hashed_files_are_cached_forever(self):
+        """Test that hashed names are served immutable, in the encoding the client accepts"""
+        response = self.client.get(self.url, headers={'Accept-Encoding': 'gzip, deflate'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Cache-Control'], 'public, max-age=31536000, immutable')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertTrue(response['Content-Type'].startswith('text/css'))
+        self.assertEqual(gzip.decompress(b''.join(response.streaming_content)), ('.card{color:red}\n' * 100).encode())
+
+        response = self.client.get(self.url, headers={'Accept-Encoding': 'gzip;q=0'})
+        self.assertNotIn('Content-Encoding', response)
+        self.assertNotIn('Set-Cookie', response)
+
+    def test_unhashed_names_and_revalidation(self):
+        """Test that unhashed names get a short max-age and validators answer 304"""
+        response = self.client.get('/static/travels/app.css')
+        self.assertEqual(response['Cache-Control'], 'public, max-age=300')
+        response = self.client.get('/static/travels/app.css', headers={'If-None-Match': response['ETag']})
+        self.assertEqual(response.status_code, 304)
+        response = self.client.head(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Length'], '1700')
+
+    def test_unknown_files_fall_through(self):
+        """Test that paths outside the collected files reach the 404 page"""
+        self.assertEqual(self.client.get('/static/travels/missing.css').status_code, 404)
+
+    def test_accept_encoding_parsing(self):
+        """Test that zero quality encodings are refused"""
+        self.assertEqual(accepted_encodings('br;q=0, gzip;q=0.8, identity'), {'gzip', 'identity'})
+
+
+class TemplateAssetsTest(TestCase):
+    """Test cases for the asset links in the pages"""
+
+    def test_pages_link_self_hosted_assets(self):
+        """Test that pages no longer pull Tailwind or Font Awesome from a CDN"""
+        response = self.client.get('/signin/')
+        self.assertContains(response, '/static/travels/app.css')
+        self.assertContains(response, '/static/travels/icons.css')
+        self.assertNotContains(response, 'cdn.tailwindcss.com')
+        self.assertNotContains(response, 'font-awesome')
+
+    def test_assets_missing_from_the_manifest_fail_the_page(self):
+        """Test that with STATIC_MANIFEST_STRICT an uncollected asset raises instead of linking unhashed"""
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(root.cleanup)
+        with override_settings(STATIC_ROOT=root.name):
+            self.assertEqual(staticfiles_storage.url('travels/app.css'), '/static/travels/app.css')
+            with override_settings(STATIC_MANIFEST_STRICT=True):
+                with self.assertRaisesMessage(ValueError, 'travels/app.css'):
+                    staticfiles_storage.url('travels/app.css')
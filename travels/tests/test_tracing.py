@@ -0,0 +1,130 @@
+import json
+import logging
+import os
+import tempfile
+import threading
+from datetime import timedelta
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from model_bakery import baker
+
+from travels.management.commands.trace_collector import make_server
+from travels.models import TravelModes, TravelOptions
+from travels.payments import LocalGateway
+from travels.tracing import Span, TraceContextFilter, current_span, from_otlp, get_exporter, to_otlp
+
+
+class TracingTest(TestCase):
+    """Test cases for request tracing and span export"""
+
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix='.jsonl')
+        os.close(fd)
+        self.addCleanup(os.remove, self.path)
+        self.user = User.objects.create_user(username='tracer')
+        self.client.force_login(self.user)
+        mode = baker.make(TravelModes, travel_mode='Bus')
+        start = timezone.now() + timedelta(days=5)
+        self.trip = baker.make(TravelOptions, traveltype=mode, travel_date=start, return_date=start + timedelta(days=1),
+                               price=Decimal('500.00'), available_seats=10)
+
+    def exported(self):
+        get_exporter().flush()
+        with open(self.path) as fh:
+            return [json.loads(line) for line in fh]
+
+    def test_request_spans_nest_under_the_root(self):
+        """Test that ORM and template spans are children of the request span and share its trace id"""
+        with override_settings(TRACING_EXPORTER='file', TRACING_FILE=self.path):
+            response = self.client.get(reverse('details', args=[self.trip.pk]))
+            spans = self.exported()
+
+        [root] = [span for span in spans if span['parent_id'] is None]
+        self.assertEqual(root['name'], 'GET details')
+        self.assertEqual(root['attributes']['http.status_code'], 200)
+        self.assertEqual(response['X-Trace-Id'], root['trace_id'])
+        self.assertEqual({span['trace_id'] for span in spans}, {root['trace_id']})
+
+        [template] = [span for span in spans if span['name'] == 'template.render']
+        self.assertEqual(template['attributes']['template.name'], 'details.html')
+        self.assertEqual(template['parent_id'], root['span_id'])
+        queries = [span for span in spans if span['name'] == 'db.query']
+        self.assertTrue(queries)
+        self.assertTrue(all(span['kind'] == 'client' for span in queries))
+
+    def test_payment_calls_get_spans(self):
+        """Test that the blocking gateway call is a span of its own"""
+        with override_settings(TRACING_EXPORTER='file', TRACING_FILE=self.path), \
+                patch('travels.views.razorpay_client', LocalGateway('secret')):
+            self.client.post(reverse('create_booking'), json.dumps({'trip_id': self.trip.pk, 'travelers': 2}),
+                             content_type='application/json')
+            spans = self.exported()
+        [payment] = [span for span in spans if span['name'] == 'payment.order.create']
+        self.assertEqual(payment['attributes']['payment.amount'], 100000)
+
+    def test_incoming_traceparent_is_continued(self):
+        """Test that a W3C traceparent header continues the caller's trace"""
+        trace_id, parent_id = 'a' * 32, 'b' * 16
+        with override_settings(TRACING_EXPORTER='file', TRACING_FILE=self.path):
+            response = self.client.get(reverse('home'), HTTP_TRACEPARENT=f"00-{trace_id}-{parent_id}-01")
+            spans = self.exported()
+        self.assertEqual(response['X-Trace-Id'], trace_id)
+        [root] = [span for span in spans if span['name'] == 'GET home']
+        self.assertEqual(root['parent_id'], parent_id)
+
+    def test_incoming_sampled_flag_cannot_exceed_the_sample_rate(self):
+        """Test that a client's sampled flag does not force export past TRACING_SAMPLE_RATE"""
+        traceparent = f"00-{'a' * 32}-{'b' * 16}-01"
+        with override_settings(TRACING_EXPORTER='file', TRACING_FILE=self.path, TRACING_SAMPLE_RATE=0.0):
+            response = self.client.get(reverse('home'), HTTP_TRACEPARENT=traceparent)
+            self.assertEqual(self.exported(), [])
+        self.assertEqual(response['X-Trace-Id'], 'a' * 32)
+
+        with override_settings(TRACING_EXPORTER='file', TRACING_FILE=self.path):
+            self.client.get(reverse('home'), HTTP_TRACEPARENT=f"00-{'a' * 32}-{'b' * 16}-00")
+            self.assertEqual(self.exported(), [])
+
+    def test_no_exporter_keeps_trace_ids_only(self):
+        """Test that without an exporter nothing is written but responses still carry a trace id"""
+        response = self.client.get(reverse('home'))
+        self.assertRegex(response['X-Trace-Id'], r'^[0-9a-f]{32}$')
+        self.assertEqual(os.path.getsize(self.path), 0)
+
+    def test_log_records_carry_trace_ids(self):
+        """Test that the log filter adds the current trace and span id"""
+        record = logging.LogRecord('travels', logging.INFO, __file__, 1, 'message', None, None)
+        TraceContextFilter().filter(record)
+        self.assertEqual((record.trace_id, record.span_id), ('-', '-'))
+
+        span = Span('test', 'c' * 32, recording=False)
+        token = current_span.set(span)
+        try:
+            TraceContextFilter().filter(record)
+        finally:
+            current_span.reset(token)
+        self.assertEqual((record.trace_id, record.span_id), ('c' * 32, span.span_id))
+
+    def test_otlp_export_reaches_the_collector(self):
+        """Test that spans posted as OTLP/HTTP JSON are written by the collector stand-in"""
+        server = make_server('127.0.0.1', 0, self.path)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+
+        endpoint = f"http://127.0.0.1:{server.server_port}/v1/traces"
+        with override_settings(TRACING_EXPORTER='otlp', TRACING_OTLP_ENDPOINT=endpoint):
+            self.client.get(reverse('home'))
+            spans = self.exported()
+        self.assertIn('GET home', [span['name'] for span in spans])
+
+    def test_otlp_round_trip(self):
+        """Test that converting to OTLP JSON and back keeps every field"""
+        span = Span('db.query', 'd' * 32, 'e' * 16, 'client', attributes={'db.statement': 'SELECT 1', 'rows': 1})
+        span.error = 'DatabaseError'
+        span.end_ns = span.start_ns + 1500000
+        self.assertEqual(from_otlp(to_otlp([span.as_dict()])), [span.as_dict()])
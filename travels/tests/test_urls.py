@@ -74,3 +74,14 @@ class UrlsTest(SimpleTestCase):
         """Test that the 'cancel_offline_booking' URL resolves to the correct view."""
         url = reverse('cancel_offline_booking', args=[1])
         self.assertEqual(resolve(url).func, views.cancel_offline_reservation)
+
+    def test_export_bookings_url_resolves(self):
+        """Test that the 'export_bookings' URL resolves to the export_bookings view."""
+        url = reverse('export_bookings')
+        self.assertEqual(resolve(url).func, views.export_bookings)
+
+    def test_metrics_url_resolves(self):
+        """Test that the 'metrics' URL resolves to the metrics view."""
+        url = reverse('metrics')
+        self.assertEqual(url, '/metrics')
+        self.assertEqual(resolve(url).func, views.metrics)
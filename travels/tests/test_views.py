@@ -1,8 +1,9 @@
 import json
 from unittest.mock import patch, Mock
-from django.test import TestCase, Client
+from django.core.cache import cache
+from django.test import TestCase, Client, override_settings
 from django.urls import reverse
-from django.contrib.auth.models import User
+from django.contrib.auth.models import Permission, User
 from django.utils import timezone
 from decimal import Decimal
 from datetime import timedelta
@@ -143,7 +144,7 @@ class ViewsTest(TestCase):
             'order_id': 'order_test123',
             'signature': 'sig_test123',
             'passengers': [{'name': 'John', 'age': 30, 'adhar_number': '123456789012', 'email': 'john@test.com'}],
-            'selected_seats': ['A1']
+            'selected_seats': [0]
         }
 
         response = self.client.post(
@@ -168,7 +169,7 @@ class ViewsTest(TestCase):
         
         data = {
             'passengers': [{'name': 'Jane', 'age': 25, 'adhar_number': '987654321098', 'email': 'jane@test.com'}],
-            'selected_seats': ['B2']
+            'selected_seats': [11]
         }
         
         response = self.client.post(
@@ -186,6 +187,35 @@ class ViewsTest(TestCase):
         self.trip2.refresh_from_db()
         self.assertEqual(self.trip2.available_seats, 9)
 
+    def test_booking_needs_one_valid_seat_per_traveller(self):
+        """Test that duplicate, missing, out of layout and already booked seats are rejected"""
+        self.client.login(username='testuser', password='testpassword123')
+        baker.make(BookingTrip, trip=self.trip2, user=self.user, seat_numbers=[5], booking_status='Confirmed')
+        passengers = [
+            {'name': 'P1', 'age': 20, 'adhar_number': '111122223333', 'email': 'p1@test.com'},
+            {'name': 'P2', 'age': 22, 'adhar_number': '444455556666', 'email': 'p2@test.com'},
+        ]
+
+        def book(seats):
+            return self.client.post(
+                reverse('confirm_offline_booking', args=[self.trip2.id]),
+                data=json.dumps({'passengers': passengers, 'selected_seats': seats}),
+                content_type='application/json'
+            )
+
+        for seats in ([1, 1], [1], [1, 2, 3], [1, 40], [-1, 2], ['A1', 2], '12'):
+            response = book(seats)
+            self.assertEqual(response.status_code, 400, seats)
+            self.assertIn(b"Select 2 different seats", response.content)
+        response = book(['05', 6])
+        self.assertEqual(response.status_code, 400)
+        self.assertIn(b"Seats already booked: 5", response.content)
+
+        self.assertEqual(book(['07', 6]).status_code, 200)
+        self.assertEqual(BookingTrip.objects.get(booking_status='Pending').seat_numbers, [7, 6])
+        self.trip2.refresh_from_db()
+        self.assertEqual(self.trip2.available_seats, 8)
+
     # --- Test `cancel_offline_reservation` View ---
     def test_cancel_offline_reservation(self):
         """Test cancellation of a pending offline booking."""
@@ -210,6 +240,20 @@ class ViewsTest(TestCase):
         self.trip1.refresh_from_db()
         self.assertEqual(self.trip1.available_seats, initial_seats + 2)
 
+    def test_cancel_twice_restores_seats_once(self):
+        """Test that cancelling an already cancelled booking does not restore seats again."""
+        self.client.login(username='testuser', password='testpassword123')
+        booking = baker.make(
+            BookingTrip, user=self.user, trip=self.trip1,
+            payment_status='pending', booking_status='Pending', number_of_seats=2
+        )
+
+        self.client.post(reverse('cancel_offline_booking', args=[booking.id]))
+        self.client.post(reverse('cancel_offline_booking', args=[booking.id]))
+
+        self.trip1.refresh_from_db()
+        self.assertEqual(self.trip1.available_seats, 22)
+
     # --- Test Authentication Views ---
     def test_signup_view(self):
         """Test user signup view."""
@@ -338,7 +382,7 @@ class InvalidDataViewsTest(TestCase):
         data = {
             'payment_id': 'pay_test', 'order_id': 'order_test', 'signature': 'invalid_sig',
             'passengers': [{'name': 'Test', 'age': 30, 'adhar_number': '123456789012', 'email': 'test@example.com'}],
-            'selected_seats': ['C1']
+            'selected_seats': [20]
         }
         response = self.client.post(
             reverse('confirm_booking', args=[self.trip.id]),
@@ -360,7 +404,7 @@ class InvalidDataViewsTest(TestCase):
                 {'name': 'P1', 'age': 20, 'adhar_number': '111', 'email': 'p1@test.com'},
                 {'name': 'P2', 'age': 22, 'adhar_number': '222', 'email': 'p2@test.com'}
             ],
-            'selected_seats': ['D1', 'D2']
+            'selected_seats': [30, 31]
         }
         with patch('travels.views.razorpay_client.utility.verify_payment_signature', return_value=None):
             response = self.client.post(
@@ -434,3 +478,115 @@ class InvalidDataViewsTest(TestCase):
         })
         self.assertEqual(response.status_code, 400)
         self.assertIn(b"Old password is incorrect", response.content)
+
+
+######################### Booking Export Tests #########################
+
+class ExportBookingsViewTest(TestCase):
+    """Test suite for the streaming finance export."""
+
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(username='customer', password='testpassword123')
+        self.finance = User.objects.create_user(username='finance', password='testpassword123', is_staff=True)
+        self.finance.user_permissions.add(Permission.objects.get(codename='view_bookingtrip'))
+
+        trip = baker.make(TravelOptions, source='Mumbai', destination='Goa', available_seats=10)
+        self.confirmed = baker.make(
+            BookingTrip, user=self.user, trip=trip, booking_status='Confirmed',
+            total_price=Decimal('3000.00'), seat_numbers=['A1', 'A2'],
+        )
+        self.confirmed.passengers.add(baker.make(PassengerDetails, name='Asha', age=31))
+        baker.make(BookingTrip, user=self.user, trip=trip, booking_status='Cancelled', total_price=Decimal('1.00'))
+
+    def test_export_requires_permission(self):
+        """Test that users without the view permission are refused."""
+        self.client.login(username='customer', password='testpassword123')
+        response = self.client.get(reverse('export_bookings'))
+        self.assertEqual(response.status_code, 403)
+
+    def test_export_csv_is_streamed(self):
+        """Test that the CSV export streams a header and one row per booking."""
+        self.client.login(username='finance', password='testpassword123')
+        response = self.client.get(reverse('export_bookings'), {'status': 'Confirmed'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertTrue(lines[0].startswith('booking_reference,booked_at'))
+        self.assertEqual(len(lines), 2)
+        self.assertIn('Asha (31)', lines[1])
+        self.assertIn('A1 A2', lines[1])
+
+    def test_export_jsonl_with_date_range(self):
+        """Test the JSON Lines export and the booked_at date filter."""
+        self.client.login(username='finance', password='testpassword123')
+        today = timezone.now().date().isoformat()
+        response = self.client.get(reverse('export_bookings'), {'format': 'jsonl', 'start_date': today, 'end_date': today})
+
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[0]['booking_reference'], self.confirmed.booking_reference)
+        self.assertEqual(rows[0]['passengers'][0]['name'], 'Asha')
+
+        response = self.client.get(reverse('export_bookings'), {'format': 'jsonl', 'end_date': '2000-01-01'})
+        self.assertEqual(b''.join(response.streaming_content), b'')
+
+    def test_export_invalid_filters(self):
+        """Test that malformed filters are rejected."""
+        self.client.login(username='finance', password='testpassword123')
+        self.assertEqual(self.client.get(reverse('export_bookings'), {'format': 'xml'}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('export_bookings'), {'start_date': 'yesterday'}).status_code, 400)
+
+
+class FragmentCacheTest(TestCase):
+    """Test cases for the cached trip card and trip detail fragments"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='traveller', password='testpassword123')
+        self.trip = baker.make(
+            TravelOptions,
+            source='Mumbai',
+            destination='Goa',
+            travel_date=timezone.now() + timedelta(days=10),
+            return_date=timezone.now() + timedelta(days=15),
+            price=Decimal('5000.00'),
+            available_seats=20,
+        )
+
+    def test_trip_card_is_cached_until_the_trip_changes(self):
+        """Test that the card is served from cache until updated_at moves"""
+        self.assertContains(self.client.get(reverse('home')), 'Mumbai → Goa')
+        TravelOptions.objects.filter(pk=self.trip.pk).update(source='Pune')
+        self.assertContains(self.client.get(reverse('home')), 'Mumbai → Goa')
+
+        TravelOptions.objects.filter(pk=self.trip.pk).update(updated_at=timezone.now())
+        self.assertContains(self.client.get(reverse('home')), 'Pune → Goa')
+
+    def test_card_footer_follows_the_visitor(self):
+        """Test that a card cached for a visitor shows the details link after login"""
+        self.assertContains(self.client.get(reverse('home')), 'Please login to view details')
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('home'))
+        self.assertContains(response, reverse('details', args=[self.trip.pk]))
+        self.assertNotContains(response, 'Please login to view details')
+
+    def test_trip_detail_fragments_exclude_the_user(self):
+        """Test that cached trip details still show the current user's name"""
+        self.client.force_login(self.user)
+        self.client.get(reverse('details', args=[self.trip.pk]))
+        TravelOptions.objects.filter(pk=self.trip.pk).update(destination='Kochi')
+
+        other = User.objects.create_user(username='second_traveller', password='testpassword123')
+        self.client.force_login(other)
+        response = self.client.get(reverse('details', args=[self.trip.pk]))
+        self.assertContains(response, 'second_traveller')
+        self.assertContains(response, 'Mumbai → Goa')
+
+    @override_settings(FRAGMENT_CACHE_TIMEOUT=0)
+    def test_zero_timeout_disables_the_cache(self):
+        """Test that FRAGMENT_CACHE_TIMEOUT=0 renders every card fresh"""
+        self.client.get(reverse('home'))
+        TravelOptions.objects.filter(pk=self.trip.pk).update(source='Pune')
+        self.assertContains(self.client.get(reverse('home')), 'Pune → Goa')
@@ -0,0 +1,75 @@
+import runpy
+from io import StringIO
+from types import SimpleNamespace
+from unittest.mock import Mock, patch
+
+from django.conf import settings
+from django.core.management import call_command
+from django.db import OperationalError
+from django.template import engines
+from django.test import TestCase
+
+from travels.warmup import template_names, warm_up
+
+
+GUNICORN_CONF = str(settings.BASE_DIR / 'gunicorn.conf.py')
+
+
+class WarmUpTest(TestCase):
+    """Test cases for the warm-up run before a server process takes traffic"""
+
+    def test_warm_up_steps(self):
+        """Test that every step runs and the database connection is left closed"""
+        with patch('travels.warmup.connections.close_all') as close_all:
+            report = warm_up()
+        self.assertEqual(list(report), ['urls', 'templates', 'reference_data', 'databases'])
+        self.assertGreater(report['urls'][0], 10)
+        self.assertEqual(report['templates'][0], len(template_names()))
+        self.assertTrue(close_all.called)
+
+    def test_templates_are_compiled_into_the_cache(self):
+        """Test that the project templates are in the cached loader after the warm-up"""
+        self.assertIn('main.html', template_names())
+        self.assertIn('admin/profiles.html', template_names())
+        warm_up()
+        loader = engines['django'].engine.template_loaders[0]
+        self.assertIn('main.html', loader.get_template_cache)
+
+    def test_database_down_skips_its_steps(self):
+        """Test that an unreachable database does not stop the warm-up"""
+        with patch('django.db.backends.base.base.BaseDatabaseWrapper.cursor', side_effect=OperationalError('down')):
+            report = warm_up()
+        self.assertEqual(list(report), ['urls', 'templates'])
+
+    def test_warm_up_command(self):
+        """Test that the command prints the timing of every step"""
+        out = StringIO()
+        call_command('warm_up', stdout=out)
+        self.assertIn('templates', out.getvalue())
+        self.assertIn('Warm-up done', out.getvalue())
+
+
+class GunicornConfigTest(TestCase):
+    """Test cases for gunicorn.conf.py"""
+
+    def test_environment_overrides(self):
+        """Test that the worker count and recycling come from the environment"""
+        env = {'WEB_CONCURRENCY': '3', 'GUNICORN_MAX_REQUESTS': '500', 'GUNICORN_MAX_REQUESTS_JITTER': '50'}
+        with patch.dict('os.environ', env):
+            conf = runpy.run_path(GUNICORN_CONF)
+        self.assertEqual(conf['workers'], 3)
+        self.assertEqual(conf['max_requests'], 500)
+        self.assertEqual(conf['max_requests_jitter'], 50)
+        self.assertEqual(conf['worker_class'], 'uvicorn.workers.UvicornWorker')
+        self.assertTrue(conf['preload_app'])
+
+    def test_warm_up_runs_once_per_mode(self):
+        """Test that the master warms up when preloading, every worker otherwise"""
+        conf = runpy.run_path(GUNICORN_CONF)
+        for preload, master_calls, worker_calls in ((True, 1, 0), (False, 0, 1)):
+            process = SimpleNamespace(cfg=SimpleNamespace(preload_app=preload), log=Mock())
+            with patch('travels.warmup.warm_up', return_value={}) as master:
+                conf['when_ready'](process)
+            with patch('travels.warmup.warm_up', return_value={}) as worker:
+                conf['post_worker_init'](process)
+            self.assertEqual((master.call_count, worker.call_count), (master_calls, worker_calls))
@@ -0,0 +1,245 @@
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import re
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+import requests
+from django.conf import settings
+
+
+logger = logging.getLogger('travels.tracing')
+
+# W3C trace context, "00-<trace id>-<parent span id>-<flags>"
+TRACEPARENT = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+SPAN_KINDS = {'internal': 1, 'server': 2, 'client': 3}
+EXPORT_BATCH_SIZE = 512
+
+current_span = ContextVar('current_span', default=None)
+
+
+# One timed operation of a trace. Spans of unsampled traces still carry ids, so logs can be
+# correlated, but are never exported.
+class Span:
+    __slots__ = ('trace_id', 'span_id', 'parent_id', 'name', 'kind', 'attributes', 'start_ns', 'end_ns', 'error', 'recording')
+
+    def __init__(self, name, trace_id, parent_id=None, kind='internal', recording=True, attributes=None):
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.attributes = attributes or {}
+        self.recording = recording
+        self.error = None
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+
+    def end(self):
+        self.end_ns = time.time_ns()
+        if self.recording:
+            get_exporter().submit(self.as_dict())
+
+    def as_dict(self):
+        return {
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'name': self.name,
+            'kind': self.kind,
+            'start_ns': self.start_ns,
+            'end_ns': self.end_ns,
+            'duration_ms': round((self.end_ns - self.start_ns) / 1e6, 3),
+            'attributes': self.attributes,
+            'error': self.error,
+        }
+
+    def traceparent(self):
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.recording else '00'}"
+
+
+# Root span for an incoming request, continuing the caller's trace when it sent a traceparent.
+# The header comes from the client, so its sampled flag can only turn recording off:
+# TRACING_SAMPLE_RATE stays the upper bound on what gets exported.
+def start_trace(name, traceparent=None, kind='server', **attributes):
+    sampled = random.random() < settings.TRACING_SAMPLE_RATE
+    match = TRACEPARENT.match(traceparent or '')
+    if match:
+        trace_id, parent_id, flags = match.groups()
+        sampled = sampled and bool(int(flags, 16) & 1)
+    else:
+        trace_id, parent_id = secrets.token_hex(16), None
+    recording = bool(settings.TRACING_EXPORTER) and sampled
+    return Span(name, trace_id, parent_id, kind, recording, attributes)
+
+
+# Child of the current span, a no-op unless the trace is being recorded
+@contextmanager
+def span(name, kind='internal', **attributes):
+    parent = current_span.get()
+    if parent is None or not parent.recording:
+        yield None
+        return
+    child = Span(name, parent.trace_id, parent.span_id, kind, True, attributes)
+    token = current_span.set(child)
+    try:
+        yield child
+    except BaseException as e:
+        child.error = type(e).__name__
+        raise
+    finally:
+        current_span.reset(token)
+        child.end()
+
+
+# connection.execute_wrapper() hook giving every query its own span
+def trace_query(execute, sql, params, many, context):
+    attributes = {'db.system': context['connection'].vendor, 'db.statement': sql[:2000]}
+    with span('db.query', kind='client', **attributes):
+        return execute(sql, params, many, context)
+
+
+# Adds trace_id and span_id to every log record, "-" outside a request
+class TraceContextFilter(logging.Filter):
+
+    def filter(self, record):
+        current = current_span.get()
+        record.trace_id = current.trace_id if current else '-'
+        record.span_id = current.span_id if current else '-'
+        return True
+
+
+def to_otlp(spans):
+    def attribute(key, value):
+        if isinstance(value, bool):
+            return {'key': key, 'value': {'boolValue': value}}
+        if isinstance(value, int):
+            return {'key': key, 'value': {'intValue': str(value)}}
+        if isinstance(value, float):
+            return {'key': key, 'value': {'doubleValue': value}}
+        return {'key': key, 'value': {'stringValue': str(value)}}
+
+    return {'resourceSpans': [{
+        'resource': {'attributes': [attribute('service.name', settings.TRACING_SERVICE_NAME)]},
+        'scopeSpans': [{
+            'scope': {'name': 'travels'},
+            'spans': [{
+                'traceId': item['trace_id'],
+                'spanId': item['span_id'],
+                'parentSpanId': item['parent_id'] or '',
+                'name': item['name'],
+                'kind': SPAN_KINDS[item['kind']],
+                'startTimeUnixNano': str(item['start_ns']),
+                'endTimeUnixNano': str(item['end_ns']),
+                'attributes': [attribute(key, value) for key, value in item['attributes'].items()],
+                'status': {'code': 2, 'message': item['error']} if item['error'] else {'code': 0},
+            } for item in spans],
+        }],
+    }]}
+
+
+# Flattens an OTLP/HTTP JSON export back into the span dicts written by the file exporter
+def from_otlp(payload):
+    kinds = {number: name for name, number in SPAN_KINDS.items()}
+    spans = []
+    for resource in payload.get('resourceSpans', []):
+        for scope in resource.get('scopeSpans', []):
+            for item in scope.get('spans', []):
+                attributes = {}
+                for attr in item.get('attributes', []):
+                    value = attr.get('value', {})
+                    # OTLP JSON sends 64 bit integers as strings
+                    attributes[attr['key']] = int(value['intValue']) if 'intValue' in value else next(iter(value.values()), None)
+                start, end = int(item['startTimeUnixNano']), int(item['endTimeUnixNano'])
+                status = item.get('status', {})
+                spans.append({
+                    'trace_id': item['traceId'],
+                    'span_id': item['spanId'],
+                    'parent_id': item.get('parentSpanId') or None,
+                    'name': item['name'],
+                    'kind': kinds.get(item.get('kind'), 'internal'),
+                    'start_ns': start,
+                    'end_ns': end,
+                    'duration_ms': round((end - start) / 1e6, 3),
+                    'attributes': attributes,
+                    'error': (status.get('message') or 'error') if status.get('code') == 2 else None,
+                })
+    return spans
+
+
+# Ships finished spans from a background thread in batches, so requests never wait on the
+# file system or the collector. 'file' appends JSON lines to TRACING_FILE, 'otlp' posts
+# OTLP/HTTP JSON to TRACING_OTLP_ENDPOINT.
+class SpanExporter:
+
+    def __init__(self, kind, target):
+        self.kind = kind
+        self.target = target
+        self.queue = queue.SimpleQueue()
+        self.lock = threading.Lock()
+        # Spans submitted but not exported yet, including a batch the thread is holding
+        self.unfinished = 0
+        self.done = threading.Condition()
+        self.pid = None
+
+    def submit(self, item):
+        if self.pid != os.getpid():
+            self.pid = os.getpid()
+            threading.Thread(target=self.run, daemon=True).start()
+        with self.done:
+            self.unfinished += 1
+        self.queue.put(item)
+
+    def run(self):
+        while True:
+            batch = [self.queue.get()]
+            self.drain(batch)
+
+    def flush(self, timeout=5):
+        while not self.queue.empty():
+            self.drain([])
+        with self.done:
+            self.done.wait_for(lambda: self.unfinished <= 0, timeout)
+
+    def drain(self, batch):
+        with self.lock:
+            while len(batch) < EXPORT_BATCH_SIZE:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            if batch:
+                self.export(batch)
+        with self.done:
+            self.unfinished -= len(batch)
+            self.done.notify_all()
+
+    def export(self, batch):
+        try:
+            if self.kind == 'file':
+                with open(self.target, 'a') as fh:
+                    fh.writelines(json.dumps(item) + '\n' for item in batch)
+            else:
+                requests.post(self.target, json=to_otlp(batch), timeout=5).raise_for_status()
+        except (OSError, requests.RequestException) as e:
+            logger.warning("Dropped %d spans: %s", len(batch), e)
+
+
+_exporters = {}
+
+
+def get_exporter():
+    kind = settings.TRACING_EXPORTER
+    target = settings.TRACING_FILE if kind == 'file' else settings.TRACING_OTLP_ENDPOINT
+    key = (kind, target)
+    if key not in _exporters:
+        _exporters[key] = SpanExporter(kind, target)
+        atexit.register(_exporters[key].flush)
+    return _exporters[key]
@@ -7,6 +7,7 @@ urlpatterns = [
     path('details/<int:trip_id>/', views.trip_detail, name='details'),
     path('bookingpage/<int:trip_id>/', views.booking_page, name='bookingpage'),
     path('create-booking/', views.create_razorpay_order, name='create_booking'),
+    path('bookingpage/<int:trip_id>/seats/events/', views.seat_availability_events, name='seat_events'),
     path('confirm-booking/<int:trip_id>/', views.confirm_online_booking, name='confirm_booking'),
     path('confirm-offline-booking/<int:trip_id>/', views.confirm_offline_booking, name='confirm_offline_booking'),
     path('signup/', views.sign_up, name='signup'),
@@ -17,6 +18,13 @@ urlpatterns = [
     path('profile/', views.profile, name='profile'),
     path('update-profile/', views.update_profile, name='update_profile'),
     path('booking/<int:booking_id>/cancel/', views.cancel_offline_reservation, name='cancel_offline_booking'),
+    path('exports/bookings/', views.export_bookings, name='export_bookings'),
+    path('api/v1/trips/', views.api_trips, name='api_trips'),
+    path('api/v1/trips/changes/', views.api_trip_changes, name='api_trip_changes'),
+    path('metrics', views.metrics, name='metrics'),
+    path('profiles/', views.profiles, name='profiles'),
+    path('profiles/<str:name>', views.profile_download, name='profile_download'),
+    path('diagnostics/memory/', views.memory_census, name='memory_census'),
 
 
 ]
\ No newline at end of file
@@ -1,5 +1,8 @@
 
 from datetime import date
+import functools
+import hashlib
+import hmac
 import json
 import os
 from pyexpat.errors import messages
@@ -8,78 +11,71 @@ import razorpay
 from django.contrib.auth.models import User
 from django.contrib.auth import login, authenticate , logout
 from django.shortcuts import get_object_or_404, render, redirect
-from django.http import HttpResponseServerError, HttpResponseBadRequest, JsonResponse
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.template.loader import get_template
+from django.views.decorators.http import condition, require_http_methods
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseForbidden, HttpResponseServerError, HttpResponseBadRequest, JsonResponse, StreamingHttpResponse
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
 from django.db import DatabaseError , transaction
 from django.core.exceptions import ValidationError
 from django.db import models
 from travels.models import BookingTrip, PassengerDetails, TravelModes, TravelOptions
-from django.utils.dateparse import parse_date
-from django.db.models import Sum, Count, Q
+from travels import seat_events
+from travels.cache import get_or_compute, trips
+from travels.memory import census
+from travels.metrics import registry
+from travels.api import (
+    change_page, cursor_expired, decode_cursor, dumps, parse_fields, parse_limit, parse_trip_query, trip_page,
+    trip_query_etag,
+)
+from travels.page_cache import anonymous_page_cache
+from travels.read_models import booking_rows, trip_cards
+from travels.search import SEARCH_PARAMS, SearchError, filter_trips
+from travels.payments import get_payment_client
+from travels.tracing import span
+from travels.profiling import PROFILE_HEADER, PROFILE_NAME, list_profiles, make_profile_token, profile_dir
+from travels.exports import EXPORT_FORMATS, aiter_chunks, bookings_for_export, export_rows, parse_export_filters, render_export
+from django.utils.dateparse import parse_datetime
+from django.db.models import Exists, F, OuterRef, Sum, Count, Q
+from django.utils import timezone
 from django.views.decorators.csrf import csrf_exempt
-from django.contrib.auth.decorators import login_required
+from django.contrib.auth.decorators import login_required, permission_required
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth import update_session_auth_hash
 from dotenv import load_dotenv
 load_dotenv()
 
-razorpay_client = razorpay.Client(auth=(os.getenv("RAZORPAY_KEY_ID"), os.getenv("RAZORPAY_SECRET_ID")))
+razorpay_client = get_payment_client()
+
+# Query parameters main_page reads, the full-page cache keys on these only
+MAIN_PAGE_PARAMS = SEARCH_PARAMS
+
+
+# Cached home pages are dropped by a deploy and by any trip or travel mode edit
+def main_page_version():
+    return f"{page_version('main.html')}:{trips.version()}"
+
 
 # This is the main page view with all filters , searching 
+@anonymous_page_cache(MAIN_PAGE_PARAMS, version=main_page_version)
 def main_page(request):
     try:
-        search = request.GET.get('search', '').strip()
-        travel_mode_id = request.GET.get('travel_mode', None)
-        start_date_str = request.GET.get('start_date', None)
-        end_date_str = request.GET.get('end_date', None)
-        min_price = request.GET.get('min_price', 100)
-        max_price = request.GET.get('price_range', None)
-
-        travel_options = TravelOptions.objects.all()
-
-        # Filter by search term over destination or source using icontains for partial match
-        if search:
-            travel_options = travel_options.filter(
-                Q(destination__icontains=search) 
-            )
+        try:
+            travel_options = filter_trips(TravelOptions.objects.all(), request.GET)
+        except SearchError as e:
+            return HttpResponseBadRequest(str(e))
 
-        # Filter by travel_mode foreign key if  valid
-        if travel_mode_id and travel_mode_id.isdigit():
-            travel_options = travel_options.filter(traveltype=int(travel_mode_id))
-
-        # Filter by date range if provided
-        if start_date_str:
-            print("startd")
-            start_date = parse_date(start_date_str)
-            if not start_date:
-                return HttpResponseBadRequest("Invalid start_date format. Use YYYY-MM-DD.")
-            travel_options = travel_options.filter(travel_date__gte=start_date)
-
-        if end_date_str:
-            end_date = parse_date(end_date_str)
-            if not end_date:
-                return HttpResponseBadRequest("Invalid end_date format. Use YYYY-MM-DD.")
-            travel_options = travel_options.filter(return_date__lte=end_date)
-
-        # Filter by price range if provided
-        if min_price:
-            try:
-                min_price_val = float(min_price)
-                travel_options = travel_options.filter(price__gte=min_price_val)
-            except ValueError:
-                return HttpResponseBadRequest("min_price must be a valid number")
-
-        if max_price:
-            try:
-                max_price_val = float(max_price)
-                travel_options = travel_options.filter(price__lte=max_price_val)
-            except ValueError:
-                return HttpResponseBadRequest("max_price must be a valid number")
-
-        # travel modes list
-        travel_modes = TravelModes.objects.all()
+        # travel modes list, rarely changes, cached until a travel mode or trip is edited
+        travel_modes = get_or_compute(
+            trips.key('travel_modes'), lambda: list(TravelModes.objects.all()), timeout=3600,
+        )
 
         return render(request, 'main.html', {
-            'travel_options': travel_options,
+            'travel_options': trip_cards(travel_options),
             'travel_modes': travel_modes,
+            **fragment_context('main.html'),
         })
 
     except ValidationError as ve:
@@ -95,19 +91,57 @@ def main_page(request):
         return HttpResponseServerError(f"error occurred : {e}")
 
 
+# Changes whenever a deploy could change a rendered page: its template or the static file hashes
+@functools.cache
+def page_version(template_name):
+    manifest = json.dumps(getattr(staticfiles_storage, 'hashed_files', {}), sort_keys=True)
+    source = get_template(template_name).template.source
+    return hashlib.md5((source + manifest).encode()).hexdigest()[:12]
+
+
+# Context for the {% cache %} blocks of a page: trip fragments are keyed on the trip's id and
+# updated_at, the version drops them all when a deploy changes the template
+def fragment_context(template_name):
+    return {
+        'fragment_timeout': settings.FRAGMENT_CACHE_TIMEOUT,
+        'fragment_version': page_version(template_name),
+    }
+
+
+# Trip Detail Validators From updated_at (Bumped By Seat Changes Too), One Small Query Instead
+# Of A Render. The Page Shows The Signed In User, So The User Is Part Of The ETag.
+def trip_updated_at(request, trip_id):
+    if not hasattr(request, 'trip_updated_at'):
+        request.trip_updated_at = TravelOptions.objects.filter(pk=trip_id).values_list('updated_at', flat=True).first()
+    return request.trip_updated_at
+
+
+def trip_detail_etag(request, trip_id):
+    updated_at = trip_updated_at(request, trip_id)
+    if updated_at is None:
+        return None
+    return f"trip-{trip_id}-{updated_at.timestamp():.6f}-{request.user.pk}-{page_version('details.html')}"
+
+
+def trip_detail_last_modified(request, trip_id):
+    return trip_updated_at(request, trip_id)
+
+
 # Travel Option Details View 
 @login_required(login_url='signin')  
+@condition(etag_func=trip_detail_etag, last_modified_func=trip_detail_last_modified)
 def trip_detail(request, trip_id):
     try:
         # Get the specific trip
-        trip = get_object_or_404(TravelOptions, id=trip_id)
+        trip = get_object_or_404(TravelOptions.objects.select_related('traveltype'), id=trip_id)
     
         # Get related travel modes for context
         travel_modes = TravelModes.objects.all()
         
         return render(request, 'details.html', {
             'trip': trip,
-            'travel_modes': travel_modes
+            'travel_modes': travel_modes,
+            **fragment_context('details.html'),
         })
         
     except ValidationError as ve:
@@ -123,12 +157,15 @@ def trip_detail(request, trip_id):
 @login_required(login_url='signin')  
 def booking_page(request, trip_id):
     try:
-        trip = get_object_or_404(TravelOptions, id=trip_id)
+        # Check if that trip is already booked by that user or not, in the same query as the trip
+        booked_trip = BookingTrip.objects.filter(user=request.user, trip=OuterRef('pk'), booking_status__in=['Confirmed', 'Pending'])
+        trip = get_object_or_404(
+            TravelOptions.objects.select_related('traveltype').annotate(already_booked=Exists(booked_trip)),
+            id=trip_id,
+        )
         travelers = int(request.GET.get('travelers', 1))
-        
-        # Check if that trip is already booked by that user or not 
-        booked_trip = BookingTrip.objects.filter(user=request.user, trip=trip , booking_status__in=['Confirmed', 'Pending'])
-        if booked_trip.exists():
+
+        if trip.already_booked:
             return render(request, "booking_error.html")
         
         # Validate travelers count
@@ -138,16 +175,17 @@ def booking_page(request, trip_id):
         # Calculate total price
         total_price = trip.price * travelers
         
-        # Generate seat layout (for demo - 40 seats, 10 rows x 4 seats)
-        total_seats = 40
-        booked_seats = [5, 12, 23, 31, 37]  # Demo booked seats
+        # Seat layout (40 seats, 10 rows x 4 seats) with the seats active bookings hold,
+        # kept current on the page by the seat_events stream
+        total_seats = seat_events.SEATS_PER_TRIP
+        booked_seats = seat_events.booked_seats(trip.id)
         
         return render(request, 'booking.html', {
             'trip': trip,
             'travelers': travelers,
             'total_price': total_price,
             'total_seats': total_seats,
-            'booked_seats': booked_seats,
+            'booked_seats': json.dumps(booked_seats),
         })
     except ValidationError as ve:
         return HttpResponseBadRequest(f"Invalid data encountered: {ve}")
@@ -173,12 +211,13 @@ def create_razorpay_order(request):
             trip = get_object_or_404(TravelOptions, id=trip_id)
             total_amount = trip.price * travelers
             
-            # Create Razorpay order
-            razorpay_order = razorpay_client.order.create({
-                'amount': int(total_amount) * 100,  # Amount in paise
-                'currency': 'INR',
-                'payment_capture': 1  # Auto capture
-            })
+            # Create Razorpay order, a blocking call to the gateway
+            with span('payment.order.create', kind='client', **{'payment.amount': int(total_amount) * 100}):
+                razorpay_order = razorpay_client.order.create({
+                    'amount': int(total_amount) * 100,  # Amount in paise
+                    'currency': 'INR',
+                    'payment_capture': 1  # Auto capture
+                })
             
             return JsonResponse({
                 'success': True,
@@ -195,6 +234,54 @@ def create_razorpay_order(request):
     
     
 
+class BookingConflict(Exception):
+    pass
+
+
+# Deduct seats with a conditional UPDATE instead of read-modify-save, the row lock it takes
+# makes concurrent bookings for the same trip queue up, so the seat count can't go negative
+# and the taken-seat check below sees every booking committed before this one. Returns the
+# selected seats in their canonical form, one distinct seat of the layout per traveller.
+def reserve_seats(trip, number_of_travelers, selected_seats):
+    seats = [seat_events.canonical_seat(seat) for seat in selected_seats] if isinstance(selected_seats, list) else []
+    in_layout = all(isinstance(seat, int) and 0 <= seat < seat_events.SEATS_PER_TRIP for seat in seats)
+    if len(set(seats)) != number_of_travelers or len(seats) != number_of_travelers or not in_layout:
+        raise BookingConflict(f"Select {number_of_travelers} different seats of the seat map")
+
+    reserved = TravelOptions.objects.filter(
+        pk=trip.pk, available_seats__gte=number_of_travelers
+    ).update(
+        available_seats=F('available_seats') - number_of_travelers,
+        updated_at=timezone.now(),
+    )
+    if not reserved:
+        raise BookingConflict("Not enough available seats")
+
+    clash = sorted(set(seat_events.booked_seats(trip.pk)).intersection(seats))
+    if clash:
+        raise BookingConflict(f"Seats already booked: {', '.join(map(str, clash))}")
+    return seats
+
+
+# Create passenger records and link them to the booking, one INSERT each for the whole
+# party instead of a query pair per passenger
+def add_passengers(booking, passengers_data):
+    passengers = PassengerDetails.objects.bulk_create([
+        PassengerDetails(
+            name=p['name'],
+            age=p['age'],
+            adhar_number=p['adhar_number'],
+            email=p['email'],
+            phone_number=p.get('phone_number', '')
+        )
+        for p in passengers_data
+    ])
+    Through = BookingTrip.passengers.through
+    Through.objects.bulk_create([
+        Through(bookingtrip_id=booking.pk, passengerdetails_id=passenger.pk) for passenger in passengers
+    ])
+
+
 @login_required(login_url='signin')
 @csrf_exempt
 def confirm_online_booking(request, trip_id): 
@@ -221,7 +308,8 @@ def confirm_online_booking(request, trip_id):
             'razorpay_signature': razorpay_signature
         }
         try:
-            razorpay_client.utility.verify_payment_signature(params_dict)
+            with span('payment.verify_signature'):
+                razorpay_client.utility.verify_payment_signature(params_dict)
         except razorpay.errors.SignatureVerificationError:
             return HttpResponseBadRequest("Payment verification failed: Invalid signature")
 
@@ -234,40 +322,36 @@ def confirm_online_booking(request, trip_id):
         if trip.available_seats < number_of_travelers:
             return HttpResponseBadRequest("Not enough available seats")
 
-        with transaction.atomic():
-            # Create passenger records
-            passenger_objs = []
-            for p in passengers_data:
-                # Validate each passenger entry here or via forms if preferred
-                if PassengerDetails.objects.filter(adhar_number=p['adhar_number']).exists():
-                    return HttpResponseBadRequest(f"Duplicate Adhar number: {p['adhar_number']}")
-
-                passenger = PassengerDetails.objects.create(
-                    name=p['name'],
-                    age=p['age'],
-                    adhar_number=p['adhar_number'],
-                    email=p['email'],
-                    phone_number=p.get('phone_number', '')
+        try:
+            with transaction.atomic():
+                # Take the seats first, this locks the trip row until the booking commits
+                selected_seats = reserve_seats(trip, number_of_travelers, selected_seats)
+                transaction.on_commit(lambda: seat_events.fanout.notify(trip.pk))
+
+                # Validate passengers with one lookup for the whole party
+                adhar_numbers = [p['adhar_number'] for p in passengers_data]
+                duplicate = PassengerDetails.objects.filter(adhar_number__in=adhar_numbers).values_list('adhar_number', flat=True).first()
+                if duplicate is None and len(set(adhar_numbers)) < len(adhar_numbers):
+                    duplicate = next(number for number in adhar_numbers if adhar_numbers.count(number) > 1)
+                if duplicate is not None:
+                    raise BookingConflict(f"Duplicate Adhar number: {duplicate}")
+
+                # Create booking record
+                booking = BookingTrip.objects.create(
+                    user=request.user,
+                    trip=trip,
+                    number_of_seats=number_of_travelers,
+                    seat_numbers=selected_seats,
+                    total_price=total_price,
+                    razorpay_payment_id=razorpay_payment_id,
+                    razorpay_order_id=razorpay_order_id,
+                    razorpay_signature=razorpay_signature,
+                    booking_status='Confirmed',
                 )
-                passenger_objs.append(passenger)
-
-            # Create booking record
-            booking = BookingTrip.objects.create(
-                user=request.user,
-                trip=trip,
-                number_of_seats=number_of_travelers,
-                seat_numbers=selected_seats,
-                total_price=total_price,
-                razorpay_payment_id=razorpay_payment_id,
-                razorpay_order_id=razorpay_order_id,
-                razorpay_signature=razorpay_signature,
-                booking_status='Confirmed',
-            )
-            booking.passengers.set(passenger_objs)
+                add_passengers(booking, passengers_data)
 
-            # Deduct seats
-            trip.available_seats -= number_of_travelers
-            trip.save()
+        except BookingConflict as conflict:
+            return HttpResponseBadRequest(str(conflict))
 
         return JsonResponse({'success': True, 'message': 'Booking confirmed', 'booking_id': booking.id})
 
@@ -300,43 +384,29 @@ def confirm_offline_booking(request , trip_id) :
         number_of_travelers = len(passengers_data)
         total_price = trip.price * number_of_travelers
 
-        print("Number of travelers:", number_of_travelers)
-        print("Available seats:", trip.available_seats)
-        print(passengers_data)
-        print(selected_seats)
-
         # Validate sufficient seats
         if trip.available_seats < number_of_travelers:
             return HttpResponseBadRequest("Not enough available seats")
 
-        with transaction.atomic():
-            # Create passenger records
-            passenger_objs = []
-            for p in passengers_data:
-                # Validate each passenger entry here or via forms if preferred
-                passenger = PassengerDetails.objects.create(
-                    name=p['name'],
-                    age=p['age'],
-                    adhar_number=p['adhar_number'],
-                    email=p['email'],
-                    phone_number=p.get('phone_number', '')
+        try:
+            with transaction.atomic():
+                # Take the seats first, this locks the trip row until the booking commits
+                selected_seats = reserve_seats(trip, number_of_travelers, selected_seats)
+                transaction.on_commit(lambda: seat_events.fanout.notify(trip.pk))
+
+                # Create booking    record
+                booking = BookingTrip.objects.create(
+                    user=request.user,
+                    trip=trip,
+                    number_of_seats=number_of_travelers,
+                    seat_numbers = selected_seats,
+                    total_price=total_price,
+                    booking_status='Pending',
                 )
-                passenger_objs.append(passenger)
-            # Create booking    record
-            booking = BookingTrip.objects.create(
-                user=request.user,
-                trip=trip,
-                number_of_seats=number_of_travelers,
-                seat_numbers = selected_seats,
-                total_price=total_price,
-                booking_status='Pending',
-            )
-            booking.passengers.set(passenger_objs)
-
-            # Deduct seats
-            trip.available_seats -= number_of_travelers
-            trip.save()
+                add_passengers(booking, passengers_data)
 
+        except BookingConflict as conflict:
+            return HttpResponseBadRequest(str(conflict))
 
 
         return JsonResponse({'success': True, 'message': 'Booking recorded. Please complete payment at the counter.', 'booking_id': booking.id})
@@ -365,15 +435,19 @@ def cancel_offline_reservation(request, booking_id):
         if booking.payment_status != 'pending' and  booking.payment_status != 'success':
             return redirect('mybookings')
 
-        # Restore seats
-        trip = booking.trip
-        if booking.number_of_seats and trip:
-            trip.available_seats += booking.number_of_seats
-            trip.save()
-
-        # Update booking status
-        booking.booking_status = 'Cancelled'
-        booking.save(update_fields=["booking_status"])
+        with transaction.atomic():
+            # Update booking status, only the request that flips it restores the seats
+            cancelled = BookingTrip.objects.filter(pk=booking.pk).exclude(
+                booking_status='Cancelled'
+            ).update(booking_status='Cancelled')
+
+            # Restore seats
+            if cancelled and booking.number_of_seats:
+                TravelOptions.objects.filter(pk=booking.trip_id).update(
+                    available_seats=F('available_seats') + booking.number_of_seats,
+                    updated_at=timezone.now(),
+                )
+                transaction.on_commit(lambda: seat_events.fanout.notify(booking.trip_id))
 
         return redirect('mybookings')
     
@@ -583,7 +657,7 @@ def my_bookings(request):
     # Get all user bookings
         all_bookings = BookingTrip.objects.filter(
             user=request.user
-        ).select_related('trip').prefetch_related('passengers').order_by('-booked_at')
+        ).order_by('-booked_at')
         
         # UPCOMING BOOKINGS: 
         # - Trip date is in future (>=today)
@@ -608,14 +682,24 @@ def my_bookings(request):
         # - Booking status is Cancelled (regardless of trip date)
         cancelled_bookings = all_bookings.filter(booking_status='Cancelled')
         
-        # Calculate stats
-        total_bookings = all_bookings.count()
-        successful_bookings = all_bookings.filter(payment_status='success' , booking_status = 'Confirmed').count()
-        pending_bookings = all_bookings.filter(payment_status='pending' , booking_status= 'Pending').count()
-        total_spent = all_bookings.filter(payment_status='success' , booking_status = 'Confirmed').aggregate(
-            total=Sum('total_price')
-        )['total'] or 0
-        
+        # Only the rendered columns, passengers of all three lists read at once
+        upcoming_bookings, past_bookings, cancelled_bookings = booking_rows(
+            upcoming_bookings, past_bookings, cancelled_bookings,
+        )
+
+        # Calculate stats in one pass
+        successful = Q(payment_status='success', booking_status='Confirmed')
+        stats = BookingTrip.objects.filter(user=request.user).aggregate(
+            total=Count('pk'),
+            successful=Count('pk', filter=successful),
+            pending=Count('pk', filter=Q(payment_status='pending', booking_status='Pending')),
+            spent=Sum('total_price', filter=successful),
+        )
+        total_bookings = stats['total']
+        successful_bookings = stats['successful']
+        pending_bookings = stats['pending']
+        total_spent = stats['spent'] or 0
+
         context = {
             'upcoming_bookings': upcoming_bookings,
             'past_bookings': past_bookings,
@@ -631,4 +715,163 @@ def my_bookings(request):
         
     except Exception as e:
         return HttpResponseServerError(f"An error occurred : {e}")
-    
+
+
+# Finance Export Of Bookings As CSV Or JSON Lines, Streamed Chunk By Chunk
+@login_required(login_url='signin')
+@permission_required('travels.view_bookingtrip', raise_exception=True)
+def export_bookings(request):
+    try:
+        fmt = request.GET.get('format', 'csv')
+        if fmt not in EXPORT_FORMATS:
+            return HttpResponseBadRequest("format must be csv or jsonl")
+
+        try:
+            filters = parse_export_filters(
+                request.GET.get('start_date'),
+                request.GET.get('end_date'),
+                request.GET.get('status'),
+            )
+        except ValueError as e:
+            return HttpResponseBadRequest(str(e))
+
+        chunks = render_export(export_rows(bookings_for_export(**filters)), fmt)
+        if isinstance(request, ASGIRequest):
+            chunks = aiter_chunks(chunks)
+
+        response = StreamingHttpResponse(chunks, content_type=EXPORT_FORMATS[fmt])
+        response['Content-Disposition'] = f'attachment; filename="bookings.{fmt}"'
+        return response
+
+    except Exception as e:
+        return HttpResponseServerError(f"An error occurred : {e}")
+
+
+# Parsed once per request, shared by the ETag and the view. None when the query is invalid,
+# the view then answers 400.
+def api_trip_query(request):
+    if not hasattr(request, 'trip_query'):
+        try:
+            request.trip_query = parse_trip_query(request.GET)
+        except SearchError as e:
+            request.trip_query, request.trip_query_error = None, str(e)
+    return request.trip_query
+
+
+def api_trips_etag(request):
+    query = api_trip_query(request)
+    return trip_query_etag(query) if query else None
+
+
+# Versioned JSON Trip Search With The Home Page Filters, Keyset Pagination (`cursor`, `limit`)
+# And Field Selection (`fields=id,price`), Answering Unchanged Pages With 304
+@condition(etag_func=api_trips_etag)
+def api_trips(request):
+    try:
+        query = api_trip_query(request)
+        if query is None:
+            return JsonResponse({'error': request.trip_query_error}, status=400)
+
+        results, next_cursor = trip_page(query)
+        next_url = None
+        if next_cursor:
+            params = request.GET.copy()
+            params['cursor'] = next_cursor
+            next_url = f"{request.path}?{params.urlencode()}"
+        return HttpResponse(dumps({'results': results, 'next': next_url}), content_type='application/json')
+
+    except DatabaseError as db_err:
+        return JsonResponse({'error': f"A database error occurred : {db_err}"}, status=500)
+
+
+# Trip Change Feed For Partners Mirroring The Catalogue: Edits And Deletions Since `cursor`,
+# Oldest First, Resumed From The Returned Cursor
+def api_trip_changes(request):
+    try:
+        try:
+            fields = parse_fields(request.GET.get('fields'))
+            limit = parse_limit(request.GET.get('limit'))
+            cursor = request.GET.get('cursor')
+            cursor = decode_cursor(cursor, (parse_datetime, int, int)) if cursor else None
+        except SearchError as e:
+            return JsonResponse({'error': str(e)}, status=400)
+        if cursor and cursor_expired(cursor, settings.CHANGE_FEED_RETENTION_DAYS):
+            return JsonResponse({'error': "cursor is older than the change feed retention, sync again without it"},
+                                status=410)
+
+        changes, next_cursor, has_more = change_page(cursor, limit, fields, settings.CHANGE_FEED_SETTLE)
+        params = request.GET.copy()
+        if next_cursor:
+            params['cursor'] = next_cursor
+        return HttpResponse(dumps({
+            'changes': changes,
+            'cursor': next_cursor,
+            'has_more': has_more,
+            'next': f"{request.path}?{params.urlencode()}",
+        }), content_type='application/json')
+
+    except DatabaseError as db_err:
+        return JsonResponse({'error': f"A database error occurred : {db_err}"}, status=500)
+
+
+# Live Seat Availability For The Booking Page As Server-Sent Events, One Shared Poller Per
+# Trip. Streams Need The ASGI Server; Under WSGI A Single Snapshot Is Sent And The Browser
+# Reconnects After The Retry Delay.
+@login_required(login_url='signin')
+async def seat_availability_events(request, trip_id):
+    if not await TravelOptions.objects.filter(pk=trip_id).aexists():
+        raise Http404("Trip not found")
+
+    if isinstance(request, ASGIRequest):
+        response = StreamingHttpResponse(seat_events.fanout.stream(trip_id), content_type='text/event-stream')
+    else:
+        state = await sync_to_async(seat_events.seat_state)(trip_id)
+        response = HttpResponse(seat_events.format_event(state, retry=seat_events.RETRY_MS),
+                                content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+# Prometheus Scrape Endpoint With The Request Metrics Of Every Worker
+def metrics(request):
+    token = settings.METRICS_TOKEN
+    if token and not hmac.compare_digest(request.headers.get('Authorization', ''), f"Bearer {token}"):
+        return HttpResponseForbidden("Invalid metrics token")
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+# Staff Page With The Slowest Profiled Requests And A Fresh Profiling Token
+@staff_member_required
+def profiles(request):
+    return render(request, 'admin/profiles.html', {
+        'title': 'Request profiles',
+        'profiles': list_profiles(limit=100),
+        'profile_header': PROFILE_HEADER,
+        'profile_token': make_profile_token(),
+        'token_max_age': settings.PROFILING_TOKEN_MAX_AGE,
+    })
+
+
+@staff_member_required
+def profile_download(request, name):
+    path = profile_dir() / name
+    if not PROFILE_NAME.match(name) or not path.is_file():
+        raise Http404("No such profile")
+    return FileResponse(path.open('rb'), as_attachment=True, filename=name)
+
+
+# Staff Memory Census Of The Worker That Serves The Request, ?objects=0 Skips The Slow Object Count.
+# GET Only Reads, A (CSRF Protected) POST Also Starts A New Baseline
+@staff_member_required
+@require_http_methods(['GET', 'POST'])
+def memory_census(request):
+    try:
+        limit = min(int(request.GET.get('limit', 20)), 200)
+    except ValueError:
+        return HttpResponseBadRequest("limit must be a number")
+    if limit < 1:
+        return HttpResponseBadRequest("limit must be at least 1")
+    if request.method == 'POST':
+        census.reset()
+    return JsonResponse(census.take(limit=limit, objects=request.GET.get('objects') != '0'))
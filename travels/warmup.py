@@ -0,0 +1,94 @@
+import logging
+import time
+from pathlib import Path
+
+from django.apps import apps
+from django.contrib.contenttypes.models import ContentType
+from django.db import DatabaseError, connections
+from django.template import TemplateDoesNotExist, TemplateSyntaxError, engines
+from django.template.utils import get_app_template_dirs
+from django.urls import NoReverseMatch, get_resolver, reverse
+
+
+logger = logging.getLogger('travels.warmup')
+
+
+# Populates the resolver and reverse tables, and imports every view on the way
+def warm_urls():
+    resolver = get_resolver()
+    names = [name for name in resolver.reverse_dict if isinstance(name, str)]
+    for name in names:
+        try:
+            reverse(name)
+        except NoReverseMatch:  # needs arguments, the lookup table is built anyway
+            pass
+    return len(names)
+
+
+def template_names():
+    names = set()
+    for engine in engines.all():
+        directories = list(engine.dirs) + list(get_app_template_dirs('templates') if engine.app_dirs else [])
+        for directory in map(Path, directories):
+            names.update(path.relative_to(directory).as_posix() for path in directory.rglob('*.html'))
+    return sorted(names)
+
+
+# Compiles every template into the cached loader, so forked workers share the compiled nodes
+def warm_templates():
+    count = 0
+    for name in template_names():
+        for engine in engines.all():
+            try:
+                engine.get_template(name)
+                count += 1
+                break
+            except (TemplateDoesNotExist, TemplateSyntaxError):
+                continue
+    return count
+
+
+# Model meta caches and the ContentType cache used by the admin and permission checks
+def warm_reference_data():
+    models = apps.get_models()
+    for model in models:
+        model._meta.get_fields()
+    ContentType.objects.get_for_models(*models)
+    return len(models)
+
+
+# Checks every database answers, then closes the connections: sockets opened before a fork
+# would be shared by all workers, each one opens its own on its first query
+def warm_databases():
+    for connection in connections.all():
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+    connections.close_all()
+    return len(connections.all())
+
+
+WARM_UP_STEPS = (
+    ('urls', warm_urls),
+    ('templates', warm_templates),
+    ('reference_data', warm_reference_data),
+    ('databases', warm_databases),
+)
+
+
+# Runs every step once per process before it takes traffic, returns {step: (count, ms)}. A
+# database that is down only skips its steps, /readyz keeps the worker out of rotation.
+def warm_up():
+    report = {}
+    try:
+        for name, step in WARM_UP_STEPS:
+            started = time.perf_counter()
+            try:
+                count = step()
+            except DatabaseError as e:
+                logger.warning("Warm-up %s skipped: %s", name, e)
+                continue
+            report[name] = (count, round((time.perf_counter() - started) * 1000, 1))
+            logger.info("Warm-up %s: %d in %.1fms", name, *report[name])
+    finally:
+        connections.close_all()
+    return report